@@ -0,0 +1,177 @@
+import gzip
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+from fastapi.middleware.gzip import GZipMiddleware
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder
+from starlette.requests import Request
+from starlette.responses import Response
+
+from api.Config import config
+from api.crud import phone_data as crud
+
+logger = logging.getLogger('api')
+
+# responses smaller than this are not worth compressing, same as the GZipMiddleware minimum_size in Main.py
+GZIP_MINIMUM_SIZE = 1000
+
+
+class Snapshot:
+    """Serialized response for one endpoint/query string at one data generation"""
+    def __init__(self, generation: int, etag: str, body: bytes, media_type: str, headers: dict):
+        self.generation = generation
+        self.etag = etag
+        self.media_type = media_type
+        self.headers = headers
+
+        # large bodies are only kept gzipped, they are decompressed for the rare client that doesn't accept gzip
+        self.gzipped = len(body) >= GZIP_MINIMUM_SIZE
+        self.body = gzip.compress(body, compresslevel=6) if self.gzipped else body
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+
+class SnapshotCache:
+    """Cache of serialized API responses, valid until the data generation is bumped by a writer.
+
+    Responses carry an ETag built from the generation, so a client repeating a request with If-None-Match gets a 304
+    after a single primary key lookup of the generation.  The cache is per process and bounded to max_bytes, least
+    recently used snapshots are dropped first.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.snapshots = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str, generation: int) -> Snapshot:
+        with self.lock:
+            snapshot = self.snapshots.get(key)
+            if snapshot is None or snapshot.generation != generation:
+                return None
+            self.snapshots.move_to_end(key)
+            return snapshot
+
+    def put(self, key: str, snapshot: Snapshot):
+        with self.lock:
+            old_snapshot = self.snapshots.pop(key, None)
+            if old_snapshot is not None:
+                self.size -= old_snapshot.size
+
+            if snapshot.size > self.max_bytes:
+                return
+
+            self.snapshots[key] = snapshot
+            self.size += snapshot.size
+
+            while self.size > self.max_bytes:
+                _, dropped = self.snapshots.popitem(last=False)
+                self.size -= dropped.size
+
+    def clear(self):
+        with self.lock:
+            self.snapshots.clear()
+            self.size = 0
+
+    def respond(self, request: Request, db: Session, build: Callable, media_type: str = "application/json") -> Response:
+        """Return the cached response for a request, building it if the data changed since it was cached
+
+        Arguments:
+            request {Request} -- incoming request, the path and query string are the cache key
+            db {Session} -- database session used to read the data generation
+            build {Callable} -- called without arguments on a cache miss, returns (body bytes, dict of extra headers)
+
+        Keyword Arguments:
+            media_type {str} -- response media type (default: {"application/json"})
+
+        Returns:
+            Response -- 304 if the client already has this generation, otherwise the cached payload
+        """
+        # read the generation before the data, a write that commits while building only makes the snapshot newer than its ETag
+        generation = crud.get_data_version(db=db)
+        key = get_cache_key(request)
+        etag = make_etag(generation, key)
+
+        if etag_matches(request.headers.get('if-none-match'), etag):
+            return Response(status_code=304, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+
+        snapshot = self.get(key, generation)
+        if snapshot is None:
+            body, headers = build()
+            snapshot = Snapshot(generation, etag, body, media_type, headers)
+            self.put(key, snapshot)
+            logger.debug(f"cached {key} at generation {generation}, {snapshot.size} bytes")
+
+        headers = dict(snapshot.headers, **{'ETag': snapshot.etag, 'Cache-Control': 'no-cache'})
+        if not snapshot.gzipped:
+            return Response(content=snapshot.body, media_type=snapshot.media_type, headers=headers)
+
+        headers['Vary'] = 'Accept-Encoding'
+        if 'gzip' in request.headers.get('accept-encoding', ''):
+            headers['Content-Encoding'] = 'gzip'
+            return Response(content=snapshot.body, media_type=snapshot.media_type, headers=headers)
+
+        return Response(content=gzip.decompress(snapshot.body), media_type=snapshot.media_type, headers=headers)
+
+
+def get_cache_key(request: Request) -> str:
+    """Cache key for a request, query parameters are sorted so their order doesn't matter"""
+    query = '&'.join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+
+    return f"{request.url.path}?{query}"
+
+
+def make_etag(generation: int, key: str) -> str:
+    """Weak ETag, the same data is sent with or without gzip"""
+    return f'W/"{generation}-{hashlib.sha1(key.encode()).hexdigest()[:16]}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag using weak comparison"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+
+    def opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith('W/') else tag
+
+    return opaque(etag) in [opaque(tag) for tag in if_none_match.split(',')]
+
+
+class PrecompressedGZipResponder(GZipResponder):
+    """GZipResponder that passes responses through untouched when they already set a Content-Encoding.
+    Server-Sent Events are not compressed either, the gzip buffer would hold events back"""
+    passthrough = False
+
+    async def send_with_gzip(self, message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if "content-encoding" in headers or headers.get("content-type", "").startswith("text/event-stream"):
+                self.passthrough = True
+
+        if self.passthrough:
+            await self.send(message)
+        else:
+            await super().send_with_gzip(message)
+
+
+class PrecompressedGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that doesn't compress cached snapshots a second time"""
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = PrecompressedGZipResponder(self.app, self.minimum_size)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+snapshot_cache = SnapshotCache(max_bytes=config.api_cache_max_mb * 1024 * 1024)
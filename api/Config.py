@@ -46,5 +46,52 @@ class ApiConfig:
         self.salt = key_data
         self.key = Fernet(key_data)
         file.close()
+
+        # phone scraper tuning
+        self.phonescrape_batch_size = int(os.getenv('PHONESCRAPE_BATCH_SIZE', 100)) # phones per RQ scrape job
+        self.phonescrape_concurrency = int(os.getenv('PHONESCRAPE_CONCURRENCY', 100)) # phones scraped at the same time by each RQ worker
+        self.phonescrape_incremental = os.getenv('PHONESCRAPE_INCREMENTAL', 'true').lower() == 'true' # only scrape phones that changed since their last scrape
+        self.phonescrape_max_age_hours = int(os.getenv('PHONESCRAPE_MAX_AGE_HOURS', 168)) # incremental scrape still refreshes phones last scraped longer ago than this
+
+        # CUCM sync, clusters are synced in parallel
+        self.cucm_sync_workers = int(os.getenv('CUCM_SYNC_WORKERS', 4)) # clusters synced at the same time
+        self.cucm_sync_timeout_minutes = int(os.getenv('CUCM_SYNC_TIMEOUT_MINUTES', 60)) # a cluster sync running longer is reported as timed out
+
+        # AXL phone retrieval, SQL joins device/device pool/CSS/extension mobility tables in executeSQLQuery, LISTPHONE uses listPhone
+        self.axl_fetch_mode = self.get_choice('AXL_FETCH_MODE', 'SQL', ['SQL', 'LISTPHONE'])
+        self.axl_incremental = os.getenv('AXL_INCREMENTAL', 'true').lower() == 'true' # only read phones changed since the last sync with AXL listChange
+        self.axl_full_sync_hours = int(os.getenv('AXL_FULL_SYNC_HOURS', 24)) # incremental sync still re-reads every phone after this many hours
+        self.axl_url = os.getenv('AXL_URL', '') # AXL service URL, {server} is replaced by the cluster server, ex. a local fake AXL endpoint for testing
+
+        # RisPort70 registration queries, CUCM rejects more than 15 selectCmDevice requests per minute
+        self.ris_requests_per_minute = int(os.getenv('RIS_REQUESTS_PER_MINUTE', 15))
+
+        # SQLite connection pragmas, applied to every new database connection
+        self.sqlite_journal_mode = self.get_choice('SQLITE_JOURNAL_MODE', 'WAL', ['WAL', 'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'OFF'])
+        self.sqlite_synchronous = self.get_choice('SQLITE_SYNCHRONOUS', 'NORMAL', ['OFF', 'NORMAL', 'FULL', 'EXTRA'])
+        self.sqlite_cache_size_kb = int(os.getenv('SQLITE_CACHE_SIZE_KB', 65536)) # page cache per connection
+        self.sqlite_mmap_size_mb = int(os.getenv('SQLITE_MMAP_SIZE_MB', 256))
+        self.sqlite_busy_timeout_ms = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 30000)) # how long a writer waits for the write lock
+
+        # API response cache, serialized phone data responses are kept until the data changes
+        self.api_cache_max_mb = int(os.getenv('API_CACHE_MAX_MB', 256)) # per FastAPI process, cached responses are stored gzipped
+
+    def get_choice(self, name: str, default: str, choices: List[str]) -> str:
+        """Read an environment variable that must be one of a fixed list of values
+
+        Arguments:
+            name {str} -- environment variable name
+            default {str} -- value used if the variable is not set or not valid
+            choices {List[str]} -- valid values
+
+        Returns:
+            str -- upper case value
+        """
+        value = os.getenv(name, default).upper()
+        if value not in choices:
+            logger.error(f"{name} value {value} is not one of {choices}, using {default}")
+            return default
+
+        return value
         
 config = ApiConfig()
\ No newline at end of file
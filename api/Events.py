@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from redis import Redis
+
+logger = logging.getLogger('api')
+
+# Redis pub/sub channel carrying job and phone scrape events from the scheduler and the RQ workers
+EVENTS_CHANNEL = 'phoneinfo:events'
+
+# seconds between queue depth/throughput events while browsers are connected
+QUEUE_STATS_INTERVAL = 2
+
+# events waiting for a browser that stopped reading are dropped past this
+SUBSCRIBER_QUEUE_SIZE = 100
+
+redis_connection = None
+
+
+def get_redis() -> Redis:
+    """Shared Redis connection pool for this process"""
+    global redis_connection
+    if redis_connection is None:
+        redis_connection = Redis(os.getenv('REDIS_HOST'), os.getenv('REDIS_PORT'), socket_connect_timeout=2, socket_timeout=5)
+
+    return redis_connection
+
+
+def publish_event(event: str, data: dict):
+    """Publish an event to every browser connected to /phonedata/events.
+    Events are informational, they are dropped if Redis is unavailable
+
+    Arguments:
+        event {str} -- event type, ex. 'job' or 'scrape_progress'
+        data {dict} -- event payload, must be JSON serializable
+    """
+    try:
+        get_redis().publish(EVENTS_CHANNEL, orjson.dumps({'event': event, 'data': data}))
+    except Exception as e:
+        logger.debug(f"unable to publish {event} event: {e}")
+
+
+def format_sse(event: str, data) -> bytes:
+    """Format one Server-Sent Events message"""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+def get_jobstatus() -> list:
+    """Current job status table, sent to browsers when they connect and after every job event"""
+    from api.crud import phone_data as crud
+
+    return jsonable_encoder(crud.get_all_jobstatus())
+
+
+class EventBroadcaster:
+    """Fans out events from one shared Redis subscription to every browser connected to /phonedata/events.
+
+    A single background thread owns the subscription, and while browsers are connected it also reads the RQ queue
+    depth every QUEUE_STATS_INTERVAL seconds.  The cost of the Redis and database work doesn't depend on how many
+    browsers are connected, each browser only reads from its own asyncio queue.
+    """
+    def __init__(self):
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.scraped_phones = 0  # phones reported by scrape_progress events since the last queue event
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a browser, called from the event loop
+
+        Returns:
+            asyncio.Queue -- queue receiving formatted Server-Sent Events messages
+        """
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.add((asyncio.get_event_loop(), queue))
+
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='event-broadcaster', daemon=True)
+                self.thread.start()
+
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self.lock:
+            self.subscribers = {subscriber for subscriber in self.subscribers if subscriber[1] is not queue}
+
+    def broadcast(self, message: bytes):
+        """Send a formatted message to every browser, called from the broadcaster thread"""
+        with self.lock:
+            subscribers = list(self.subscribers)
+
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self.put, queue, message)
+
+    @staticmethod
+    def put(queue: asyncio.Queue, message: bytes):
+        if not queue.full():
+            queue.put_nowait(message)
+
+    def handle_message(self, payload: bytes):
+        """Forward an event published by publish_event"""
+        message = orjson.loads(payload)
+        event, data = message['event'], message['data']
+
+        if event == 'scrape_progress':
+            self.scraped_phones += data.get('phones', 0)
+
+        self.broadcast(format_sse(event, data))
+
+        # the job status table is read once here rather than by every browser
+        if event == 'job':
+            self.broadcast(format_sse('jobstatus', get_jobstatus()))
+
+    def broadcast_queue_stats(self, connection: Redis, elapsed: float):
+        """Send RQ phone scraper queue depth and phones scraped per second since the last queue event"""
+        from rq import Queue
+
+        q = Queue('phonescraper', connection=connection)
+        self.broadcast(format_sse('queue', {
+            'current_size': len(q),
+            'started_count': len(q.started_job_registry),
+            'phones_per_second': round(self.scraped_phones / elapsed, 1) if elapsed > 0 else 0,
+        }))
+        self.scraped_phones = 0
+
+    def run(self):
+        """Broadcaster thread, reconnects to Redis if the connection is lost"""
+        while True:
+            try:
+                connection = get_redis()
+                pubsub = connection.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(EVENTS_CHANNEL)
+                last_stats = time.monotonic()
+
+                while True:
+                    message = pubsub.get_message(timeout=1)
+                    if message is not None:
+                        self.handle_message(message['data'])
+
+                    elapsed = time.monotonic() - last_stats
+                    if elapsed >= QUEUE_STATS_INTERVAL:
+                        if self.subscribers:
+                            self.broadcast_queue_stats(connection, elapsed)
+                        last_stats = time.monotonic()
+            except Exception as e:
+                logger.error(f"event broadcaster error, reconnecting to redis: {e}")
+                time.sleep(5)
+
+
+broadcaster = EventBroadcaster()
@@ -4,11 +4,15 @@ from fastapi import FastAPI, BackgroundTasks
 from fastapi.responses import RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 import atexit
 
 from api.Config import config
-from api.db import database
+from api.db import database, init_db
+
+# create or upgrade the database before the scheduler reads its settings
+init_db()
+
+from api.Cache import PrecompressedGZipMiddleware
 from api.scheduler.Scheduler import scheduler
 
 api = FastAPI()
@@ -24,9 +28,11 @@ api.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "ETag"],
 )
 
-api.add_middleware(GZipMiddleware, minimum_size=1000)
+# cached phone data responses are already gzipped
+api.add_middleware(PrecompressedGZipMiddleware, minimum_size=1000)
 
 logger = logging.getLogger("api")
 
@@ -1,82 +1,702 @@
-import sys
-from datetime import datetime
+import json, re, sys
+from datetime import datetime, timedelta
 
 import logging
+from sqlalchemy import DateTime, String, and_, case, cast, func, or_, select
 from sqlalchemy.orm import Session, joinedload, contains_eager
 from typing import List
 
-from api.db.database import SessionLocal
+from api.Events import publish_event
+from api.db.database import session_scope
+from api.db.search import refresh_search_index, search_index_available, search_devicenames
+from api.db.upsert import ChangeVersion, bulk_upsert, chunks
 from api.models import phone_data as models
 
 logger = logging.getLogger('api')
 
+# API field name to SQL expression, used to push filtering and sorting of the phone data pages down into SQL
+
+PHONE_INFO_FIELDS = {
+    'dname': models.Phone.devicename,
+    'fw': models.Phone.firmware,
+    'ipv4': models.Phone.ipv4,
+    'fdate': models.Phone.first_seen_reg,
+    'ldate': models.Phone.last_seen_reg,
+    'regstamp': models.Phone.registration_time,
+    'cluster': models.Phone.cluster,
+    'prot': models.Phone.Protocol,
+    'model': func.replace(models.Phone.Model, 'Cisco ', ''),
+    'dpool': models.Phone.devicepool,
+    'dcss': models.Phone.devicecss,
+    'descr': models.Phone.description,
+    'em_profile': models.Phone.em_profile,
+    'em_time': models.Phone.em_time,
+}
+
+# phones that were never scraped show the CUCM model and IP address
+PHONE_SCRAPER_FIELDS = {column.key: getattr(models.PhoneScraper, column.key) for column in models.PhoneScraper.__table__.columns}
+PHONE_SCRAPER_FIELDS.update({
+    'devicename': models.Phone.devicename,
+    'model': case([(models.PhoneScraper.devicename == None, models.Phone.Model)], else_=models.PhoneScraper.model),
+    'ip_address': case([(models.PhoneScraper.devicename == None, models.Phone.ipv4)], else_=models.PhoneScraper.ip_address),
+})
+
+# scraped fields override CUCM fields with the same name
+PHONE_COMBINED_FIELDS = dict(PHONE_INFO_FIELDS)
+PHONE_COMBINED_FIELDS.update({key: value for key, value in PHONE_SCRAPER_FIELDS.items() if key not in ['devicename', 'date_modified', 'ip_address', 'cucm_firmware']})
+PHONE_COMBINED_FIELDS.update({
+    'model': case([(models.PhoneScraper.devicename == None, func.replace(models.Phone.Model, 'Cisco ', ''))], else_=models.PhoneScraper.model),
+    'ip_address': models.PhoneScraper.ip_address,
+    'last_scraped': models.PhoneScraper.date_modified,
+})
+
+
+def get_filter_clauses(filters: list = None) -> list:
+    """Convert (column, value) filters into SQL clauses matching rows where the column contains value, case insensitive"""
+    clauses = []
+    for column, value in filters or []:
+        value = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        clauses.append(cast(column, String).like(f"%{value}%", escape='\\'))
+
+    return clauses
+
+
+def get_order_by_clauses(sort: list = None) -> list:
+    """Convert (column, descending) sorts into SQL order by clauses"""
+    order_by = [column.desc() if descending else column.asc() for column, descending in sort or []]
+
+    # devicename is unique, it keeps pages stable when the sort columns have duplicate values
+    return order_by + [models.Phone.devicename]
+
+
+def get_page(query, filters: list = None, sort: list = None, limit: int = None, offset: int = 0) -> tuple:
+    """Apply filters, sorting and limit/offset to a query in SQL
+
+    Arguments:
+        query {Query} -- query returning models.Phone rows
+
+    Keyword Arguments:
+        filters {list} -- list of (column, value) tuples, rows are kept when the column contains value, case insensitive (default: {None})
+        sort {list} -- list of (column, descending) tuples (default: {None})
+        limit {int} -- max number of rows to return, all rows are returned if None (default: {None})
+        offset {int} -- number of rows to skip (default: {0})
+
+    Returns:
+        tuple -- (total count of rows matching the filters, list of rows in the page)
+    """
+    query = query.filter(*get_filter_clauses(filters))
+
+    total_count = query.order_by(None).count()
+
+    query = query.order_by(*get_order_by_clauses(sort))
+
+    if offset:
+        query = query.offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+
+    return total_count, query.all()
+
+
+def format_datetime(column):
+    """SQL expression formatting a datetime column as '%m/%d/%y %H:%M:%S' the way the API returns dates, NULL becomes ''"""
+    # SQLite strftime has no 2 digit year
+    formatted = func.strftime('%m/%d/', column, type_=String) + func.substr(func.strftime('%Y', column), 3, 2) + func.strftime(' %H:%M:%S', column)
+
+    return func.coalesce(formatted, '')
+
+# data version
+
+PHONE_DATA_VERSION = 'phone_data'
+
+def get_data_version(name: str = PHONE_DATA_VERSION, db: Session = None) -> int:
+    """query the current generation of a data set, 0 if it was never written
+
+    Keyword Arguments:
+        name {str} -- data set name (default: {PHONE_DATA_VERSION})
+
+    Returns:
+        int -- generation counter
+    """
+    with session_scope(db) as db:
+        generation = db.query(models.DataVersion.generation).filter(models.DataVersion.name == name).scalar()
+
+        return generation or 0
+
+
+def bump_data_version(db: Session, name: str = PHONE_DATA_VERSION) -> int:
+    """Increment the generation of a data set inside the caller's transaction, so it is only visible once the data is committed.
+    Writers are serialized by the database write lock, so each write gets its own increasing generation
+
+    Arguments:
+        db {Session} -- database session writing to the data set
+
+    Keyword Arguments:
+        name {str} -- data set name (default: {PHONE_DATA_VERSION})
+
+    Returns:
+        int -- new generation, also used to stamp the change_version of the rows written
+    """
+    table = models.DataVersion.__table__
+    connection = db.connection()
+
+    result = connection.execute(table.update().where(table.c.name == name).values(generation=table.c.generation + 1))
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(name=name, generation=1))
+
+    return connection.execute(select([table.c.generation]).where(table.c.name == name)).scalar()
+
+# columns rewritten by every sync, a row that only changed in these columns is not sent again by the delta feed
+PHONE_CHANGE_IGNORED_COLUMNS = ['last_seen_reg']
+PHONESCRAPER_CHANGE_IGNORED_COLUMNS = ['date_modified', 'cucm_firmware']
+
+# statistics
+
+# /phonedata/stats dimension name to the column phones are counted by
+STATS_DIMENSIONS = {
+    'model': func.replace(models.Phone.Model, 'Cisco ', ''),
+    'firmware': models.Phone.firmware,
+    'cluster': models.Phone.cluster,
+    'devicepool': models.Phone.devicepool,
+    'protocol': models.Phone.Protocol,
+    'vlan': models.PhoneScraper.op_vlan,
+    'itl': models.PhoneScraper.ITL,
+}
+
+
+def compute_phone_stats(db: Session) -> dict:
+    """Count phones per value of each STATS_DIMENSIONS column with GROUP BY queries.
+    Phones that were never scraped are counted under a null value for the scraped dimensions
+
+    Arguments:
+        db {Session} -- database session
+
+    Returns:
+        dict -- {"total": phone count, "scraped": scraped phone count, dimension: [{"value": value, "count": count}], most common first}
+    """
+    connection = db.connection()
+    from_join = models.Phone.__table__.outerjoin(models.PhoneScraper.__table__)
+
+    total_count, scraped_count = connection.execute(
+        select([func.count(), func.count(models.PhoneScraper.devicename)]).select_from(from_join)
+    ).first()
+    stats = {'total': total_count, 'scraped': scraped_count}
+
+    for name, column in STATS_DIMENSIONS.items():
+        count = func.count().label('count')
+        query = select([column.label('value'), count]).select_from(from_join).group_by(column).order_by(count.desc(), column)
+        stats[name] = [{'value': value, 'count': value_count} for value, value_count in connection.execute(query)]
+
+    return stats
+
+
+def refresh_phone_stats(db: Session = None) -> dict:
+    """Compute phone statistics and store them for the current data generation, called by the writers after each sync
+    so the next /phonedata/stats request doesn't have to
+
+    Returns:
+        dict -- statistics, see compute_phone_stats
+    """
+    with session_scope(db) as db:
+        # read the generation first, statistics computed from newer data are only recomputed once more
+        generation = get_data_version(db=db)
+        stats = compute_phone_stats(db)
+
+        db.merge(models.StatsSnapshot(name=PHONE_DATA_VERSION, generation=generation, data=json.dumps(stats)))
+        db.commit()
+
+        return stats
+
+
+def get_phone_stats(db: Session = None) -> dict:
+    """query phone statistics stored for the current data generation, computing them if the data changed since
+
+    Returns:
+        dict -- statistics, see compute_phone_stats
+    """
+    with session_scope(db) as db:
+        snapshot = db.query(models.StatsSnapshot).get(PHONE_DATA_VERSION)
+        if snapshot is not None and snapshot.generation == get_data_version(db=db):
+            return json.loads(snapshot.data)
+
+        return refresh_phone_stats(db=db)
+
 # phone data
 
-def get_all_phone_data(db: Session = SessionLocal()):
+def get_phone_data_page(filters: list = None, sort: list = None, limit: int = None, offset: int = 0, db: Session = None) -> tuple:
+    """query a filtered and sorted page of models.Phone, see get_page for arguments
+
+    Returns:
+        tuple -- (total count of rows matching the filters, list of rows in the page)
+    """
+
+    with session_scope(db) as db:
+        return get_page(db.query(models.Phone), filters, sort, limit, offset)
+
+def get_all_phone_data(db: Session = None):
     """query all data from models.Phone"""
 
-    results = db.query(models.Phone).all()
+    with session_scope(db) as db:
+        return db.query(models.Phone).all()
 
-    db.close()
-    return results
+def get_changed_devicenames(db: Session, model, generation: int) -> List[str]:
+    """query the device names of model rows new or changed by the write stamped with generation, see bump_data_version"""
+    return [devicename for devicename, in db.query(model.devicename).filter(model.change_version == generation)]
 
-def merge_phone_data(phone_list: List[models.Phone], db: Session = SessionLocal()):
+def merge_phone_data(phone_list: List[models.Phone], db: Session = None):
     """update models.Phone with list of models"""
 
-    for phone in phone_list:
-        db.merge(phone)
-    
-    db.commit()
-    db.close()
+    with session_scope(db) as db:
+        generation = bump_data_version(db)
+        bulk_upsert(db, models.Phone, phone_list, change_version=ChangeVersion('change_version', generation, PHONE_CHANGE_IGNORED_COLUMNS))
 
+        devicenames = [phone.devicename for phone in phone_list]
+        # phones that come back are no longer deleted
+        for chunk in chunks(devicenames, 500):
+            db.query(models.PhoneTombstone).filter(models.PhoneTombstone.devicename.in_(chunk)).delete(synchronize_session=False)
 
-def get_phone_data_for_phonescraper(cluster_name: str = None, db: Session = SessionLocal()):
+        refresh_search_index(db, get_changed_devicenames(db, models.Phone, generation))
+        db.commit()
+
+
+def delete_phone_data(devicenames: List[str], db: Session = None):
+    """delete phones and their phone scraper data, a tombstone is kept for each phone so delta feed clients remove them too
+
+    Arguments:
+        devicenames {List[str]} -- device names of the phones to delete
+    """
+    with session_scope(db) as db:
+        generation = bump_data_version(db)
+        refresh_search_index(db, devicenames, reinsert=False)
+
+        for chunk in chunks(list(devicenames), 500):
+            db.query(models.PhoneScraper).filter(models.PhoneScraper.devicename.in_(chunk)).delete(synchronize_session=False)
+            db.query(models.Phone).filter(models.Phone.devicename.in_(chunk)).delete(synchronize_session=False)
+
+        bulk_upsert(db, models.PhoneTombstone, [models.PhoneTombstone(devicename=devicename, change_version=generation) for devicename in devicenames])
+        db.commit()
+
+
+def get_phone_data_for_phonescraper(cluster_name: str = None, db: Session = None):
     """query phone data to be used by phone scraper"""
     
-    query = db.query(models.Phone)
+    with session_scope(db) as db:
+        query = db.query(models.Phone)
 
-    if cluster_name != None:
-        query = query.filter(models.Phone.cluster == cluster_name)
-        
-    results = query.all()
+        if cluster_name != None:
+            query = query.filter(models.Phone.cluster == cluster_name)
+            
+        return query.all()
 
-    db.close()
-    
-    return results
+
+def get_changed_phone_data_for_phonescraper(max_age: timedelta, cluster_name: str = None, db: Session = None):
+    """query phone data to be used by an incremental phone scrape.
+    Only returns phones that have never been scraped, re-registered or changed IP/firmware since they were last scraped,
+    or were last scraped more than max_age ago
+
+    Arguments:
+        max_age {timedelta} -- phones scraped longer ago than this are always returned
+
+    Keyword Arguments:
+        cluster_name {str} -- only return phones from this cluster (default: {None})
+    """
+    stale_time = datetime.now() - max_age
+
+    with session_scope(db) as db:
+        query = db.query(models.Phone).outerjoin(models.Phone.phonescrape).filter(or_(
+            models.PhoneScraper.devicename == None,
+            models.PhoneScraper.date_modified == None,
+            models.PhoneScraper.date_modified < stale_time,
+            models.Phone.registration_time > models.PhoneScraper.date_modified,
+            # phones whose IP wasn't found on their webpages can't be compared, they are rescraped after max_age
+            and_(models.PhoneScraper.ip_address != None, models.Phone.ipv4.is_distinct_from(models.PhoneScraper.ip_address)),
+            # rows scraped before cucm_firmware was stored have NULL and are rescraped once
+            models.Phone.firmware.is_distinct_from(models.PhoneScraper.cucm_firmware),
+        ))
+
+        if cluster_name != None:
+            query = query.filter(models.Phone.cluster == cluster_name)
+
+        return query.all()
 
 # phone scraper
 
+def get_combined_data_select(fields: list = None, filters: list = None, sort: list = None) -> tuple:
+    """Build SQLAlchemy Core selects of combined phone and phone scraper data, columns are labelled by API field name
+    and dates are formatted in SQL
 
-def get_all_scraper_data(db: Session = SessionLocal()):
-    """query all phone scrape data from models"""
+    Keyword Arguments:
+        fields {list} -- PHONE_COMBINED_FIELDS names to select, all fields if None (default: {None})
+        filters {list} -- list of (column, value) tuples, see get_page (default: {None})
+        sort {list} -- list of (column, descending) tuples (default: {None})
+
+    Returns:
+        tuple -- (count select, row select)
+    """
+    scraped = models.PhoneScraper.devicename != None
+
+    columns = []
+    for name in fields or PHONE_COMBINED_FIELDS:
+        column = PHONE_COMBINED_FIELDS[name]
+        if isinstance(column.type, DateTime):
+            column = format_datetime(column)
+            # scraped fields are null for phones that were never scraped
+            if name == 'last_scraped':
+                column = case([(scraped, column)])
+        columns.append(column.label(name))
+
+    from_join = models.Phone.__table__.outerjoin(models.PhoneScraper.__table__)
+
+    count_query = select([func.count()]).select_from(from_join)
+    query = select(columns).select_from(from_join).order_by(*get_order_by_clauses(sort))
+    for clause in get_filter_clauses(filters):
+        count_query = count_query.where(clause)
+        query = query.where(clause)
+
+    return count_query, query
+
+
+def get_combined_data_rows(filters: list = None, sort: list = None, limit: int = None, offset: int = 0, db: Session = None) -> tuple:
+    """query a filtered and sorted page of combined phone and phone scraper data with SQLAlchemy Core, see get_page for arguments.
+    Dates are formatted in SQL, rows are plain dicts keyed by API field name ready to be serialized without building models
+
+    Returns:
+        tuple -- (total count of rows matching the filters, list of row dicts in the page)
+    """
+    count_query, query = get_combined_data_select(filters=filters, sort=sort)
+
+    with session_scope(db) as db:
+        connection = db.connection()
+
+        total_count = connection.execute(count_query).scalar()
+
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
 
-    results = db.query(models.Phone).options(
-        joinedload(models.Phone.phonescrape),
-    ).all()
+        result = connection.execute(query)
+        keys = list(result.keys())
 
-    db.close()
+        return total_count, [dict(zip(keys, row)) for row in result]
+
+
+def stream_combined_data_rows(fields: list = None, filters: list = None, sort: list = None, batch_size: int = 1000):
+    """Generator of combined phone and phone scraper data for exports, see get_combined_data_select for arguments.
+    Rows are fetched from the cursor batch_size at a time so memory stays flat whatever the row count.
+    Uses its own session, it is consumed after the request handler has returned
+
+    Keyword Arguments:
+        batch_size {int} -- rows fetched per batch (default: {1000})
+
+    Yields:
+        list -- batch of row tuples in the order of fields
+    """
+    _, query = get_combined_data_select(fields=fields, filters=filters, sort=sort)
+
+    with session_scope() as db:
+        result = db.connection().execution_options(stream_results=True).execute(query)
+        try:
+            while True:
+                rows = result.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            result.close()
+
+# lookup key type to the indexed PHONE_COMBINED_FIELDS it is matched against
+LOOKUP_FIELDS = {
+    'ip': ['ipv4', 'ip_address'],
+    'dn': ['dn'],
+    'sn': ['sn'],
+    'mac': ['dname'],
+}
+
+# device name prefixes used by CUCM for phones and ATA ports, followed by the MAC address
+MAC_DEVICENAME_PREFIXES = ['SEP', 'ATA']
+
+
+def mac_to_devicenames(mac: str) -> list:
+    """Convert a MAC address in any common format (00:11:22:33:44:55, 0011.2233.4455, 001122334455) to the
+    device names it can have in CUCM, an empty list if it isn't a MAC address"""
+    mac = re.sub('[^0-9A-Fa-f]', '', mac).upper()
+    if len(mac) != 12:
+        return []
+
+    return [prefix + mac for prefix in MAC_DEVICENAME_PREFIXES]
+
+
+def lookup_combined_data(key_type: str, keys: list, db: Session = None) -> dict:
+    """query combined phone and phone scraper data by IP address, DN, serial number or MAC address.
+    Keys are matched exactly through indexed columns, in chunks of 500 to stay below the SQLite bind variable limit
+
+    Arguments:
+        key_type {str} -- one of LOOKUP_FIELDS
+        keys {list} -- values to look up
+
+    Returns:
+        dict -- key to list of matching row dicts, see get_combined_data_rows, an empty list when nothing matches
+    """
+    names = LOOKUP_FIELDS[key_type]
+    results = {key: [] for key in keys}
+
+    # MAC addresses are looked up by device name
+    if key_type == 'mac':
+        lookup_keys = {devicename: key for key in results for devicename in mac_to_devicenames(key)}
+    else:
+        lookup_keys = {key: key for key in results}
+
+    # no ordering, so SQLite drives the query from the lookup column indexes
+    _, query = get_combined_data_select()
+    query = query.order_by(None)
+
+    with session_scope(db) as db:
+        connection = db.connection()
+
+        for chunk in chunks(list(lookup_keys), 500):
+            clauses = []
+            for name in names:
+                column = PHONE_COMBINED_FIELDS[name]
+                if column.table is models.PhoneScraper.__table__:
+                    # a filter on the outer joined table can't use its index, look up the device names first
+                    clauses.append(models.Phone.devicename.in_(select([models.PhoneScraper.devicename]).where(column.in_(chunk))))
+                else:
+                    clauses.append(column.in_(chunk))
+
+            chunk_query = query.where(or_(*clauses))
+            for row in connection.execute(chunk_query):
+                row = dict(row)
+                for value in {row[name] for name in names}:
+                    if value in lookup_keys:
+                        results[lookup_keys[value]].append(row)
 
     return results
 
+def get_combined_data_changes(since: int = 0, db: Session = None) -> tuple:
+    """query combined phone and phone scraper data that changed after a data generation, for clients keeping a local copy
 
-def merge_phonescraper_data(phonescraper_data: models.PhoneScraper, db: Session = SessionLocal()):
-    db.merge(phonescraper_data)
-    db.commit()
-    db.close()
+    Keyword Arguments:
+        since {int} -- generation returned by the previous call, 0 returns every phone (default: {0})
 
+    Returns:
+        tuple -- (current generation to pass as since next time, list of changed row dicts, list of deleted device names)
+    """
+    with session_scope(db) as db:
+        # read the generation first, rows committed while querying are only sent once more next time
+        generation = get_data_version(db=db)
 
-def merge_phonescraper_data_list(scraper_list: List[models.PhoneScraper], db: Session = SessionLocal()):
-    """update models.Phone with list of models"""
+        _, query = get_combined_data_select()
+        connection = db.connection()
+
+        if since > 0:
+            # either side of the join may have changed, look up the device names through each table's index
+            changed_devicenames = select([models.Phone.devicename]).where(models.Phone.change_version > since).union(
+                select([models.PhoneScraper.devicename]).where(models.PhoneScraper.change_version > since)
+            )
+            query = query.where(models.Phone.devicename.in_(changed_devicenames))
+
+            deleted_query = select([models.PhoneTombstone.devicename]).where(models.PhoneTombstone.change_version > since)
+            deleted_devicenames = [row[0] for row in connection.execute(deleted_query)]
+        else:
+            deleted_devicenames = []
+
+        return generation, [dict(row) for row in connection.execute(query)], deleted_devicenames
+
+# PHONE_COMBINED_FIELDS searched with LIKE when SQLite has no FTS5, the same columns as the full text search table
+SEARCH_FIELDS = ['dname', 'descr', 'dpool', 'em_profile', 'dn', 'CDP_Neighbor_ID', 'LLDP_Neighbor_ID']
+
+
+def search_combined_data(query: str, limit: int = None, offset: int = 0, db: Session = None) -> tuple:
+    """Search combined phone and phone scraper data by description, device name, device pool, extension mobility profile,
+    DN and CDP/LLDP neighbor.  Every word must match the start of a word in any of those fields, best matches first.
+    Falls back to LIKE queries ordered by device name if the full text search table isn't available
+
+    Arguments:
+        query {str} -- words to search for
+
+    Keyword Arguments:
+        limit {int} -- max number of rows to return, all rows are returned if None (default: {None})
+        offset {int} -- number of rows to skip (default: {0})
+
+    Returns:
+        tuple -- (total count of matching rows, list of row dicts, see get_combined_data_rows)
+    """
+    count_query, select_query = get_combined_data_select()
+
+    with session_scope(db) as db:
+        connection = db.connection()
+
+        if not search_index_available(db):
+            for word in query.split():
+                word_clause = or_(*get_filter_clauses([(PHONE_COMBINED_FIELDS[name], word) for name in SEARCH_FIELDS]))
+                count_query = count_query.where(word_clause)
+                select_query = select_query.where(word_clause)
+
+            total_count = connection.execute(count_query).scalar()
+            if offset:
+                select_query = select_query.offset(offset)
+            if limit is not None:
+                select_query = select_query.limit(limit)
+
+            return total_count, [dict(row) for row in connection.execute(select_query)]
+
+        total_count, devicenames = search_devicenames(db, query, limit=limit, offset=offset)
+
+        # fetch the matching phones, then put them back in rank order
+        select_query = select_query.order_by(None).column(models.Phone.devicename.label('search_devicename'))
+        rows = {}
+        for chunk in chunks(devicenames, 500):
+            for row in connection.execute(select_query.where(models.Phone.devicename.in_(chunk))):
+                row = dict(row)
+                rows[row.pop('search_devicename')] = row
+
+        return total_count, [rows[devicename] for devicename in devicenames if devicename in rows]
+
+def get_scraper_data_page(filters: list = None, sort: list = None, limit: int = None, offset: int = 0, db: Session = None) -> tuple:
+    """query a filtered and sorted page of models.Phone joined with models.PhoneScraper, see get_page for arguments
+
+    Returns:
+        tuple -- (total count of rows matching the filters, list of rows in the page)
+    """
+
+    with session_scope(db) as db:
+        query = db.query(models.Phone).outerjoin(models.Phone.phonescrape).options(
+            contains_eager(models.Phone.phonescrape),
+        )
+        return get_page(query, filters, sort, limit, offset)
+
+def get_all_scraper_data(db: Session = None):
+    """query all phone scrape data from models"""
+
+    with session_scope(db) as db:
+        return db.query(models.Phone).options(
+            joinedload(models.Phone.phonescrape),
+        ).all()
+
+
+def merge_phonescraper_data(phonescraper_data: models.PhoneScraper, db: Session = None):
+    merge_phonescraper_data_list([phonescraper_data], db=db)
+
+
+def merge_phonescraper_data_list(scraper_list: List[models.PhoneScraper], db: Session = None):
+    """update models.PhoneScraper with list of models in a single transaction, nothing is saved if any row fails"""
+
+    with session_scope(db) as db:
+        generation = bump_data_version(db)
+        bulk_upsert(db, models.PhoneScraper, scraper_list, change_version=ChangeVersion('change_version', generation, PHONESCRAPER_CHANGE_IGNORED_COLUMNS))
+        refresh_search_index(db, get_changed_devicenames(db, models.PhoneScraper, generation))
+        db.commit()
+
+# AXL devices
+
+AXL_DEVICE_FIELDS = ['uuid', 'name', 'description', 'devicepool', 'css', 'em_profile', 'login_time']
+
+
+def get_axl_devices(cluster_name: str, db: Session = None) -> List[dict]:
+    """query the stored AXL fields of every phone in a cluster, as flat dicts like CUCM_AXL_API.get_phones_sql returns"""
+
+    with session_scope(db) as db:
+        query = db.query(*[getattr(models.AXLDevice, field) for field in AXL_DEVICE_FIELDS]).filter(models.AXLDevice.cluster == cluster_name)
+
+        return [dict(zip(AXL_DEVICE_FIELDS, row)) for row in query]
+
+
+def get_axl_change_cursor(cluster_name: str, db: Session = None) -> models.AXLChangeCursor:
+    """query the AXL listChange cursor of a cluster, None if the cluster was never fully synced"""
+
+    with session_scope(db) as db:
+        cursor = db.query(models.AXLChangeCursor).get(cluster_name)
+        if cursor is not None:
+            db.expunge(cursor)
+
+        return cursor
+
+
+def make_axl_device(cluster_name: str, axl_phone: dict) -> models.AXLDevice:
+    return models.AXLDevice(cluster=cluster_name, **{field: axl_phone[field] for field in AXL_DEVICE_FIELDS})
+
+
+def replace_axl_devices(cluster_name: str, axl_phones: List[dict], cursor: dict = None, db: Session = None) -> List[str]:
+    """replace the stored AXL devices of a cluster after a full sync
+
+    Arguments:
+        cluster_name {str} -- friendly name of cluster
+        axl_phones {List[dict]} -- every phone in the cluster, see CUCM_AXL_API.get_phones_sql
+
+    Keyword Arguments:
+        cursor {dict} -- listChange cursor read before the full sync, None if listChange is not available (default: {None})
+
+    Returns:
+        List[str] -- device names of stored phones that are missing from axl_phones, removed or renamed since the last sync
+    """
+    with session_scope(db) as db:
+        old_names = {name.upper() for name, in db.query(models.AXLDevice.name).filter(models.AXLDevice.cluster == cluster_name)}
+
+        db.query(models.AXLDevice).filter(models.AXLDevice.cluster == cluster_name).delete(synchronize_session=False)
+        bulk_upsert(db, models.AXLDevice, [make_axl_device(cluster_name, axl_phone) for axl_phone in axl_phones if axl_phone['uuid'] != ""])
+
+        db.merge(models.AXLChangeCursor(
+            cluster=cluster_name,
+            queue_id=None if cursor is None else cursor['queueId'],
+            next_change_id=None if cursor is None else cursor['nextStartChangeId'],
+            last_full_sync=datetime.now(),
+        ))
+
+        gone_names = old_names - {axl_phone['name'].upper() for axl_phone in axl_phones}
+        removed_names = []
+        for chunk in chunks(list(gone_names), 500):
+            removed_names.extend(name for name, in db.query(models.Phone.devicename).filter(
+                models.Phone.cluster == cluster_name, models.Phone.devicename.in_(chunk)
+            ))
+
+        db.commit()
+
+        return removed_names
+
+
+def apply_axl_changes(cluster_name: str, changed_phones: List[dict], removed_uuids: List[str], cursor: dict, db: Session = None) -> List[str]:
+    """apply AXL listChange changes to the stored AXL devices of a cluster and move the cluster change cursor
+
+    Arguments:
+        cluster_name {str} -- friendly name of cluster
+        changed_phones {List[dict]} -- added and updated phones, see CUCM_AXL_API.get_phones_by_uuid
+        removed_uuids {List[str]} -- uuids of removed phones
+        cursor {dict} -- listChange cursor returned with the changes
+
+    Returns:
+        List[str] -- device names of stored phones that no longer exist in the cluster, removed or renamed
+    """
+    with session_scope(db) as db:
+        uuids = [axl_phone['uuid'] for axl_phone in changed_phones] + list(removed_uuids)
+        old_names = set()
+        for chunk in chunks(uuids, 500):
+            old_names.update(name.upper() for name, in db.query(models.AXLDevice.name).filter(models.AXLDevice.uuid.in_(chunk)))
+
+        for chunk in chunks(list(removed_uuids), 500):
+            db.query(models.AXLDevice).filter(models.AXLDevice.uuid.in_(chunk)).delete(synchronize_session=False)
+        bulk_upsert(db, models.AXLDevice, [make_axl_device(cluster_name, axl_phone) for axl_phone in changed_phones])
+
+        db.query(models.AXLChangeCursor).filter(models.AXLChangeCursor.cluster == cluster_name).update(
+            {'queue_id': cursor['queueId'], 'next_change_id': cursor['nextStartChangeId']}, synchronize_session=False
+        )
+
+        # a name can come back under a new uuid, ex. a phone deleted and added again
+        gone_names = old_names - {axl_phone['name'].upper() for axl_phone in changed_phones}
+        removed_names = []
+        for chunk in chunks(list(gone_names), 500):
+            removed_names.extend(name for name, in db.query(models.Phone.devicename).filter(
+                models.Phone.cluster == cluster_name, models.Phone.devicename.in_(chunk)
+            ))
+
+        db.commit()
+
+        return removed_names
 
-    for scraped_data in scraper_list:
-        db.merge(scraped_data)
-    
-    db.commit()
-    db.close()
 
 # Job Status
 
-def startjob(jobname: str, db: Session = SessionLocal()):
+def startjob(jobname: str, db: Session = None):
     """Insert/Update job start time into job status table.
     Called each time a scheduled or manual job is run to update the 'start' timestamp
 
@@ -86,28 +706,37 @@ def startjob(jobname: str, db: Session = SessionLocal()):
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     logger.info(f"Starting {jobname} at {current_time}")
     job_update = models.JobStatus(jobname=jobname, laststarttime=current_time, result="running job..")
-    db.merge(job_update)
-    db.commit()
-    db.close()
 
+    with session_scope(db) as db:
+        db.merge(job_update)
+        db.commit()
 
-def endjob(jobname: str, db: Session = SessionLocal()):
+    publish_event('job', {'jobname': jobname, 'state': 'started', 'time': current_time})
+
+
+def endjob(jobname: str, summary: str = None, db: Session = None):
     """Insert/Update job end time into job status table.
     Called each time a scheduled or manual job ends to update the 'finished' timestamp
 
     Arguments:
         jobname {str} -- name of job
+
+    Keyword Arguments:
+        summary {str} -- result details appended to the finished timestamp, ex. success/failure counts (default: {None})
     """
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    result = f"Finished at {current_time}" if summary is None else f"Finished at {current_time} - {summary}"
     logger.info(f"Finished {jobname} at {current_time}")
-    job_update = models.JobStatus(jobname=jobname, result=f"Finished at {current_time}")
-    db.merge(job_update)
-    db.commit()
-    db.close()
+    job_update = models.JobStatus(jobname=jobname, result=result)
+
+    with session_scope(db) as db:
+        db.merge(job_update)
+        db.commit()
+
+    publish_event('job', {'jobname': jobname, 'state': 'finished', 'time': current_time, 'result': result})
 
-def get_all_jobstatus(db: Session = SessionLocal()):
+def get_all_jobstatus(db: Session = None):
     """query all data from models.JobStatus"""
 
-    result = db.query(models.JobStatus).all()
-    db.close()
-    return result
\ No newline at end of file
+    with session_scope(db) as db:
+        return db.query(models.JobStatus).all()
\ No newline at end of file
@@ -8,119 +8,115 @@ from typing import List
 
 from api.Config import config
 
-from api.db.database import SessionLocal
+from api.db.database import session_scope
 
 from api.models import settings_management as models
 
 logger = logging.getLogger('api')
 
-def get_cucm_clusters(db: Session = SessionLocal()):
-    results = db.query(models.CUCM_Cluster).all()
+def get_cucm_clusters(db: Session = None):
+    with session_scope(db) as db:
+        results = db.query(models.CUCM_Cluster).all()
 
-    db.close()
+        # detach before decrypting so the plain text password can never be flushed back to the database
+        for result in results:
+            db.expunge(result)
 
     for result in results:
         result.pd = config.key.decrypt(result.pd).decode()
 
     return results
 
-def delete_cucm_cluster(id: int, db: Session = SessionLocal()):
+def delete_cucm_cluster(id: int, db: Session = None):
 
-    db.query(models.CUCM_Cluster).filter(models.CUCM_Cluster.id==id).delete()
+    with session_scope(db) as db:
+        db.query(models.CUCM_Cluster).filter(models.CUCM_Cluster.id==id).delete()
 
-    db.commit()
-    db.close()
+        db.commit()
 
 
-def delete_cucm_cluster_name(cluster_name: str, db: Session = SessionLocal()):
+def delete_cucm_cluster_name(cluster_name: str, db: Session = None):
 
-    db.query(models.CUCM_Cluster).filter(models.CUCM_Cluster.cluster_name==cluster_name).delete()
+    with session_scope(db) as db:
+        db.query(models.CUCM_Cluster).filter(models.CUCM_Cluster.cluster_name==cluster_name).delete()
 
-    db.commit()
-    db.close()
+        db.commit()
 
 
-def merge_cucm_cluster(cucm_cluster: models.CUCM_Cluster, db: Session = SessionLocal()):
+def merge_cucm_cluster(cucm_cluster: models.CUCM_Cluster, db: Session = None):
     # write CA certificate file   
     cucm_cluster.pd = config.key.encrypt(cucm_cluster.pd.encode())
 
-    db.merge(cucm_cluster)
-    db.commit()
-    db.close()
+    with session_scope(db) as db:
+        db.merge(cucm_cluster)
+        db.commit()
 
 
 
-def get_all_cucm_users(db: Session = SessionLocal()):
-    try:
-        results = db.query(models.CUCM_Users).all()
-    except sqlalchemy.orm.exc.NoResultFound:
-        return None
-
-    db.close()
-    
-    return results
-
-
-def merge_cucm_user(userid: str, db: Session = SessionLocal()):
+def get_all_cucm_users(db: Session = None):
+    with session_scope(db) as db:
+        try:
+            return db.query(models.CUCM_Users).all()
+        except sqlalchemy.orm.exc.NoResultFound:
+            return None
 
-    db.merge(models.CUCM_Users(userid=userid))
 
-    db.commit()
-    db.close()
+def merge_cucm_user(userid: str, db: Session = None):
 
+    with session_scope(db) as db:
+        db.merge(models.CUCM_Users(userid=userid))
 
-def delete_cucm_user(userid: str, db: Session = SessionLocal()):
-    try:
-        db.query(models.CUCM_Users).filter(models.CUCM_Users.userid==userid).delete()
-    except sqlalchemy.orm.exc.NoResultFound:
-        return None
+        db.commit()
 
-    db.commit()
-    db.close()
 
+def delete_cucm_user(userid: str, db: Session = None):
+    with session_scope(db) as db:
+        try:
+            db.query(models.CUCM_Users).filter(models.CUCM_Users.userid==userid).delete()
+        except sqlalchemy.orm.exc.NoResultFound:
+            return None
 
-def get_all_settings(db: Session = SessionLocal()):
-    try:
-        results = db.query(models.Settings).all()
-    except sqlalchemy.orm.exc.NoResultFound:
-        return None
+        db.commit()
 
-    db.close()
-    
-    return results
 
+def get_all_settings(db: Session = None):
+    with session_scope(db) as db:
+        try:
+            return db.query(models.Settings).all()
+        except sqlalchemy.orm.exc.NoResultFound:
+            return None
 
-def get_setting(name: str, db: Session = SessionLocal()):
-    try:
-        result = db.query(models.Settings).filter(models.Settings.name==name).one()
-    except sqlalchemy.orm.exc.NoResultFound:
-        return None
 
-    db.close()
+def get_setting(name: str, db: Session = None):
+    with session_scope(db) as db:
+        try:
+            result = db.query(models.Settings).filter(models.Settings.name==name).one()
+        except sqlalchemy.orm.exc.NoResultFound:
+            return None
 
-    return result.value
+        return result.value
 
 
-def change_setting(name: str, value: str, db: Session = SessionLocal()):
+def change_setting(name: str, value: str, db: Session = None):
     
-    try:
-        result = db.query(models.Settings).filter(models.Settings.name==name).one()
-        result.value = value
-    except sqlalchemy.orm.exc.NoResultFound:
-        db.merge(models.Settings(name=name, value=value))
+    with session_scope(db) as db:
+        try:
+            result = db.query(models.Settings).filter(models.Settings.name==name).one()
+            result.value = value
+        except sqlalchemy.orm.exc.NoResultFound:
+            db.merge(models.Settings(name=name, value=value))
 
-    db.commit()
-    db.close()
+        db.commit()
 
 
-def updatepw(old_password: str, new_password: str, db : Session = SessionLocal()):
-    old_real_password_hash = get_setting(name='localadmin')
+def updatepw(old_password: str, new_password: str, db: Session = None):
+    old_real_password_hash = get_setting(name='localadmin', db=db)
     old_supplied_password_hash = hashlib.sha512((old_password + str(config.salt)).encode()).hexdigest()
     
     if old_supplied_password_hash == old_real_password_hash:
         try:
             new_password_hash = hashlib.sha512((new_password + str(config.salt)).encode()).hexdigest()
-            change_setting(name = 'localadmin', value=new_password_hash)
+            change_setting(name = 'localadmin', value=new_password_hash, db=db)
         except Exception as e:
             return "Password change failed"
         else:
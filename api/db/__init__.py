@@ -1,19 +1,66 @@
 import os, hashlib
 
+from sqlalchemy import inspect
+from sqlalchemy.exc import OperationalError
+
 from api.Config import config
 from api.db.database import engine, Base, database_file_name
+from api.db.search import create_search_index
+
+
+def add_missing_columns():
+    """Add columns added to existing tables by newer versions, create_all only creates new tables.
+    New columns are nullable, existing rows get NULL"""
+    inspector = inspect(engine)
+    table_names = inspector.get_table_names()
+    for table in Base.metadata.sorted_tables:
+        if table.name not in table_names:
+            continue
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                column_type = column.type.compile(dialect=engine.dialect)
+                try:
+                    with engine.begin() as connection:
+                        connection.execute(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+                except OperationalError as e:
+                    # another process started at the same time and added it first
+                    if 'duplicate column name' not in str(e):
+                        raise
+
+
+def create_missing_indexes():
+    """Create indexes added to existing tables by newer versions, create_all only creates indexes of new tables"""
+    inspector = inspect(engine)
+    table_names = inspector.get_table_names()
+    for table in Base.metadata.sorted_tables:
+        if table.name not in table_names:
+            continue
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=engine)
+
+
+def init_db():
+    """Create the SQLite file if it doesn't exist, tables, columns and indexes added by newer versions are created in
+    existing databases.  Called once at API startup, before anything reads settings.  Models are imported here rather
+    than at module level because they import api.db.database, which runs this package first"""
+    new_database = not os.path.exists(database_file_name)
 
-# create SQL lite file if it doesn't exist
-if not os.path.exists(database_file_name):
-    from api.models.phone_data import Phone, PhoneScraper, JobStatus
+    from api.models.phone_data import Phone, PhoneScraper, JobStatus, DataVersion, StatsSnapshot, PhoneTombstone, AXLDevice, AXLChangeCursor
     from api.models.settings_management import CUCM_Cluster
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    create_missing_indexes()
+    create_search_index(engine)
 
-    # populate settings table with initial values
-    from api.crud import settings_management as crud
+    if new_database:
+        # populate settings table with initial values
+        from api.crud import settings_management as crud
 
-    crud.change_setting(name = 'cucm_update_minute', value='50')
-    crud.change_setting(name = 'phonescrape_update_time', value='01:30')
+        crud.change_setting(name = 'cucm_update_minute', value='50')
+        crud.change_setting(name = 'phonescrape_update_time', value='01:30')
 
-    default_password_hash = hashlib.sha512(('setup' + str(config.salt)).encode()).hexdigest()
-    crud.change_setting(name = 'localadmin', value=default_password_hash)
+        default_password_hash = hashlib.sha512(('setup' + str(config.salt)).encode()).hexdigest()
+        crud.change_setting(name = 'localadmin', value=default_password_hash)
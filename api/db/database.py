@@ -1,8 +1,9 @@
 import os
+from contextlib import contextmanager
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from api.Config import config
 
@@ -14,6 +15,53 @@ engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 
+
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new SQLite connection.
+    WAL lets API reads run while the CUCM sync and phone scrape jobs are writing"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {config.sqlite_busy_timeout_ms}")
+    cursor.execute(f"PRAGMA journal_mode = {config.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous = {config.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA cache_size = -{config.sqlite_cache_size_kb}")
+    cursor.execute(f"PRAGMA mmap_size = {config.sqlite_mmap_size_mb * 1024 * 1024}")
+    cursor.close()
+
 Base = declarative_base()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@contextmanager
+def session_scope(db: Session = None):
+    """Database session for one unit of work, used by crud functions, scheduler jobs and RQ jobs.
+    Changes are only saved by an explicit db.commit(), an exception rolls the transaction back.
+
+    Keyword Arguments:
+        db {Session} -- session owned by the caller, it is used as is and left open (default: {None})
+
+    Yields:
+        Session -- the caller's session, or a new session that is closed on exit
+    """
+    owned = db is None
+    if owned:
+        db = SessionLocal()
+
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if owned:
+            db.close()
+
+
+def get_db():
+    """FastAPI dependency providing one database session per request, closed when the request finishes"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
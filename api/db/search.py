@@ -0,0 +1,150 @@
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from api.db.upsert import chunks
+
+logger = logging.getLogger('api')
+
+# SQLite FTS5 table used by the phone search, one row per phone
+SEARCH_TABLE = 'phone_search'
+
+# maps phone device names to the search table rowid, the implicit phone.rowid is not used because VACUUM can renumber it.
+# id is an INTEGER PRIMARY KEY, so it is kept by VACUUM and both lookups are indexed
+SEARCH_KEY_TABLE = 'phone_search_key'
+
+# (search table column, source table.column) indexed for full text search
+SEARCH_COLUMNS = [
+    ('devicename', 'phone.devicename'),
+    ('description', 'phone.description'),
+    ('devicepool', 'phone.devicepool'),
+    ('em_profile', 'phone.em_profile'),
+    ('dn', 'phonescraper.dn'),
+    ('cdp_neighbor_id', 'phonescraper."CDP_Neighbor_ID"'),
+    ('lldp_neighbor_id', 'phonescraper."LLDP_Neighbor_ID"'),
+]
+
+SEARCH_CREATE_TABLE = (
+    f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5({', '.join(name for name, _ in SEARCH_COLUMNS)}, tokenize = 'unicode61')"
+)
+
+SEARCH_CREATE_KEY_TABLE = f"CREATE TABLE IF NOT EXISTS {SEARCH_KEY_TABLE} (id INTEGER PRIMARY KEY, devicename VARCHAR NOT NULL UNIQUE)"
+
+SEARCH_INSERT_KEYS = f"INSERT OR IGNORE INTO {SEARCH_KEY_TABLE} (devicename) SELECT phone.devicename FROM phone"
+
+SEARCH_INSERT_SELECT = (
+    f"INSERT INTO {SEARCH_TABLE} (rowid, {', '.join(name for name, _ in SEARCH_COLUMNS)}) "
+    f"SELECT {SEARCH_KEY_TABLE}.id, {', '.join(source for _, source in SEARCH_COLUMNS)} "
+    f"FROM phone JOIN {SEARCH_KEY_TABLE} ON {SEARCH_KEY_TABLE}.devicename = phone.devicename "
+    f"LEFT OUTER JOIN phonescraper ON phone.devicename = phonescraper.devicename"
+)
+
+
+def create_search_index(engine) -> bool:
+    """Create the FTS5 phone search table if it doesn't exist and fill it from the phone data if it is empty.
+    A search table created by an older version with different columns is dropped and rebuilt
+
+    Arguments:
+        engine {Engine} -- database engine
+
+    Returns:
+        bool -- False if SQLite was built without FTS5, search then falls back to LIKE queries
+    """
+    try:
+        with engine.begin() as connection:
+            existing_table = connection.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), name=SEARCH_TABLE
+            ).scalar()
+            if existing_table != SEARCH_CREATE_TABLE:
+                if existing_table is not None:
+                    logger.info("phone search table is out of date, rebuilding it")
+                    connection.execute(text(f"DROP TABLE {SEARCH_TABLE}"))
+                connection.execute(text(SEARCH_CREATE_TABLE))
+            connection.execute(text(SEARCH_CREATE_KEY_TABLE))
+
+            # the transaction holds the write lock, so processes starting at the same time can't both fill the table
+            if connection.execute(text(f"SELECT 1 FROM {SEARCH_TABLE} LIMIT 1")).scalar() is None:
+                connection.execute(text(SEARCH_INSERT_KEYS))
+                connection.execute(text(SEARCH_INSERT_SELECT))
+    except OperationalError as e:
+        logger.error(f"unable to create full text search table, search will use slower LIKE queries: {e}")
+        return False
+
+    return True
+
+
+def search_index_available(db: Session) -> bool:
+    """Check if the FTS5 phone search table exists"""
+    return db.connection().execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), name=SEARCH_TABLE
+    ).scalar() is not None
+
+
+def refresh_search_index(db: Session, devicenames: list, chunk_size: int = 500, reinsert: bool = True):
+    """Re-index phones after their phone or phone scraper rows were written.
+    Runs inside the session transaction, the caller commits
+
+    Arguments:
+        db {Session} -- database session
+        devicenames {list} -- device names of the phones to re-index
+
+    Keyword Arguments:
+        reinsert {bool} -- False only removes the phones from the index, called before deleting phone rows (default: {True})
+    """
+    if not devicenames or not search_index_available(db):
+        return
+
+    connection = db.connection()
+    for chunk in chunks(list(devicenames), chunk_size):
+        keys = {f"key_{index}": devicename for index, devicename in enumerate(chunk)}
+        placeholders = ', '.join(f":{key}" for key in keys)
+
+        # rowid lookups, FTS5 doesn't index the values of its columns for equality
+        connection.execute(text(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN (SELECT id FROM {SEARCH_KEY_TABLE} WHERE devicename IN ({placeholders}))"
+        ), **keys)
+        if reinsert:
+            connection.execute(text(f"{SEARCH_INSERT_KEYS} WHERE phone.devicename IN ({placeholders})"), **keys)
+            connection.execute(text(f"{SEARCH_INSERT_SELECT} WHERE phone.devicename IN ({placeholders})"), **keys)
+        else:
+            connection.execute(text(f"DELETE FROM {SEARCH_KEY_TABLE} WHERE devicename IN ({placeholders})"), **keys)
+
+
+def make_match_query(query: str) -> str:
+    """Convert user input to an FTS5 query, every word must match the start of a token in any indexed column.
+    Words are quoted so FTS5 operators and punctuation in the input are searched for literally"""
+    words = [word.replace('"', '""') for word in query.split()]
+
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_devicenames(db: Session, query: str, limit: int = None, offset: int = 0) -> tuple:
+    """Full text search of the phone search table, best matches first by bm25 rank
+
+    Arguments:
+        db {Session} -- database session
+        query {str} -- words to search for
+
+    Keyword Arguments:
+        limit {int} -- max number of results, all results if None (default: {None})
+        offset {int} -- number of results to skip (default: {0})
+
+    Returns:
+        tuple -- (total count of matching phones, list of phone device names in rank order)
+    """
+    match = make_match_query(query)
+    if match == '':
+        return 0, []
+
+    connection = db.connection()
+    total_count = connection.execute(text(f"SELECT count(*) FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match"), match=match).scalar()
+
+    devicenames = connection.execute(text(
+        f"SELECT {SEARCH_KEY_TABLE}.devicename FROM ("
+        f"SELECT rowid, bm25({SEARCH_TABLE}) AS rank FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match ORDER BY rank LIMIT :limit OFFSET :offset"
+        f") AS matches JOIN {SEARCH_KEY_TABLE} ON {SEARCH_KEY_TABLE}.id = matches.rowid ORDER BY matches.rank"
+    ), match=match, limit=-1 if limit is None else limit, offset=offset)
+
+    return total_count, [row[0] for row in devicenames]
@@ -0,0 +1,183 @@
+import logging
+
+from sqlalchemy import bindparam, case, or_, select, text
+from sqlalchemy.orm import Session, class_mapper
+
+logger = logging.getLogger('api')
+
+# SQLite supports INSERT ... ON CONFLICT DO UPDATE from version 3.24.0
+SQLITE_UPSERT_MIN_VERSION = (3, 24, 0)
+
+
+def get_upsert_rows(model, objects: list) -> tuple:
+    """Convert model objects to rows of column values, like db.merge only attributes that were set on an object are written
+
+    Arguments:
+        model {Base} -- SQLAlchemy model class
+        objects {list} -- list of model objects
+
+    Returns:
+        tuple -- (primary key column name, dict of primary key value to row), the last object wins if a key is repeated
+    """
+    mapper = class_mapper(model)
+    primary_key = mapper.primary_key
+
+    if len(primary_key) != 1:
+        raise ValueError(f"bulk upsert requires a single column primary key, {model.__name__} has {len(primary_key)}")
+
+    column_attrs = [(prop.key, prop.columns[0].name) for prop in mapper.column_attrs]
+
+    rows = {}
+    for model_object in objects:
+        object_dict = model_object.__dict__
+        row = {column_name: object_dict[key] for key, column_name in column_attrs if key in object_dict}
+        rows[row[primary_key[0].name]] = row
+
+    return primary_key[0].name, rows
+
+
+def group_rows_by_columns(rows: list) -> dict:
+    """Group rows with the same set of columns so each group can be sent as one executemany"""
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    return groups
+
+
+def chunks(rows: list, chunk_size: int):
+    """Split rows into lists of at most chunk_size rows"""
+    for i in range(0, len(rows), chunk_size):
+        yield rows[i:i + chunk_size]
+
+
+def supports_on_conflict(db: Session) -> bool:
+    """Check if the database supports INSERT ... ON CONFLICT DO UPDATE"""
+    dialect = db.get_bind().dialect
+
+    return dialect.name == 'sqlite' and dialect.dbapi.sqlite_version_info >= SQLITE_UPSERT_MIN_VERSION
+
+
+class ChangeVersion:
+    """Change version stamped by bulk_upsert on new rows and on rows where at least one column value changed"""
+    def __init__(self, column_name: str, version: int, ignored_columns: list = None):
+        """
+        Arguments:
+            column_name {str} -- integer column holding the version the row last changed at
+            version {int} -- version of the current write
+
+        Keyword Arguments:
+            ignored_columns {list} -- columns that are written but don't count as a change, ex. last seen timestamps (default: {None})
+        """
+        self.column_name = column_name
+        self.version = version
+        self.ignored_columns = ignored_columns or []
+
+    def compared_columns(self, update_columns: list) -> list:
+        return [name for name in update_columns if name not in self.ignored_columns]
+
+
+def bulk_upsert(db: Session, model, objects: list, chunk_size: int = 500, change_version: ChangeVersion = None):
+    """Insert or update model objects in bulk, a faster replacement for calling db.merge on each object.
+
+    Attributes that were set on an object overwrite the stored values, attributes that were never set keep the stored
+    value on update and use the column default on insert.  Runs inside the session transaction, the caller commits.
+
+    Arguments:
+        db {Session} -- database session
+        model {Base} -- SQLAlchemy model class, must have a single column primary key
+        objects {list} -- list of model objects
+
+    Keyword Arguments:
+        chunk_size {int} -- rows sent per executemany (default: {500})
+        change_version {ChangeVersion} -- stamp new and changed rows with a version, unchanged rows keep theirs (default: {None})
+    """
+    primary_key_name, rows = get_upsert_rows(model, objects)
+
+    if not rows:
+        return
+
+    if change_version is not None:
+        for row in rows.values():
+            row.pop(change_version.column_name, None)
+
+    if supports_on_conflict(db):
+        upsert_on_conflict(db, model.__table__, primary_key_name, list(rows.values()), chunk_size, change_version)
+    else:
+        upsert_select_then_write(db, model.__table__, primary_key_name, rows, chunk_size, change_version)
+
+
+def upsert_on_conflict(db: Session, table, primary_key_name: str, rows: list, chunk_size: int, change_version: ChangeVersion = None):
+    """Upsert rows with INSERT ... ON CONFLICT DO UPDATE, one statement per group of rows setting the same columns"""
+    connection = db.connection()
+    quote = connection.dialect.identifier_preparer.quote
+
+    # scalar column defaults are only used for new rows, they never overwrite stored values
+    scalar_defaults = {column.name: column.default.arg for column in table.columns if column.default is not None and column.default.is_scalar}
+
+    if change_version is not None:
+        scalar_defaults[change_version.column_name] = change_version.version
+
+    for columns, group in group_rows_by_columns(rows).items():
+        insert_defaults = {name: value for name, value in scalar_defaults.items() if name not in columns}
+        insert_columns = list(columns) + list(insert_defaults)
+        update_columns = [name for name in columns if name != primary_key_name]
+
+        set_clauses = [f"{quote(name)} = excluded.{quote(name)}" for name in update_columns]
+
+        compared_columns = change_version.compared_columns(update_columns) if change_version is not None else []
+        if compared_columns:
+            # SET expressions see the stored row, so the version only moves when a value really changes
+            changed = " OR ".join(f"{quote(name)} IS NOT excluded.{quote(name)}" for name in compared_columns)
+            version_column = quote(change_version.column_name)
+            set_clauses.append(f"{version_column} = CASE WHEN {changed} THEN excluded.{version_column} ELSE {version_column} END")
+
+        if set_clauses:
+            on_conflict = "DO UPDATE SET " + ", ".join(set_clauses)
+        else:
+            on_conflict = "DO NOTHING"
+
+        statement = text(
+            f"INSERT INTO {quote(table.name)} ({', '.join(quote(name) for name in insert_columns)}) "
+            f"VALUES ({', '.join(':' + name for name in insert_columns)}) "
+            f"ON CONFLICT ({quote(primary_key_name)}) {on_conflict}"
+        ).bindparams(*[bindparam(name, type_=table.columns[name].type) for name in insert_columns])
+
+        for chunk in chunks(group, chunk_size):
+            connection.execute(statement, [dict(row, **insert_defaults) for row in chunk])
+
+
+def upsert_select_then_write(db: Session, table, primary_key_name: str, rows: dict, chunk_size: int, change_version: ChangeVersion = None):
+    """Core fallback for databases without ON CONFLICT, looks up existing keys then sends executemany INSERT and UPDATE"""
+    connection = db.connection()
+    primary_key_column = table.columns[primary_key_name]
+
+    existing_keys = set()
+    for chunk in chunks(list(rows), chunk_size):
+        existing_keys.update(result[0] for result in connection.execute(select([primary_key_column]).where(primary_key_column.in_(chunk))))
+
+    new_rows = [row for key, row in rows.items() if key not in existing_keys]
+    if change_version is not None:
+        new_rows = [dict(row, **{change_version.column_name: change_version.version}) for row in new_rows]
+    for columns, group in group_rows_by_columns(new_rows).items():
+        for chunk in chunks(group, chunk_size):
+            connection.execute(table.insert(), chunk)
+
+    updated_rows = [row for key, row in rows.items() if key in existing_keys]
+    for columns, group in group_rows_by_columns(updated_rows).items():
+        update_columns = [name for name in columns if name != primary_key_name]
+        if not update_columns:
+            continue
+
+        # bind the primary key under another name, the column itself is not updated
+        values = {name: bindparam(name) for name in update_columns}
+
+        compared_columns = change_version.compared_columns(update_columns) if change_version is not None else []
+        if compared_columns:
+            version_column = table.columns[change_version.column_name]
+            changed = or_(*[table.columns[name].isnot(bindparam(name)) for name in compared_columns])
+            values[change_version.column_name] = case([(changed, change_version.version)], else_=version_column)
+
+        statement = table.update().where(primary_key_column == bindparam('_key')).values(values)
+        for chunk in chunks(group, chunk_size):
+            connection.execute(statement, [dict({name: row[name] for name in update_columns}, _key=row[primary_key_name]) for row in chunk])
@@ -14,7 +14,7 @@ class Phone(Base):
     # Serviceability Fields    
     devicename = Column(String, primary_key=True, index=True)
     firmware	= Column(String)
-    ipv4	= Column(String)
+    ipv4	= Column(String, index=True)
     first_seen_reg	= Column(DateTime, default=current_time)
     last_seen_reg = Column(DateTime, default=current_time)
     registration_time	= Column(DateTime)
@@ -29,6 +29,9 @@ class Phone(Base):
     em_profile	= Column(String)
     em_time	= Column(DateTime)
 
+    # data generation this row last changed at, used by the /phonedata/changes delta feed
+    change_version = Column(Integer, index=True)
+
     phonescrape = relationship("PhoneScraper", uselist=False, back_populates="phone")
 
 class PhoneScraper(Base):
@@ -38,14 +41,14 @@ class PhoneScraper(Base):
     devicename = Column(String, ForeignKey("phone.devicename"),  primary_key=True)
     sn = Column(String, unique=True)
     firmware = Column(String)
-    dn = Column(String)
+    dn = Column(String, index=True)
     model = Column(String)
     kem1 = Column(String)
     kem2 = Column(String)
     domain_name = Column(String)
     dhcp_server = Column(String)
     dhcp = Column(String)
-    ip_address = Column(String)
+    ip_address = Column(String, index=True)
     subnetmask = Column(String)
     gateway = Column(String)
     dns1 = Column(String)
@@ -78,6 +81,13 @@ class PhoneScraper(Base):
     ITL = Column(String)
     date_modified = Column(DateTime)
 
+    # firmware CUCM reported for the phone (Phone.firmware) when it was scraped, the incremental phone scrape
+    # compares against this because the scraped firmware text is formatted differently
+    cucm_firmware = Column(String)
+
+    # data generation this row last changed at, used by the /phonedata/changes delta feed
+    change_version = Column(Integer, index=True)
+
     phone = relationship("Phone", back_populates="phonescrape")
 
 
@@ -87,4 +97,50 @@ class JobStatus(Base):
     __tablename__ = "jobstatus"
     jobname = Column(String, primary_key=True, index=True)
     laststarttime = Column(String)
-    result = Column(String)
\ No newline at end of file
+    result = Column(String)
+
+class PhoneTombstone(Base):
+    """Model used to store phones removed from the phone table, so delta feed clients can remove them too"""
+    __tablename__ = "phonetombstone"
+    devicename = Column(String, primary_key=True)
+    change_version = Column(Integer, index=True)
+
+
+class StatsSnapshot(Base):
+    """Model used to store aggregate statistics as JSON along with the data generation they were computed at,
+    shared by every API process and refreshed by the writers after each sync"""
+    __tablename__ = "statssnapshot"
+    name = Column(String, primary_key=True)
+    generation = Column(Integer)
+    data = Column(String)
+
+
+class DataVersion(Base):
+    """Model used to store a generation counter per data set, bumped in the same transaction as every write to the data set.
+    Used to cache API responses until the data changes"""
+    __tablename__ = "dataversion"
+    name = Column(String, primary_key=True)
+    generation = Column(Integer, default=0)
+
+
+class AXLDevice(Base):
+    """Model used to store the AXL fields of every phone in a cluster, registered or not.
+    Kept up to date from AXL listChange between full syncs, so an incremental sync doesn't need to re-read AXL"""
+    __tablename__ = "axldevice"
+    uuid = Column(String, primary_key=True)
+    cluster = Column(String, index=True)
+    name = Column(String)
+    description = Column(String)
+    devicepool = Column(String)
+    css = Column(String)
+    em_profile = Column(String)
+    login_time = Column(String)
+
+
+class AXLChangeCursor(Base):
+    """Model used to store the AXL listChange cursor of each cluster and when the cluster was last fully synced"""
+    __tablename__ = "axlchangecursor"
+    cluster = Column(String, primary_key=True)
+    queue_id = Column(String)
+    next_change_id = Column(Integer)
+    last_full_sync = Column(DateTime)
@@ -1,15 +1,21 @@
-import os, datetime, time, shutil, sqlite3
+import os, datetime, time, shutil, sqlite3, csv, io, asyncio
 import logging
+import orjson
 
-from fastapi import APIRouter, Depends, Security, HTTPException, File, UploadFile, BackgroundTasks
+from fastapi import APIRouter, Depends, Security, HTTPException, File, UploadFile, BackgroundTasks, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
 from api.Auth import Auth
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
+from api.Cache import snapshot_cache
 from api.Config import config
+from api.Events import broadcaster, format_sse, get_jobstatus, get_redis
+from api.db.database import get_db
 from api.Main import scheduler
 from api.models import phone_data as models
 from api.schemas import phone_data as schemas
@@ -26,6 +32,40 @@ async def is_auth(token: str = Security(oauth2_scheme)):
   return auth.validate(token)
 
 
+def get_page_params(fields: dict, sort: str = None, filters: List[str] = None) -> tuple:
+  """Translate sort and filter query parameters into SQL columns
+
+  Arguments:
+      fields {dict} -- API field name to SQL column
+
+  Keyword Arguments:
+      sort {str} -- comma separated field names, prefix a field with '-' to sort descending, ex. 'cluster,-ldate' (default: {None})
+      filters {List[str]} -- list of 'field:value' strings, ex. 'model:8845' (default: {None})
+
+  Returns:
+      tuple -- (list of (column, value) filters, list of (column, descending) sorts)
+  """
+  sql_filters = []
+  for item in filters or []:
+    field, separator, value = item.partition(':')
+    if separator == '' or field not in fields:
+      raise HTTPException(status_code=400, detail=f"Invalid filter '{item}', use field:value with one of {', '.join(fields)}")
+    sql_filters.append((fields[field], value))
+
+  sql_sort = []
+  for field in (sort or '').split(','):
+    field = field.strip()
+    if field == '':
+      continue
+    descending = field.startswith('-')
+    field = field.lstrip('-+')
+    if field not in fields:
+      raise HTTPException(status_code=400, detail=f"Invalid sort field '{field}', use one of {', '.join(fields)}")
+    sql_sort.append((fields[field], descending))
+
+  return sql_filters, sql_sort
+
+
 class RQ_Queue_Status(BaseModel):
   current_size: int
   started_count: int
@@ -36,17 +76,14 @@ class RQ_Queue_Status(BaseModel):
   summary="Displays job status and apscheduler state",
   description="Returns current job status state"
 )
-def get_state(*, token: str = Security(is_auth)):
-  jobstatus = crud.get_all_jobstatus()
+def get_state(*, token: str = Security(is_auth), db: Session = Depends(get_db)):
+  jobstatus = crud.get_all_jobstatus(db=db)
 
   # get redis queue stats
   try:
-    from redis import Redis
     from rq import Queue
 
-    conn = Redis(os.getenv('REDIS_HOST'), os.getenv('REDIS_PORT')) 
-
-    q = Queue('phonescraper', connection=conn)
+    q = Queue('phonescraper', connection=get_redis())
     
     RQ_Status = RQ_Queue_Status(
           current_size= len(q),
@@ -62,6 +99,38 @@ def get_state(*, token: str = Security(is_auth)):
   }
 
 
+# Job events push - called by VueJS Job Status page instead of polling /jobstatus
+@router.get(
+  '/events',
+  summary="Streams job and phone scrape events",
+  description="Server-Sent Events stream of job status, phone scrape progress and queue depth/throughput"
+)
+async def get_events(*, request: Request, token: str = Query(..., description="bearer token, EventSource can't send an Authorization header")):
+  auth.validate(token)
+
+  async def stream():
+    # subscribe before reading the job status table so no job event is missed in between
+    queue = broadcaster.subscribe()
+    try:
+      yield format_sse('jobstatus', await run_in_threadpool(get_jobstatus))
+
+      while not await request.is_disconnected():
+        try:
+          yield await asyncio.wait_for(queue.get(), timeout=15)
+        except asyncio.TimeoutError:
+          # keep proxies from closing an idle stream, and stop once the token expires
+          try:
+            auth.validate(token)
+          except HTTPException:
+            yield format_sse('token_expired', {})
+            break
+          yield b": keepalive\n\n"
+    finally:
+      broadcaster.unsubscribe(queue)
+
+  return StreamingResponse(stream(), media_type="text/event-stream", headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 # Trigger manual cucm phone sync update now - called by VueJS to trigger manual CUCM sync
 @router.get(
   '/poll_cucm_now',
@@ -86,16 +155,10 @@ async def get_initiate_phone_scrape_now(*, token: str = Security(is_auth), backg
     background_tasks.add_task(scheduler_phonescrape_sync,manual=True)
   return {"Result": "phone sync update queued"}
 
-# Phone Info Data - called by VueJS to display Phone Info web page
-@router.get(
-  '/info',
-   summary="Displays phone data",
-  description="Returns list of phone data",
-  response_model=List[schemas.PhoneInfo],
-  )
-def get_phone_info(*, token: str = Security(is_auth)):
+def build_phone_info(db: Session, sql_filters: list, sql_sort: list, limit: int, offset: int) -> tuple:
+    """Serialize a page of phone info for the snapshot cache, returns (JSON bytes, headers)"""
     logger.debug(f"DB query start at {datetime.datetime.now()}")
-    results = crud.get_all_phone_data()
+    total_count, results = crud.get_phone_data_page(filters=sql_filters, sort=sql_sort, limit=limit, offset=offset, db=db)
     logger.debug(f"DB query end at {datetime.datetime.now()}")
 
     list_phone_schema_obj = []
@@ -126,17 +189,27 @@ def get_phone_info(*, token: str = Security(is_auth)):
     
     logger.debug(f"Schema creation end at {datetime.datetime.now()}")
 
-    return list_phone_schema_obj
+    return orjson.dumps([item.dict() for item in list_phone_schema_obj]), {'X-Total-Count': str(total_count)}
 
-# Phone Scrape Data - called by VueJS to display phone scraper page
+# Phone Info Data - called by VueJS to display Phone Info web page
 @router.get(
-  '/scraper',
-   summary="Displays phone scraper",
-  description="Returns list of phone scraper",
-  response_model=List[schemas.PhoneScraper],
+  '/info',
+   summary="Displays phone data",
+  description="Returns list of phone data",
+  response_model=List[schemas.PhoneInfo],
   )
-def get_phone_scraper_info(*, token: str = Security(is_auth)):
-    results = crud.get_all_scraper_data()
+def get_phone_info(*, token: str = Security(is_auth), db: Session = Depends(get_db), request: Request,
+    limit: int = Query(None, ge=1, description="max number of rows to return, all rows if not set"),
+    offset: int = Query(0, ge=0, description="number of rows to skip"),
+    sort: str = Query(None, description="comma separated fields to sort by, prefix with '-' for descending"),
+    filters: List[str] = Query(None, alias='filter', description="field:value, only rows where field contains value")):
+    sql_filters, sql_sort = get_page_params(crud.PHONE_INFO_FIELDS, sort, filters)
+    return snapshot_cache.respond(request, db, lambda: build_phone_info(db, sql_filters, sql_sort, limit, offset))
+
+
+def build_phone_scraper_info(db: Session, sql_filters: list, sql_sort: list, limit: int, offset: int) -> tuple:
+    """Serialize a page of phone scraper data for the snapshot cache, returns (JSON bytes, headers)"""
+    total_count, results = crud.get_scraper_data_page(filters=sql_filters, sort=sql_sort, limit=limit, offset=offset, db=db)
 
     list_phone_scraper_schema_obj = []
 
@@ -196,93 +269,224 @@ def get_phone_scraper_info(*, token: str = Security(is_auth)):
 
       list_phone_scraper_schema_obj.append(phone_schema_obj)
 
-    return list_phone_scraper_schema_obj
+    return orjson.dumps([item.dict() for item in list_phone_scraper_schema_obj]), {'X-Total-Count': str(total_count)}
+
+# Phone Scrape Data - called by VueJS to display phone scraper page
+@router.get(
+  '/scraper',
+   summary="Displays phone scraper",
+  description="Returns list of phone scraper",
+  response_model=List[schemas.PhoneScraper],
+  )
+def get_phone_scraper_info(*, token: str = Security(is_auth), db: Session = Depends(get_db), request: Request,
+    limit: int = Query(None, ge=1, description="max number of rows to return, all rows if not set"),
+    offset: int = Query(0, ge=0, description="number of rows to skip"),
+    sort: str = Query(None, description="comma separated fields to sort by, prefix with '-' for descending"),
+    filters: List[str] = Query(None, alias='filter', description="field:value, only rows where field contains value")):
+    sql_filters, sql_sort = get_page_params(crud.PHONE_SCRAPER_FIELDS, sort, filters)
+    return snapshot_cache.respond(request, db, lambda: build_phone_scraper_info(db, sql_filters, sql_sort, limit, offset))
+
+
+def encode_columnar(fields: list, rows: list) -> dict:
+  """Convert rows to column arrays.  Columns with many repeated values (cluster, model, device pool, VLANs..) are
+  dictionary encoded, the column array holds integer codes into a list of the distinct values, null stays null
+
+  Arguments:
+      fields {list} -- field names, in column order
+      rows {list} -- list of row dicts
+
+  Returns:
+      dict -- {"count": row count, "fields": field names, "columns": {field: values or codes}, "dictionaries": {field: distinct values}}
+  """
+  columns = {}
+  dictionaries = {}
+
+  for field in fields:
+    values = [row[field] for row in rows]
+
+    distinct = {}
+    codes = [None if value is None else distinct.setdefault(value, len(distinct)) for value in values]
+
+    # only encode when values repeat enough to make the codes smaller than the values
+    if len(distinct) <= len(values) // 2:
+      columns[field] = codes
+      dictionaries[field] = list(distinct)
+    else:
+      columns[field] = values
+
+  return {"count": len(rows), "fields": fields, "columns": columns, "dictionaries": dictionaries}
+
+
+def build_phone_all_schema(db: Session, sql_filters: list, sql_sort: list, limit: int, offset: int, format: str = 'rows') -> tuple:
+    """Serialize a page of combined phone data for the snapshot cache, returns (JSON bytes, headers)"""
+    logger.debug(f"DB query start at {datetime.datetime.now()}")
+    total_count, results = crud.get_combined_data_rows(filters=sql_filters, sort=sql_sort, limit=limit, offset=offset, db=db)
+    logger.debug(f"DB query end at {datetime.datetime.now()}")
+
+    logger.debug(f"JSON serialization start at {datetime.datetime.now()}")
+    if format == 'columnar':
+      content = orjson.dumps(encode_columnar(list(crud.PHONE_COMBINED_FIELDS), results))
+    else:
+      content = orjson.dumps(results)
+    logger.debug(f"JSON serialization end at {datetime.datetime.now()}")
+
+    return content, {'X-Total-Count': str(total_count)}
 
 
 # Phone Info & Scrape Data - called by VueJS to display all phone data (CUCM API and Phonescraper) combined page
 
-# The schema version takes 38 seconds to return the HTTP data for 30k records in phone info and 9k records in scraper.  this is too long..
+# Building a schema object per row took 38 seconds to return the HTTP data for 30k records in phone info and 9k records in scraper.
+# Rows are now selected as plain dicts with dates formatted in SQL and serialized straight to JSON bytes with orjson,
+# response_model is only used for the API docs.  format=columnar returns a much smaller dictionary encoded payload
 @router.get(
   '/allschema',
    summary="Displays all phone data (CUCM API + Scraper)",
   description="Returns list of phone data",
   response_model=List[schemas.Phone_Cucm_Scraper_Combined]
   )
-def get_phone_all_schema(*, token: str = Security(is_auth)):
-    logger.debug(f"DB query start at {datetime.datetime.now()}")
-    results = crud.get_all_scraper_data()
-    logger.debug(f"DB query end at {datetime.datetime.now()}")
+def get_phone_all_schema(*, token: str = Security(is_auth), db: Session = Depends(get_db), request: Request,
+    format: str = Query('rows', regex='^(rows|columnar)$', description="rows returns a list of objects, columnar returns dictionary encoded column arrays"),
+    limit: int = Query(None, ge=1, description="max number of rows to return, all rows if not set"),
+    offset: int = Query(0, ge=0, description="number of rows to skip"),
+    sort: str = Query(None, description="comma separated fields to sort by, prefix with '-' for descending"),
+    filters: List[str] = Query(None, alias='filter', description="field:value, only rows where field contains value")):
+    sql_filters, sql_sort = get_page_params(crud.PHONE_COMBINED_FIELDS, sort, filters)
+    return snapshot_cache.respond(request, db, lambda: build_phone_all_schema(db, sql_filters, sql_sort, limit, offset, format))
 
-    logger.debug(f"Schema creation start at {datetime.datetime.now()}")
-    list_phone_cucm_scraper_combined_schema_obj = []
 
-    for item in results:
-      phone_cucm_scraper_combined_schema_obj = schemas.Phone_Cucm_Scraper_Combined(
-        dname = item.devicename,
-        fw = item.firmware,
-        ipv4 = item.ipv4,
-        fdate = "" if item.first_seen_reg is None else item.first_seen_reg.strftime("%m/%d/%y %H:%M:%S"),
-        ldate = "" if item.last_seen_reg is None else item.last_seen_reg.strftime("%m/%d/%y %H:%M:%S") ,
-        regstamp = "" if item.registration_time is None else item.registration_time.strftime("%m/%d/%y %H:%M:%S"),
-        cluster = item.cluster,
-        prot = item.Protocol,
-        model = item.Model.replace("Cisco ",""),
-
-        # AXL Fields
-        dpool = item.devicepool,
-        dcss = item.devicecss,
-        descr = item.description,
-        em_profile = item.em_profile,
-        em_time =  "" if item.em_time is None else item.em_time.strftime("%m/%d/%y %H:%M:%S"),
-      )
+def export_ndjson(fields: list, sql_filters: list, sql_sort: list):
+  """Yield phone data as newline delimited JSON, one batch of rows per chunk"""
+  for rows in crud.stream_combined_data_rows(fields=fields, filters=sql_filters, sort=sql_sort):
+    yield b"".join(orjson.dumps(dict(zip(fields, row))) + b"\n" for row in rows)
 
-      if item.phonescrape != None:
-        phone_cucm_scraper_combined_schema_obj.sn = item.phonescrape.sn
-        phone_cucm_scraper_combined_schema_obj.firmware = item.phonescrape.firmware
-        phone_cucm_scraper_combined_schema_obj.dn = item.phonescrape.dn
-        phone_cucm_scraper_combined_schema_obj.model = item.phonescrape.model
-        phone_cucm_scraper_combined_schema_obj.kem1 = item.phonescrape.kem1
-        phone_cucm_scraper_combined_schema_obj.kem2 = item.phonescrape.kem2
-        phone_cucm_scraper_combined_schema_obj.domain_name = item.phonescrape.domain_name
-        phone_cucm_scraper_combined_schema_obj.dhcp_server = item.phonescrape.dhcp_server
-        phone_cucm_scraper_combined_schema_obj.dhcp = item.phonescrape.dhcp
-        phone_cucm_scraper_combined_schema_obj.ip_address = item.phonescrape.ip_address
-        phone_cucm_scraper_combined_schema_obj.subnetmask = item.phonescrape.subnetmask
-        phone_cucm_scraper_combined_schema_obj.gateway = item.phonescrape.gateway
-        phone_cucm_scraper_combined_schema_obj.dns1 = item.phonescrape.dns1
-        phone_cucm_scraper_combined_schema_obj.dns2 = item.phonescrape.dns2
-        phone_cucm_scraper_combined_schema_obj.alt_tftp = item.phonescrape.alt_tftp
-        phone_cucm_scraper_combined_schema_obj.tftp1 = item.phonescrape.tftp1
-        phone_cucm_scraper_combined_schema_obj.tftp2 = item.phonescrape.tftp2
-        phone_cucm_scraper_combined_schema_obj.op_vlan = item.phonescrape.op_vlan
-        phone_cucm_scraper_combined_schema_obj.admin_vlan = item.phonescrape.admin_vlan
-        phone_cucm_scraper_combined_schema_obj.cucm1 = item.phonescrape.cucm1
-        phone_cucm_scraper_combined_schema_obj.cucm2 = item.phonescrape.cucm2
-        phone_cucm_scraper_combined_schema_obj.cucm3 = item.phonescrape.cucm3
-        phone_cucm_scraper_combined_schema_obj.cucm4 = item.phonescrape.cucm4
-        phone_cucm_scraper_combined_schema_obj.cucm5 = item.phonescrape.cucm5
-        phone_cucm_scraper_combined_schema_obj.info_url = item.phonescrape.info_url
-        phone_cucm_scraper_combined_schema_obj.dir_url = item.phonescrape.dir_url
-        phone_cucm_scraper_combined_schema_obj.msg_url = item.phonescrape.msg_url
-        phone_cucm_scraper_combined_schema_obj.svc_url = item.phonescrape.svc_url
-        phone_cucm_scraper_combined_schema_obj.idle_url = item.phonescrape.idle_url
-        phone_cucm_scraper_combined_schema_obj.info_url_time = item.phonescrape.info_url_time
-        phone_cucm_scraper_combined_schema_obj.proxy_url = item.phonescrape.proxy_url
-        phone_cucm_scraper_combined_schema_obj.auth_url = item.phonescrape.auth_url
-        phone_cucm_scraper_combined_schema_obj.tvs = item.phonescrape.tvs
-        phone_cucm_scraper_combined_schema_obj.CDP_Neighbor_ID = item.phonescrape.CDP_Neighbor_ID
-        phone_cucm_scraper_combined_schema_obj.CDP_Neighbor_IP = item.phonescrape.CDP_Neighbor_IP
-        phone_cucm_scraper_combined_schema_obj.CDP_Neighbor_Port = item.phonescrape.CDP_Neighbor_Port
-        phone_cucm_scraper_combined_schema_obj.LLDP_Neighbor_ID = item.phonescrape.LLDP_Neighbor_ID
-        phone_cucm_scraper_combined_schema_obj.LLDP_Neighbor_IP = item.phonescrape.LLDP_Neighbor_IP
-        phone_cucm_scraper_combined_schema_obj.LLDP_Neighbor_Port = item.phonescrape.LLDP_Neighbor_Port
-        phone_cucm_scraper_combined_schema_obj.ITL = item.phonescrape.ITL
-        phone_cucm_scraper_combined_schema_obj.last_scraped = "" if item.phonescrape.date_modified is None else item.phonescrape.date_modified.strftime("%m/%d/%y %H:%M:%S")
-
-      list_phone_cucm_scraper_combined_schema_obj.append(phone_cucm_scraper_combined_schema_obj)
-    logger.debug(f"Schema creation end at {datetime.datetime.now()}")
 
-    return list_phone_cucm_scraper_combined_schema_obj
+def export_csv(fields: list, sql_filters: list, sql_sort: list):
+  """Yield phone data as CSV with a header row, one batch of rows per chunk"""
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  writer.writerow(fields)
+
+  for rows in crud.stream_combined_data_rows(fields=fields, filters=sql_filters, sort=sql_sort):
+    writer.writerows(rows)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+  # header only export when no rows match
+  if buffer.tell():
+    yield buffer.getvalue()
+
+
+# Phone Info & Scrape Data export - used by reporting jobs to pull the whole inventory
+@router.get(
+  '/export',
+  summary="Exports all phone data (CUCM API + Scraper)",
+  description="Streams phone data as NDJSON or CSV, rows are sent as they are read from the database",
+  )
+def get_phone_export(*, token: str = Security(is_auth),
+    format: str = Query('ndjson', regex='^(ndjson|csv)$', description="ndjson or csv"),
+    fields: str = Query(None, description="comma separated fields to export, all fields if not set"),
+    sort: str = Query(None, description="comma separated fields to sort by, prefix with '-' for descending"),
+    filters: List[str] = Query(None, alias='filter', description="field:value, only rows where field contains value")):
+    sql_filters, sql_sort = get_page_params(crud.PHONE_COMBINED_FIELDS, sort, filters)
+
+    export_fields = [field.strip() for field in (fields or '').split(',') if field.strip()] or list(crud.PHONE_COMBINED_FIELDS)
+    unknown_fields = [field for field in export_fields if field not in crud.PHONE_COMBINED_FIELDS]
+    if unknown_fields:
+      raise HTTPException(status_code=400, detail=f"Invalid fields {', '.join(unknown_fields)}, use any of {', '.join(crud.PHONE_COMBINED_FIELDS)}")
+
+    if format == 'csv':
+      return StreamingResponse(export_csv(export_fields, sql_filters, sql_sort), media_type="text/csv",
+        headers={'Content-Disposition': 'attachment; filename="phonedata.csv"'})
+
+    return StreamingResponse(export_ndjson(export_fields, sql_filters, sql_sort), media_type="application/x-ndjson")
+
+
+def build_phone_changes(db: Session, since: int) -> tuple:
+    """Serialize the phones changed after a data generation for the snapshot cache, returns (JSON bytes, headers)"""
+    version, changes, deleted = crud.get_combined_data_changes(since=since, db=db)
+
+    return orjson.dumps({"version": version, "changes": changes, "deleted": deleted}), {}
+
+# Phone data delta feed - used by clients keeping a local copy of the inventory
+@router.get(
+  '/changes',
+  summary="Displays phone data changed since a version",
+  description="Returns the current version, phones added or changed after the since version, and device names of phones deleted after it.  "
+    "Pass the returned version as since on the next call, since=0 returns every phone",
+  )
+def get_phone_changes(*, token: str = Security(is_auth), db: Session = Depends(get_db), request: Request,
+    since: int = Query(0, ge=0, description="version returned by the previous call")):
+    return snapshot_cache.respond(request, db, lambda: build_phone_changes(db, since))
+
+
+# Phone statistics - called by VueJS dashboards, counts are computed in SQL and stored per data generation
+@router.get(
+  '/stats',
+  summary="Displays phone statistics",
+  description="Returns phone counts by model, firmware, cluster, device pool, protocol, VLAN and ITL",
+  )
+def get_phone_stats(*, token: str = Security(is_auth), db: Session = Depends(get_db), request: Request):
+    return snapshot_cache.respond(request, db, lambda: (orjson.dumps(crud.get_phone_stats(db=db)), {}))
+
+
+def build_phone_search(db: Session, query: str, limit: int, offset: int) -> tuple:
+    """Serialize a page of phone search results for the snapshot cache, returns (JSON bytes, headers)"""
+    total_count, results = crud.search_combined_data(query, limit=limit, offset=offset, db=db)
+
+    return orjson.dumps(results), {'X-Total-Count': str(total_count)}
+
+# Phone search - called by VueJS to search phones without downloading every row
+@router.get(
+  '/search',
+  summary="Searches phone data",
+  description="Searches description, device name, device pool, EM profile, DN and CDP/LLDP neighbor, returns list of phones ranked by relevance",
+  response_model=List[schemas.Phone_Cucm_Scraper_Combined]
+  )
+def get_phone_search(*, token: str = Security(is_auth), db: Session = Depends(get_db), request: Request,
+    q: str = Query(..., min_length=1, description="words to search for, each word matches the start of a word, ex. 'lobby sw01'"),
+    limit: int = Query(50, ge=1, description="max number of rows to return"),
+    offset: int = Query(0, ge=0, description="number of rows to skip")):
+    return snapshot_cache.respond(request, db, lambda: build_phone_search(db, q, limit, offset))
+
+
+# max number of keys in one bulk lookup
+LOOKUP_MAX_KEYS = 10000
+
+# Phone lookup - used by helpdesk integrations to resolve a phone by IP address, DN, serial number or MAC address
+@router.get(
+  '/lookup',
+  summary="Looks up phones by IP address, DN, serial number or MAC address",
+  description="Exactly one of ip, dn, sn or mac is required, returns list of matching phones",
+  response_model=List[schemas.Phone_Cucm_Scraper_Combined]
+  )
+def get_phone_lookup(*, token: str = Security(is_auth), db: Session = Depends(get_db),
+    ip: str = None, dn: str = None, sn: str = None, mac: str = Query(None, description="any format, ex. 00:11:22:33:44:55 or 0011.2233.4455")):
+    keys = {key_type: key for key_type, key in [('ip', ip), ('dn', dn), ('sn', sn), ('mac', mac)] if key is not None}
+    if len(keys) != 1:
+      raise HTTPException(status_code=400, detail="Exactly one of ip, dn, sn or mac is required")
+
+    key_type, key = keys.popitem()
+    results = crud.lookup_combined_data(key_type, [key], db=db)
+
+    return Response(content=orjson.dumps(results[key]), media_type="application/json")
+
+
+@router.post(
+  '/lookup',
+  summary="Looks up many phones by IP address, DN, serial number or MAC address",
+  description=f"Accepts up to {LOOKUP_MAX_KEYS} keys, returns matching phones per key for each key type in the request",
+  response_model=Dict[str, Dict[str, List[schemas.Phone_Cucm_Scraper_Combined]]]
+  )
+def post_phone_lookup(*, token: str = Security(is_auth), db: Session = Depends(get_db), lookup: schemas.PhoneLookup):
+    keys = {key_type: key_list for key_type, key_list in lookup.dict().items() if key_list}
+    key_count = sum(len(key_list) for key_list in keys.values())
+    if key_count > LOOKUP_MAX_KEYS:
+      raise HTTPException(status_code=400, detail=f"{key_count} keys requested, the maximum is {LOOKUP_MAX_KEYS}")
+
+    results = {key_type: crud.lookup_combined_data(key_type, key_list, db=db) for key_type, key_list in keys.items()}
+
+    return Response(content=orjson.dumps(results), media_type="application/json")
 
 
 @router.get(
@@ -291,9 +495,9 @@ def get_phone_all_schema(*, token: str = Security(is_auth)):
   description="Returns list of phone data",
   response_model=[]
   )
-def get_phone_all_list(*, token: str = Security(is_auth)):
+def get_phone_all_list(*, token: str = Security(is_auth), db: Session = Depends(get_db)):
     logger.debug(f"DB query start at {datetime.datetime.now()}")
-    results = crud.get_all_scraper_data()
+    results = crud.get_all_scraper_data(db=db)
     logger.debug(f"DB query end at {datetime.datetime.now()}")
 
     return results
\ No newline at end of file
@@ -7,10 +7,12 @@ from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
 from api.Auth import Auth
 from typing import List, Tuple
 
 from api.Config import config
+from api.db.database import get_db
 
 from api.voip.axl import axl_clusters
 from api.voip.serviceability import serviceability_clusters
@@ -76,8 +78,8 @@ def read_existing_certificate_file(ssl_ca_trust_file: str):
   description="Returns list of cucm clusters",
   response_model=List[schemas.CUCM_Cluster_Base],
   )
-def get_cucm_clusters(*, token: str = Security(is_auth)):
-    results = crud.get_cucm_clusters()
+def get_cucm_clusters(*, token: str = Security(is_auth), db: Session = Depends(get_db)):
+    results = crud.get_cucm_clusters(db=db)
 
     list_cucm_cluster_schema_obj = []
 
@@ -104,10 +106,10 @@ def get_cucm_clusters(*, token: str = Security(is_auth)):
   '/cucm/{id}',
   summary="Deletes specified CUCM Cluster",
   )
-def delete_cucm_cluster(id: int, token: str = Security(is_auth)):
+def delete_cucm_cluster(id: int, token: str = Security(is_auth), db: Session = Depends(get_db)):
     
     try:
-        crud.delete_cucm_cluster(id = id)
+        crud.delete_cucm_cluster(id = id, db=db)
 
     except Exception as e:
         logger.error(f"Error {e} generated when attempting to delete cucm cluster {id}")
@@ -123,7 +125,7 @@ def delete_cucm_cluster(id: int, token: str = Security(is_auth)):
 @router.post(
   '/cucm',
   summary="Creates new CUCM cluster entry")
-def create_cucm_cluster(cucm_cluster_create: schemas.CUCM_Cluster_Create, token: str = Security(is_auth)):
+def create_cucm_cluster(cucm_cluster_create: schemas.CUCM_Cluster_Create, token: str = Security(is_auth), db: Session = Depends(get_db)):
 
     log_object = copy.deepcopy(cucm_cluster_create)
     log_object.pd = 'omitted from log'
@@ -146,7 +148,7 @@ def create_cucm_cluster(cucm_cluster_create: schemas.CUCM_Cluster_Create, token:
         )
 
         # write new CUCM cluster to SQL DB
-        crud.merge_cucm_cluster(cucm_cluster)
+        crud.merge_cucm_cluster(cucm_cluster, db=db)
 
     except Exception as e:
         logger.error(f"Error {e} generated when attempting to create cucm cluster {cucm_cluster_create.cluster_name}")
@@ -165,7 +167,7 @@ def create_cucm_cluster(cucm_cluster_create: schemas.CUCM_Cluster_Create, token:
 
         if auth_result == False:
           # authentication failed for new cluster, remove entry from database
-          crud.delete_cucm_cluster_name(cluster_name=cucm_cluster_create.cluster_name)
+          crud.delete_cucm_cluster_name(cluster_name=cucm_cluster_create.cluster_name, db=db)
 
           # reload AXL clusters to remove failed cluster from memory
           axl_clusters.load_clusters()
@@ -181,7 +183,7 @@ def create_cucm_cluster(cucm_cluster_create: schemas.CUCM_Cluster_Create, token:
 @router.put(
   '/cucm/{id}',
   summary="Updates existing CUCM cluster entry")
-def update_cucm_cluster(cucm_cluster_create: schemas.CUCM_Cluster_Create, token: str = Security(is_auth)):
+def update_cucm_cluster(cucm_cluster_create: schemas.CUCM_Cluster_Create, token: str = Security(is_auth), db: Session = Depends(get_db)):
     log_object = copy.deepcopy(cucm_cluster_create)
     log_object.pd = 'omitted from log'
     logger.info(f" Received request to update existing cucm cluster - {log_object}")
@@ -200,7 +202,7 @@ def update_cucm_cluster(cucm_cluster_create: schemas.CUCM_Cluster_Create, token:
             ssl_ca_trust_file = cert_name,
             pd= cucm_cluster_create.pd,
         )
-        crud.merge_cucm_cluster(cucm_cluster)
+        crud.merge_cucm_cluster(cucm_cluster, db=db)
 
     except Exception as e:
         logger.error(f"Error {e} generated when attempting to edit existing cucm cluster {cucm_cluster_create.cluster_name}")
@@ -229,8 +231,8 @@ def update_cucm_cluster(cucm_cluster_create: schemas.CUCM_Cluster_Create, token:
   description="Returns all settings value",
   response_model=dict,
   )
-def get_all_settings(token: str = Security(is_auth)):
-    settings_crud_result = crud.get_all_settings()
+def get_all_settings(token: str = Security(is_auth), db: Session = Depends(get_db)):
+    settings_crud_result = crud.get_all_settings(db=db)
 
     settings_response_dict = {}
 
@@ -248,8 +250,8 @@ def get_all_settings(token: str = Security(is_auth)):
   description="Returns settings value",
   response_model=schemas.Settings,
   )
-def get_setting(name: str, token: str = Security(is_auth)):
-    value = crud.get_setting(name=name)
+def get_setting(name: str, token: str = Security(is_auth), db: Session = Depends(get_db)):
+    value = crud.get_setting(name=name, db=db)
 
     return schemas.Settings(name=name, value=value)
 
@@ -260,10 +262,10 @@ def get_setting(name: str, token: str = Security(is_auth)):
   description="update settings value",
   response_model=dict,
   )
-def put_settings(settings: dict, token: str = Security(is_auth)):
+def put_settings(settings: dict, token: str = Security(is_auth), db: Session = Depends(get_db)):
     
     for setting in settings:
-      crud.change_setting(name=setting, value=settings[setting])
+      crud.change_setting(name=setting, value=settings[setting], db=db)
 
     Scheduler.reschedule_jobs()
 
@@ -276,8 +278,8 @@ def put_settings(settings: dict, token: str = Security(is_auth)):
   description="Returns all authorized cucm_users",
   response_model=List[str],
   )
-def get_all_cucm_users(token: str = Security(is_auth)):
-    cucm_users_crud_results = crud.get_all_cucm_users()
+def get_all_cucm_users(token: str = Security(is_auth), db: Session = Depends(get_db)):
+    cucm_users_crud_results = crud.get_all_cucm_users(db=db)
 
     cucm_users_response_list = []
 
@@ -292,11 +294,11 @@ def get_all_cucm_users(token: str = Security(is_auth)):
   summary="Adds new user to Authorized CUCM User model",
   description="Adds new user to Authorized CUCM User model",
   )
-def post_cucm_users(cucm_user: schemas.CUCM_Users, token: str = Security(is_auth)):
+def post_cucm_users(cucm_user: schemas.CUCM_Users, token: str = Security(is_auth), db: Session = Depends(get_db)):
   logger.info(f"Post to cucm_users received with value userid: {cucm_user.userid}")
 
   if len(cucm_user.userid) > 2:
-    crud.merge_cucm_user(userid = cucm_user.userid)
+    crud.merge_cucm_user(userid = cucm_user.userid, db=db)
     
     return "processed, poll users for verification"
 
@@ -306,9 +308,9 @@ def post_cucm_users(cucm_user: schemas.CUCM_Users, token: str = Security(is_auth
   summary="Adds new user to Authorized CUCM User model",
   description="Adds new user to Authorized CUCM User model",
   )
-def delete_cucm_users(userid: str, token: str = Security(is_auth)):
+def delete_cucm_users(userid: str, token: str = Security(is_auth), db: Session = Depends(get_db)):
     if len(userid) > 2:
-      crud.delete_cucm_user(userid = userid)
+      crud.delete_cucm_user(userid = userid, db=db)
     
     return "processed, poll users for verification"
 
@@ -323,8 +325,8 @@ class UpdatePWRequest(BaseModel):
   description="update localadmin password value",
   response_model=dict,
   )
-def put_updatepw(update_pw_request: UpdatePWRequest, token: str = Security(is_auth)):
+def put_updatepw(update_pw_request: UpdatePWRequest, token: str = Security(is_auth), db: Session = Depends(get_db)):
     
-    result = crud.updatepw(old_password=update_pw_request.current, new_password=update_pw_request.new)
+    result = crud.updatepw(old_password=update_pw_request.current, new_password=update_pw_request.new, db=db)
     
     return {'result': result}
\ No newline at end of file
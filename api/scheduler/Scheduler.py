@@ -1,19 +1,102 @@
 
 import logging
 logger = logging.getLogger('api')
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from apscheduler.schedulers.background import BackgroundScheduler
 
 from api.Config import config
 from api.voip.axl import axl_clusters 
 from api.voip.serviceability import serviceability_clusters
+from api.crud import phone_data as crud
 from api.crud import settings_management
 
+# clusters with a CUCM sync thread still running, including syncs that were abandoned after timing out
+running_clusters = set()
+running_clusters_lock = threading.Lock()
+
+# seconds between checks of the RQ failed job registry while a phone scrape run is in progress
+PHONESCRAPE_SWEEP_INTERVAL = 10
+
 # background task functions
 
+def sync_cluster(cluster: str, started: dict):
+  """Run the CUCM update for one cluster, called in a sync_clusters worker thread
+
+  Arguments:
+      cluster {str} -- friendly name of CUCM cluster
+      started {dict} -- cluster name to monotonic start time, used by sync_clusters to apply the timeout
+  """
+  from api.scheduler import update_from_cucm
+
+  started[cluster] = time.monotonic()
+  try:
+    update_from_cucm.update_cucm(
+      axl_ucm= axl_clusters.get_cluster(cluster_name=cluster), 
+      serviceability_ucm= serviceability_clusters.get_cluster(cluster_name=cluster), 
+      cluster_name=cluster
+    )
+  finally:
+    with running_clusters_lock:
+      running_clusters.discard(cluster)
+
+def sync_clusters(clusters: list):
+  """Sync CUCM clusters concurrently, each cluster writes its phones to the DB as soon as it finishes
+
+  A cluster that fails only fails its own job status.  A cluster still running after CUCM_SYNC_TIMEOUT_MINUTES is
+  marked as timed out and no longer waited for, its thread can't be interrupted so it is skipped by later syncs until
+  it ends.
+
+  Arguments:
+      clusters {list} -- friendly names of CUCM clusters to sync
+  """
+  with running_clusters_lock:
+    busy_clusters = [cluster for cluster in clusters if cluster in running_clusters]
+    clusters = [cluster for cluster in clusters if cluster not in running_clusters]
+    running_clusters.update(clusters)
+
+  for cluster in busy_clusters:
+    logger.error(f"previous cucm phone sync of {cluster} is still running, skipping cluster")
+
+  if len(clusters) == 0:
+    return
+
+  timeout = config.cucm_sync_timeout_minutes * 60
+  started = {}
+
+  executor = ThreadPoolExecutor(max_workers=min(config.cucm_sync_workers, len(clusters)), thread_name_prefix='cucm-sync')
+  futures = {executor.submit(sync_cluster, cluster, started): cluster for cluster in clusters}
+  pending = set(futures)
+
+  try:
+    while pending:
+      done, pending = wait(pending, timeout=5, return_when=FIRST_COMPLETED)
+
+      for future in done:
+        cluster = futures[future]
+        try:
+          future.result()
+        except Exception as e:
+          logger.error(f"cucm phone sync of {cluster} failed", exc_info=e)
+          crud.endjob(jobname=f"{cluster} cucm phone sync", summary=f"failed - {e}")
+
+      # clusters waiting for a worker haven't started yet, their timeout starts with the cluster
+      for future in [future for future in pending if futures[future] in started]:
+        cluster = futures[future]
+        if time.monotonic() - started[cluster] > timeout:
+          logger.error(f"cucm phone sync of {cluster} timed out after {config.cucm_sync_timeout_minutes} minutes")
+          crud.endjob(jobname=f"{cluster} cucm phone sync", summary=f"timed out after {config.cucm_sync_timeout_minutes} minutes")
+          pending.discard(future)
+  finally:
+    # don't wait for timed out clusters, their threads end on their own
+    executor.shutdown(wait=False)
+
+
 def scheduler_phone_sync(manual: bool = False):
   """Triggers CUCM API sync to poll phone data from CUCM clusters
 
-  This will trigger an update against all CUCM clusters configured in the DB
+  This will trigger an update against all CUCM clusters configured in the DB, up to CUCM_SYNC_WORKERS clusters at a time
 
   Keyword Arguments:
       manual {bool} -- Specifies whether this was manually triggered (True) or triggered via APSchedulers (False) (default: {False})
@@ -29,23 +112,49 @@ def scheduler_phone_sync(manual: bool = False):
 
   logger.info(f'APscheduler {trigger_method} cucm phone sync triggered')
 
-  from api.scheduler import update_from_cucm
-  
-  # loop through CUCM clusters
-  for cluster in axl_clusters.clusters:
+  try:
+    sync_clusters(list(axl_clusters.clusters))
+  finally:
+    scheduler.resume() # resume scheduler
 
-    # Call actual CUCM update script
-    update_from_cucm.update_cucm(
-      axl_ucm= axl_clusters.get_cluster(cluster_name=cluster), 
-      serviceability_ucm= serviceability_clusters.get_cluster(cluster_name=cluster), 
-      cluster_name=cluster
-    )
+def resume_after_scrape_run(run_id: str):
+  """Keep the scheduler paused until the last job of a phone scrape run has reported, runs in its own thread
+  so the APScheduler thread isn't held for the hours a phone scrape can take
 
-  scheduler.resume() # resume scheduler
+  The last RQ job to finish ends the run and publishes the run ID on SCRAPE_DONE_CHANNEL.  Jobs that crash or time
+  out before reporting are swept from the RQ failed job registry every PHONESCRAPE_SWEEP_INTERVAL seconds.
+
+  Arguments:
+      run_id {str} -- phone scrape run
+  """
+  from api.scheduler import update_from_phonescraper as phonescraper
+
+  pubsub = phonescraper.conn.pubsub(ignore_subscribe_messages=True)
+  last_sweep = time.monotonic()
+
+  try:
+    # subscribe before checking the run so the last job's message can't be missed
+    pubsub.subscribe(phonescraper.SCRAPE_DONE_CHANNEL)
+
+    while phonescraper.is_scrape_run_pending(run_id):
+      message = pubsub.get_message(timeout=1)
+      if message is not None and message['data'].decode() == run_id:
+        break
+
+      if time.monotonic() - last_sweep >= PHONESCRAPE_SWEEP_INTERVAL:
+        last_sweep = time.monotonic()
+        phonescraper.sweep_failed_jobs(run_id)
+  except Exception as e:
+    logger.error(f"error waiting for phone scrape run {run_id}, resuming scheduler", exc_info=e)
+  finally:
+    pubsub.close()
+    scheduler.resume() # resume scheduler
 
 def scheduler_phonescrape_sync(manual: bool = False):
   """Triggers Phone scrape sync to query all IP phone web servers to scrape data into DB
 
+  The scheduler stays paused until the phone scrape run ends, see resume_after_scrape_run
+
   Keyword Arguments:
       manual {bool} -- Specifies whether this was manually triggered (True) or triggered via APSchedulers (False) (default: {False})
   """
@@ -60,10 +169,17 @@ def scheduler_phonescrape_sync(manual: bool = False):
 
   from api.scheduler.update_from_phonescraper import rq_scrape_phones
 
-  # call phone scrape script to do the actual work
-  rq_scrape_phones()
+  # call phone scrape script to enqueue the actual work
+  try:
+    run_id = rq_scrape_phones()
+  except Exception:
+    scheduler.resume() # resume scheduler
+    raise
 
-  scheduler.resume() # resume scheduler
+  if run_id is None:
+    scheduler.resume() # resume scheduler
+  else:
+    threading.Thread(target=resume_after_scrape_run, args=(run_id,), name=f'phonescrape-{run_id}', daemon=True).start()
 
 # scheduler init
 scheduler = BackgroundScheduler()
@@ -1,22 +1,153 @@
 import os
 
 import time, sys
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 logger = logging.getLogger('api')
 
+from api.Config import config
 from api.models import phone_data as models
 from api.crud import phone_data as crud
 from api.scheduler import cisco_mapping
 
-from lib.ciscoaxl.CUCM_AXL_API import CUCM_AXL_API
+from lib.ciscoaxl.CUCM_AXL_API import CUCM_AXL_API, normalize_uuid
 from lib.CUCM_Serviceability_API import CUCM_Serviceability_API
 
+def axl_phone_to_dict(axl_phone) -> dict:
+    """Convert a listPhone phone object to the flat dict returned by executeSQLQuery, see CUCM_AXL_API.get_phones_sql
+
+    Arguments:
+        axl_phone {object} -- phone returned by listPhone
+
+    Returns:
+        dict -- uuid, name, description, devicepool, css, em_profile and login_time, empty values are ""
+    """
+    def value(reference) -> str:
+        try:
+            return reference._value_1 if reference._value_1 != None else ""
+        except:
+            return ""
+
+    return {
+        "uuid": normalize_uuid(axl_phone.uuid),
+        "name": axl_phone.name,
+        "description": axl_phone.description if axl_phone.description != None else "",
+        "devicepool": value(axl_phone.devicePoolName),
+        "css": value(axl_phone.callingSearchSpaceName),
+        "em_profile": value(axl_phone.currentProfileName),
+        "login_time": axl_phone.loginTime if axl_phone.loginTime != None else "",
+    }
+
+
+def get_axl_phones(axl_ucm: CUCM_AXL_API, cluster_name: str) -> list:
+    """Retrieve all phones from AXL as flat dicts.
+    Uses executeSQLQuery when AXL_FETCH_MODE is sql, falling back to listPhone if the SQL query fails or returns no phones
+
+    Arguments:
+        axl_ucm {CUCM_AXL_API} -- Instantiated AXL object
+        cluster_name {str} -- Friendly name of cluster
+
+    Returns:
+        list -- phones as dicts, see axl_phone_to_dict
+    """
+    if config.axl_fetch_mode == 'SQL':
+        try:
+            axl_phones = axl_ucm.get_all_phones_sql()
+        except Exception as e:
+            logger.error(f"axl executeSQLQuery error for {cluster_name}, falling back to listPhone - {e}")
+        else:
+            if len(axl_phones) > 0:
+                return axl_phones
+            logger.error(f"axl executeSQLQuery returned no phones for {cluster_name}, falling back to listPhone")
+
+    return [axl_phone_to_dict(axl_phone) for axl_phone in axl_ucm.get_all_phones()]
+
+
+def apply_axl_changes(axl_ucm: CUCM_AXL_API, cluster_name: str, cursor: dict, changes: list):
+    """Apply AXL listChange changes to the stored AXL devices of a cluster, phones that were removed or renamed are deleted
+
+    Arguments:
+        axl_ucm {CUCM_AXL_API} -- Instantiated AXL object
+        cluster_name {str} -- Friendly name of cluster
+        cursor {dict} -- listChange cursor returned with the changes
+        changes {list} -- (uuid, action) tuples returned by list_changes
+    """
+    # only the last change of each phone matters
+    last_actions = dict(changes)
+    changed_uuids = [uuid for uuid, action in last_actions.items() if action != 'r']
+
+    # phones are read again rather than applying changedTags, a phone removed after it changed is not returned
+    changed_phones = axl_ucm.get_phones_by_uuid(changed_uuids) if changed_uuids else []
+    found_uuids = {axl_phone['uuid'] for axl_phone in changed_phones}
+    removed_uuids = [uuid for uuid in last_actions if uuid not in found_uuids]
+
+    removed_names = crud.apply_axl_changes(cluster_name, changed_phones, removed_uuids, cursor)
+    logger.info(f"applied {len(changed_phones)} changed and {len(removed_uuids)} removed AXL phones for {cluster_name}")
+
+    if removed_names:
+        logger.info(f"deleting {len(removed_names)} phones removed from {cluster_name}")
+        crud.delete_phone_data(removed_names)
+
+
+def sync_axl_phones(axl_ucm: CUCM_AXL_API, cluster_name: str) -> list:
+    """Retrieve all phones of a cluster from AXL as flat dicts, incrementally when possible
+
+    With AXL_INCREMENTAL only the phones changed since the last sync are read with listChange and applied to the stored
+    AXL devices.  Every phone is read again with get_axl_phones when the cluster was never synced, the change cursor
+    expired or listChange failed, and once the last full sync is older than AXL_FULL_SYNC_HOURS.  Phones removed or
+    renamed in CUCM, found by either kind of sync, are deleted from the database
+
+    Arguments:
+        axl_ucm {CUCM_AXL_API} -- Instantiated AXL object
+        cluster_name {str} -- Friendly name of cluster
+
+    Returns:
+        list -- phones as dicts, see axl_phone_to_dict
+    """
+    if config.axl_incremental:
+        change_cursor = crud.get_axl_change_cursor(cluster_name)
+
+        if change_cursor is None or change_cursor.queue_id is None:
+            logger.info(f"no axl change cursor for {cluster_name}, running a full sync")
+        elif change_cursor.last_full_sync < datetime.now() - timedelta(hours=config.axl_full_sync_hours):
+            logger.info(f"last full axl sync of {cluster_name} is older than {config.axl_full_sync_hours} hours, running a full sync")
+        else:
+            try:
+                cursor, changes = axl_ucm.list_changes(queue_id=change_cursor.queue_id, start_change_id=change_cursor.next_change_id)
+                if cursor['expired']:
+                    logger.info(f"axl change cursor of {cluster_name} expired, running a full sync")
+                else:
+                    apply_axl_changes(axl_ucm, cluster_name, cursor, changes)
+                    return crud.get_axl_devices(cluster_name)
+            except Exception as e:
+                logger.error(f"axl incremental sync error for {cluster_name}, running a full sync - {e}")
+
+    # read the cursor before the phones, changes made during the full sync are applied by the next incremental sync
+    cursor = None
+    if config.axl_incremental:
+        try:
+            cursor, _ = axl_ucm.list_changes()
+        except Exception as e:
+            logger.error(f"axl listChange is not available for {cluster_name}, only full syncs will run - {e}")
+
+    axl_phones = get_axl_phones(axl_ucm, cluster_name)
+    if len(axl_phones) > 0:
+        removed_names = crud.replace_axl_devices(cluster_name, axl_phones, cursor)
+        # phones past the max_phones cap were not retrieved, they are not missing from CUCM
+        if axl_ucm.truncated:
+            logger.warning(f"axl phone list of {cluster_name} stopped at its phone cap, not deleting phones missing from it")
+        elif removed_names:
+            logger.info(f"deleting {len(removed_names)} phones removed from {cluster_name} since the last axl sync")
+            crud.delete_phone_data(removed_names)
+
+    return axl_phones
+
+
 def add_cucm_api_data_2_db(axl_phones_list, serviceability_phones_list, cluster_name):
     """Adds data returned by CUCM API to database
 
     Arguments:
-        axl_phones_list {list of AXL data} -- Data returned by AXL API
+        axl_phones_list {list of dict} -- AXL phones as flat dicts, see sync_axl_phones
         serviceability_phones_list {list of Serviceability API} -- Data returned by Serviceability API
         cluster_name {string} -- Cluster friendly name, used to store name of cluster in database entry
     """
@@ -29,30 +160,17 @@ def add_cucm_api_data_2_db(axl_phones_list, serviceability_phones_list, cluster_
     axl_dict = {}
     
     for axl_phone in axl_phones_list:
-        try:
-            em_profile = axl_phone.currentProfileName._value_1 if axl_phone.currentProfileName._value_1 != None else ""
-        except:
-            em_profile = ""
+        em_profile = axl_phone["em_profile"]
 
         if em_profile == '':
             em_login_timestamp = None
         else:
-            em_login_timestamp = datetime.fromtimestamp(int(axl_phone.loginTime))
-
-        try:
-            phone_device_pool = axl_phone.devicePoolName._value_1 if axl_phone.devicePoolName._value_1 != None else ""
-        except:
-            phone_device_pool = ""
-
-        try:
-            phone_css = axl_phone.callingSearchSpaceName._value_1 if axl_phone.callingSearchSpaceName._value_1 != None else ""
-        except:
-            phone_css = ""
+            em_login_timestamp = datetime.fromtimestamp(int(axl_phone["login_time"]))
 
-        axl_dict[axl_phone.name.upper()] = {
-            "devicepool":phone_device_pool,
-            "devicecss":phone_css,
-            "description":axl_phone.description,
+        axl_dict[axl_phone["name"].upper()] = {
+            "devicepool":axl_phone["devicepool"],
+            "devicecss":axl_phone["css"],
+            "description":axl_phone["description"],
             "em_profile":em_profile,
             "em_time":em_login_timestamp,
         }
@@ -123,11 +241,11 @@ def update_cucm(axl_ucm: CUCM_AXL_API, serviceability_ucm: CUCM_Serviceability_A
     # Connect to AXL API, get all phones    
     logger.info(f"connecting to {cluster_name} AXL")
     try:
-        axl_phones = axl_ucm.get_all_phones()
+        axl_phones = sync_axl_phones(axl_ucm, cluster_name)
         logger.info(f"retrieved {len(axl_phones)} phones from AXL")
     except:
         logger.error(f"axl error connecting to {cluster_name} - {str(sys.exc_info())}")
-        raise (f"axl error connecting to {cluster_name} - {str(sys.exc_info())}")
+        raise ConnectionError(f"axl error connecting to {cluster_name} - {str(sys.exc_info())}")
 
     if len(axl_phones) == 0:
         raise ValueError(f"No phones were retrieves from AXL, exiting CUCM update function")
@@ -135,12 +253,12 @@ def update_cucm(axl_ucm: CUCM_AXL_API, serviceability_ucm: CUCM_Serviceability_A
     # Connect to Serviceability API
     logger.info(f"connecting to {cluster_name} Serviceability API")
     try:
-        mac_list = [i.name for i in axl_phones]  # get a list of only MAC addresses from AXL to use in Serviceability query
+        mac_list = [i["name"] for i in axl_phones]  # get a list of only MAC addresses from AXL to use in Serviceability query
         serviceability_phones = serviceability_ucm.get_registered_phones(phone_mac_list=mac_list)
         logger.info(f"retrieved {len(serviceability_phones)} phones from Serviceability")
     except:
         logger.error(f"Serviceability error connecting to {cluster_name} - {str(sys.exc_info())}")
-        raise (f"Serviceability error connecting to {cluster_name} - {str(sys.exc_info())}")
+        raise ConnectionError(f"Serviceability error connecting to {cluster_name} - {str(sys.exc_info())}")
 
     # Write AXL and Serviceability data to SQL DB
     logger.info(f"storing {cluster_name} data in database")
@@ -151,6 +269,12 @@ def update_cucm(axl_ucm: CUCM_AXL_API, serviceability_ucm: CUCM_Serviceability_A
     else:
         logger.info("CUCM query & SQL update complete")
 
+        # recompute dashboard statistics now rather than on the next API request
+        try:
+            crud.refresh_phone_stats()
+        except:
+            logger.error("error refreshing phone statistics" + str(sys.exc_info()))
+
     # Update JobStatus to indicate job finished
     crud.endjob(jobname=jobname)
 
@@ -1,30 +1,46 @@
-import os, time, sys
+import os, time, sys, asyncio, uuid
 from datetime import datetime, timedelta
 import logging
 logger = logging.getLogger('api')
 
-from rq import Queue
+from rq import Queue, get_current_job
+from rq.registry import FailedJobRegistry
 from redis import Redis
 
 conn = Redis(os.getenv('REDIS_HOST'), os.getenv('REDIS_PORT'))
 
-from lib.phone_scraper import allDetails
+# Redis keys used to track a phone scrape run expire after 1 day
+RUN_KEY_TTL = 86400
 
+# the run ID is published here when the last job of a phone scrape run has reported
+SCRAPE_DONE_CHANNEL = 'phonescraper:done'
+
+RQ_QUEUE_NAME = 'phonescraper'
+JOBNAME = 'phone scraper'
+
+from lib.phone_scraper import allDetails_async, scrape_phones
+
+from api.Config import config
+from api.Events import publish_event
+from api.db.database import session_scope
 from api.models import phone_data as models
 from api.crud import phone_data as crud
 
 
-def scrape(ip: str, model: str):
+def scrape(ip: str, model: str, firmware: str = None):
     """Scrape a single phone IP and write data to database.
     This function is handled by RQ workers
 
     Arguments:
         ip {str} -- IP address of phone
         model {str} -- Phone model, will be passed to phonescraper function
+
+    Keyword Arguments:
+        firmware {str} -- firmware CUCM reports for the phone, stored as cucm_firmware (default: {None})
     """
-    # scrape phone webpage
+    # scrape phone webpage, all pages for the model are requested at the same time
     try:
-        phone_scrape_data = allDetails(ip=ip,model=model)
+        phone_scrape_data = asyncio.run(allDetails_async(ip=ip,model=model))
         logger.debug(f"successfully scraped ip {ip}, attempting to save data to database")
     except NameError:
         logger.error(f"error scraping ip {ip}, unable to find hostname")
@@ -40,6 +56,7 @@ def scrape(ip: str, model: str):
     if phone_scrape_data.sn != "":
         
         phone_scrape_data.date_modified = datetime.now()
+        phone_scrape_data.cucm_firmware = firmware
 
         try:
             crud.merge_phonescraper_data(phone_scrape_data)
@@ -49,23 +66,214 @@ def scrape(ip: str, model: str):
             logger.debug(f"successfully saved ip {ip} to database")
 
 
-def rq_scrape_phones(cluster: str = None):
+def run_key(run_id: str, name: str) -> str:
+    """Redis key used to track a phone scrape run"""
+    return f"phonescraper:{run_id}:{name}"
+
+
+def report_batch_complete(run_id: str, job_id: str, success_count: int, failure_count: int, skipped_count: int = 0) -> bool:
+    """Record the result of a scrape_batch job for a phone scrape run.
+    The last job of the run to finish ends the run, see finish_scrape_run
+
+    Arguments:
+        run_id {str} -- phone scrape run the job belongs to
+        job_id {str} -- RQ job ID
+        success_count {int} -- number of phones scraped and saved
+        failure_count {int} -- number of phones that could not be scraped or saved
+
+    Keyword Arguments:
+        skipped_count {int} -- number of phones scraped without a serial number, these are not saved (default: {0})
+
+    Returns:
+        bool -- False if the job was already reported
+    """
+    # a job is only counted once, whether reported by the worker or by the failed job sweep
+    if not conn.sadd(run_key(run_id, 'finished'), job_id):
+        return False
+
+    with conn.pipeline() as pipe:
+        pipe.hincrby(run_key(run_id, 'counts'), 'success', success_count)
+        pipe.hincrby(run_key(run_id, 'counts'), 'failure', failure_count)
+        pipe.hincrby(run_key(run_id, 'counts'), 'skipped', skipped_count)
+        pipe.decr(run_key(run_id, 'pending'))
+        for name in ['finished', 'counts']:
+            pipe.expire(run_key(run_id, name), RUN_KEY_TTL)
+        total_success, total_failure, total_skipped, pending = pipe.execute()[:4]
+
+    publish_event('scrape_progress', {
+        'run_id': run_id,
+        'phones': success_count + failure_count + skipped_count,
+        'success': total_success,
+        'failure': total_failure,
+        'skipped': total_skipped,
+        'pending_jobs': max(pending, 0),
+    })
+
+    if pending == 0:
+        finish_scrape_run(run_id)
+
+    return True
+
+
+def get_run_counts(run_id: str) -> tuple:
+    """Success, failure and skipped phone counts of a phone scrape run"""
+    counts = conn.hgetall(run_key(run_id, 'counts'))
+
+    return int(counts.get(b'success', 0)), int(counts.get(b'failure', 0)), int(counts.get(b'skipped', 0))
+
+
+def finish_scrape_run(run_id: str):
+    """End a phone scrape run, called by whichever process reports the last job of the run.
+    Updates the job status and publishes on SCRAPE_DONE_CHANNEL so the scheduler can resume
+
+    Arguments:
+        run_id {str} -- phone scrape run
+    """
+    success_count, failure_count, skipped_count = get_run_counts(run_id)
+
+    try:
+        crud.endjob(jobname=JOBNAME, summary=f"{success_count} phones scraped, {failure_count} failed, {skipped_count} skipped without serial number")
+    finally:
+        conn.publish(SCRAPE_DONE_CHANNEL, run_id)
+
+
+def sweep_failed_jobs(run_id: str) -> int:
+    """Report the jobs of a phone scrape run that crashed or timed out before reporting, all of their phones are counted as failed
+
+    Arguments:
+        run_id {str} -- phone scrape run
+
+    Returns:
+        int -- number of jobs reported
+    """
+    jobs = {job_id.decode(): int(phone_count) for job_id, phone_count in conn.hgetall(run_key(run_id, 'jobs')).items()}
+    failed_job_registry = FailedJobRegistry(queue=Queue(RQ_QUEUE_NAME, connection=conn))
+
+    reported = 0
+    for job_id in set(failed_job_registry.get_job_ids()) & jobs.keys():
+        if report_batch_complete(run_id, job_id, 0, jobs[job_id]):
+            logger.error(f"phone scrape job {job_id} failed before reporting, counting {jobs[job_id]} phones as failed")
+            reported += 1
+
+    return reported
+
+
+def is_scrape_run_pending(run_id: str) -> bool:
+    """True while jobs of a phone scrape run have not reported"""
+    return int(conn.get(run_key(run_id, 'pending')) or 0) > 0
+
+
+def save_batch(scraped_phones: list) -> int:
+    """Save scraped phones to database in one transaction, falling back to one phone at a time if the transaction fails
+
+    Arguments:
+        scraped_phones {list} -- list of PhoneScraper objects
+
+    Returns:
+        int -- number of phones saved
+    """
+    try:
+        with session_scope() as db:
+            crud.merge_phonescraper_data_list(scraped_phones, db=db)
+    except Exception as e:
+        logger.error(f'error saving batch of {len(scraped_phones)} phones to db, retrying one phone at a time', exc_info=e)
+    else:
+        logger.debug(f"successfully saved {len(scraped_phones)} phones to database")
+        return len(scraped_phones)
+
+    # a single bad row fails the whole transaction, save the rest individually
+    saved_count = 0
+    for phone_scrape_data in scraped_phones:
+        try:
+            with session_scope() as db:
+                crud.merge_phonescraper_data_list([phone_scrape_data], db=db)
+        except Exception as e:
+            logger.error(f'error saving {phone_scrape_data.devicename} to db, at %s', 'render', exc_info=e)
+        else:
+            saved_count += 1
+
+    return saved_count
+
+
+def scrape_batch(phones: list, run_id: str = None):
+    """Scrape a chunk of phones concurrently and write the results to database in one transaction.
+    This function is handled by RQ workers
+
+    Arguments:
+        phones {list} -- list of (ip, model, CUCM firmware) tuples
+
+    Keyword Arguments:
+        run_id {str} -- phone scrape run to report success/failure counts to (default: {None})
+    """
+    saved_count = 0
+    skipped_count = 0
+
+    try:
+        # scrape all phones in the chunk over one pooled HTTP client
+        results = scrape_phones([(ip, model) for ip, model, firmware in phones], concurrency=config.phonescrape_concurrency)
+
+        scraped_phones = []
+        for (ip, model, firmware), result in zip(phones, results):
+            if isinstance(result, NameError):
+                logger.error(f"error scraping ip {ip}, unable to find hostname")
+            elif isinstance(result, ConnectionRefusedError):
+                logger.error(f"error scraping ip {ip}, {result}")
+            elif isinstance(result, Exception):
+                logger.error(f'error scraping ip {ip}, at %s', 'render', exc_info=result)
+            elif result.sn == "":
+                logger.debug(f"skipping ip {ip}, no serial number found")
+                skipped_count += 1
+            else:
+                result.date_modified = datetime.now()
+                result.cucm_firmware = firmware
+                scraped_phones.append(result)
+
+        logger.debug(f"successfully scraped {len(scraped_phones)} out of {len(phones)} phones, attempting to save data to database")
+
+        # save to database, one commit for the whole chunk
+        saved_count = save_batch(scraped_phones)
+
+        # recompute dashboard statistics now rather than on the next API request
+        if saved_count > 0:
+            try:
+                crud.refresh_phone_stats()
+            except Exception as e:
+                logger.error('error refreshing phone statistics', exc_info=e)
+
+    finally:
+        if run_id != None:
+            job = get_current_job()
+            report_batch_complete(run_id, job.id if job else uuid.uuid4().hex, saved_count, len(phones) - saved_count - skipped_count, skipped_count)
+
+
+def rq_scrape_phones(cluster: str = None, incremental: bool = None) -> str:
     """Initiate phone scrape update against IP phones
 
-    This function queries IP phone IPS/models from database, and passes the actual scraping to RQ to be handled by workers
+    This function queries IP phone IPS/models from database, and passes the actual scraping to RQ to be handled by workers.
+    It returns as soon as the jobs are enqueued, the last job to finish ends the run (see finish_scrape_run)
 
     Keyword Arguments:
         cluster {str} -- Can process phone scraper against a single cluster if desired (default: {None})
+        incremental {bool} -- Only scrape phones that are new, re-registered, or changed IP/firmware since their last scrape,
+            phones scraped longer than PHONESCRAPE_MAX_AGE_HOURS ago are always scraped.  Uses PHONESCRAPE_INCREMENTAL if not set (default: {None})
 
+    Returns:
+        str -- run ID of the phone scrape run, None if there were no phones to scrape and the run already ended
     """
     
     # Update JobStatus to indicate job started
-    jobname="phone scraper"
-    crud.startjob(jobname=jobname)
+    crud.startjob(jobname=JOBNAME)
+
+    if incremental is None:
+        incremental = config.phonescrape_incremental
 
     # Query database for phone IP and model Info
     logger.info(f"querying DB for phone info")
-    phone_list = crud.get_phone_data_for_phonescraper(cluster_name=cluster)
+    if incremental:
+        phone_list = crud.get_changed_phone_data_for_phonescraper(max_age=timedelta(hours=config.phonescrape_max_age_hours), cluster_name=cluster)
+        logger.info(f"incremental phone scrape, {len(phone_list)} phones changed since their last scrape")
+    else:
+        phone_list = crud.get_phone_data_for_phonescraper(cluster_name=cluster)
 
     # only scrape phones registered in last 24 hours
     phones_reg_in_last_24_hours = []
@@ -75,7 +283,7 @@ def rq_scrape_phones(cluster: str = None):
             phones_reg_in_last_24_hours.append(phone) # include phones registered in the last 24 hours into list for scraping
 
     # set RQ queue name
-    rq_queue_name = 'phonescraper'
+    rq_queue_name = RQ_QUEUE_NAME
     q = Queue(rq_queue_name, connection=conn)
 
     # check queue size, if it is more than 25, then it didn't finish from previous run
@@ -84,22 +292,38 @@ def rq_scrape_phones(cluster: str = None):
 
     logger.info(f"starting phone scrape")
 
-    # Loop through all phones and add a scrape job to RQ
+    # Loop through all phones and collect the ones that can be scraped
+    phones_to_scrape = []
     for index, phone in enumerate(phones_reg_in_last_24_hours):
         if phone.ipv4 == '' or phone.ipv4 == None:
             logger.debug(f"skipping {phone.devicename} because no IP is available - {index} out of {len(phones_reg_in_last_24_hours)}")
         else:
-            logger.debug(f"add job for {phone.devicename} {phone.ipv4} - {index} out of {len(phones_reg_in_last_24_hours)}")
-            q.enqueue(scrape,kwargs={'ip': phone.ipv4,'model': phone.Model}) # Enqueue the scrape job to Redis Queue to be handled by the RQ workers
-
-    # Wait until the Redis Queue length is 0.  Poll queue length every 30 seconds.  This could take hours depending on phone count in clusters
-    while len(q) > 0:
-        # Phone scrape jobs are still in the RQ
-        logger.debug(f"Redis queue {rq_queue_name} length is {len(q)}")
-        time.sleep(30)
-    
-    # Update JobStatus to indicate job finished
-    crud.endjob(jobname=jobname)
+            phones_to_scrape.append((phone.ipv4, phone.Model, phone.firmware))
+
+    # Enqueue one scrape job per chunk of phones to Redis Queue to be handled by the RQ workers, all jobs are sent in one round trip
+    batch_size = config.phonescrape_batch_size
+    batches = [phones_to_scrape[index:index + batch_size] for index in range(0, len(phones_to_scrape), batch_size)]
+
+    if len(batches) == 0:
+        crud.endjob(jobname=JOBNAME, summary="0 phones scraped")
+        return None
+
+    # Each job reports to the run when it finishes, the jobs are kept for the failed job sweep
+    run_id = uuid.uuid4().hex
+
+    with conn.pipeline() as pipe:
+        pipe.set(run_key(run_id, 'pending'), len(batches), ex=RUN_KEY_TTL)
+        for index, batch in enumerate(batches):
+            logger.debug(f"add job for {len(batch)} phones - {index + 1} out of {len(batches)}")
+            job = q.create_job(scrape_batch, kwargs={'phones': batch, 'run_id': run_id}, timeout=600)
+            q.enqueue_job(job, pipeline=pipe)
+            pipe.hset(run_key(run_id, 'jobs'), job.id, len(batch))
+        pipe.expire(run_key(run_id, 'jobs'), RUN_KEY_TTL)
+        pipe.execute()
+
+    publish_event('scrape_started', {'run_id': run_id, 'phones': len(phones_to_scrape), 'jobs': len(batches)})
+
+    return run_id
 
   
 if __name__ == "__main__":
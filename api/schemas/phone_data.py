@@ -113,4 +113,12 @@ class Phone_Cucm_Scraper_Combined(PhoneInfo):
     LLDP_Neighbor_IP: str = None
     LLDP_Neighbor_Port: str = None
     ITL: str = None
-    last_scraped: str = None
\ No newline at end of file
+    last_scraped: str = None
+
+# bulk lookup keys, each list is matched exactly against its own field
+
+class PhoneLookup(BaseModel):
+    ip: List[str] = []
+    dn: List[str] = []
+    sn: List[str] = []
+    mac: List[str] = []
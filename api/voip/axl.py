@@ -32,7 +32,8 @@ class AXL_Objects:
                 server=cucm_connection.server, 
                 cucm_version=cucm_connection.version,
                 ssl_verify_cert= cucm_connection.ssl_verification,
-                ssl_ca_trust_file= None if cucm_connection.ssl_ca_trust_file == None else os.path.join(config.ca_certs_folder,cucm_connection.ssl_ca_trust_file)
+                ssl_ca_trust_file= None if cucm_connection.ssl_ca_trust_file == None else os.path.join(config.ca_certs_folder,cucm_connection.ssl_ca_trust_file),
+                axl_url= None if config.axl_url == '' else config.axl_url.format(server=cucm_connection.server)
             )
 
     def get_cluster(self, cluster_name: str) -> CUCM_AXL_API:
@@ -1,4 +1,6 @@
 import os
+import hashlib
+from collections import deque
 from requests import Session
 from requests.auth import HTTPBasicAuth
 from zeep import Client
@@ -39,6 +41,12 @@ class CUCM_Serviceability_API(object):
         self.wsdl = f'https://{server}:8443/realtimeservice2/services/RISService70?wsdl'
         self.server = server
 
+        # batch of device names to (StateInfo, registered phones) returned by the last get_registered_phones query of the batch
+        self.state_cache = {}
+
+        # monotonic times of the RisPort70 queries sent in the last minute
+        self.request_times = deque()
+
         logger.debug(f"Inializing CUCM serviceability object for {self.server}")
 
         # Build Client Object for RisPort70 Service
@@ -65,6 +73,11 @@ class CUCM_Serviceability_API(object):
     def get_registered_phones(self, phone_mac_list, querylimit=1000):
         """Queries CUCM Serviceability for real-time info service data
 
+        Phones are queried in batches of sorted device names, so the same phones land in the same batch every run.  The
+        StateInfo returned for each batch is sent with the next query of that batch, RIS then returns no devices if
+        nothing changed and the devices returned last time are reused.  Queries are rate limited to
+        RIS_REQUESTS_PER_MINUTE instead of sleeping after every batch
+
         Arguments:
             phone_mac_list {List of MACs} -- list of Phone DeviceNames to use in Serviceability query
 
@@ -77,21 +90,21 @@ class CUCM_Serviceability_API(object):
         serviceability_phones_list = []
 
         # split phones into multiple lists if needed
-        if len(phone_mac_list) > querylimit:
-            phone_mac_list = list(splitlist(phone_mac_list, querylimit))
-        else:
-            # embeed the phone list in another list
-            phone_mac_list = [phone_mac_list]
-        i=0
-        for batch_of_phones in phone_mac_list:
-            i+=1
-            batch_phone_results_list = []
+        batches = list(splitlist(sorted(phone_mac_list), querylimit))
+
+        # batches that are no longer queried are dropped from the StateInfo cache
+        state_cache = {}
+        unchanged_count = 0
+
+        for i, batch_of_phones in enumerate(batches, start=1):
+            batch_key = hashlib.sha1('\n'.join(batch_of_phones).encode()).hexdigest()
+            StateInfo, cached_phones = self.state_cache.get(batch_key, ('', []))
 
-            logger.info(f"Serviceability query batch {i} of {len(phone_mac_list)}")
+            logger.info(f"Serviceability query batch {i} of {len(batches)}")
 
             # Run SelectCmDeviceExt
             CmSelectionCriteria = {
-                'MaxReturnedDevices': '1000',
+                'MaxReturnedDevices': str(querylimit),
                 'DeviceClass': 'Phone',
                 'Model': '255',
                 'Status': 'Registered',
@@ -104,7 +117,7 @@ class CUCM_Serviceability_API(object):
                 'DownloadStatus': 'Any'
             }
 
-            StateInfo = ''
+            self.wait_for_rate_limit()
             try:
                 resp = self.client.service.selectCmDeviceExt(
                     CmSelectionCriteria=CmSelectionCriteria,
@@ -112,21 +125,37 @@ class CUCM_Serviceability_API(object):
             except Fault:
                 raise
 
-            CmNodes = resp.SelectCmDeviceResult.CmNodes.item
+            batch_phone_results_list = []
+            CmNodes = resp.SelectCmDeviceResult.CmNodes.item if resp.SelectCmDeviceResult.CmNodes != None else []
             for CmNode in CmNodes:
-                if len(CmNode.CmDevices.item) > 0:
-                    # If the node has returned CmDevices, save to the snapshot to
-                    # later compare
+                if CmNode.CmDevices != None and len(CmNode.CmDevices.item) > 0:
                     for item in CmNode.CmDevices.item:
-                        # Creates a new list if the key in the dictionary isn't yet
-                        # assigned or simply appends to the entry if there is already
-                        # a value present
-
                         if (item.Status == "Registered"):  # only keep data for registered phones
                             batch_phone_results_list.append(item)
 
-            serviceability_phones_list = serviceability_phones_list + batch_phone_results_list
-            if(len(phone_mac_list)!=i):
-                time.sleep(10)  # delay a little in between querying Serviceability to prevent overloading system
+            # RIS returns no devices and the same StateInfo when nothing changed since StateInfo was returned
+            if StateInfo != '' and resp.StateInfo == StateInfo and resp.SelectCmDeviceResult.TotalDevicesFound == 0:
+                batch_phone_results_list = cached_phones
+                unchanged_count += 1
+
+            state_cache[batch_key] = (resp.StateInfo or '', batch_phone_results_list)
+            serviceability_phones_list.extend(batch_phone_results_list)
+
+        self.state_cache = state_cache
+        logger.info(f"Serviceability returned {len(serviceability_phones_list)} registered phones, {unchanged_count} of {len(batches)} batches unchanged")
 
         return serviceability_phones_list
+
+    def wait_for_rate_limit(self):
+        """Sleep until another RisPort70 query can be sent without going over RIS_REQUESTS_PER_MINUTE"""
+        now = time.monotonic()
+        while self.request_times and now - self.request_times[0] >= 60:
+            self.request_times.popleft()
+
+        if len(self.request_times) >= config.ris_requests_per_minute:
+            wait = 60 - (now - self.request_times[0])
+            logger.info(f"Serviceability rate limit of {config.ris_requests_per_minute} requests per minute reached, waiting {wait:.1f} seconds")
+            time.sleep(wait)
+            self.request_times.popleft()
+
+        self.request_times.append(time.monotonic())
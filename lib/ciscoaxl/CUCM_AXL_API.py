@@ -1,10 +1,13 @@
 import os
 import io
+import re
 import time
 from pathlib import Path
+from typing import Callable
 from requests import Session
 from requests.auth import HTTPBasicAuth
 from zeep import Client, Plugin, helpers
+from zeep.exceptions import Fault, TransportError
 from zeep.transports import Transport
 from zeep.cache import SqliteCache
 from lxml import etree
@@ -12,6 +15,59 @@ from lxml import etree
 import logging
 logger = logging.getLogger('api')
 
+# AXL fault returned when a page would exceed the AXL response size limit, ex.
+# "Query request too large. Total rows matched: 40000 rows. Suggestive Row Fetch: less than 6500 rows"
+QUERY_TOO_LARGE = re.compile(r"Query request too large.*?less than (\d+) rows", re.IGNORECASE | re.DOTALL)
+
+# executeSQLQuery columns of phones with their device pool, CSS and extension mobility login, one flat row per phone.
+# column names match the keys returned by get_phones_sql, login_time is the login epoch timestamp
+PHONE_SQL_SELECT = (
+    "d.pkid AS uuid, d.name, d.description, dp.name AS devicepool, css.name AS css, "
+    "profile.name AS em_profile, emd.datetimestamp AS login_time "
+    "FROM device d "
+    "LEFT OUTER JOIN devicepool dp ON dp.pkid = d.fkdevicepool "
+    "LEFT OUTER JOIN callingsearchspace css ON css.pkid = d.fkcallingsearchspace "
+    "LEFT OUTER JOIN extensionmobilitydynamic emd ON emd.fkdevice = d.pkid "
+    "LEFT OUTER JOIN device profile ON profile.pkid = emd.fkdevice_currentloginprofile "
+    "WHERE d.tkclass = 1"
+)
+
+# one page of all phones ordered by device name
+PHONE_SQL = "SELECT SKIP {skip} FIRST {first} " + PHONE_SQL_SELECT + " ORDER BY d.name"
+
+# phones by device pkid, used to fetch the phones returned by listChange
+PHONE_SQL_BY_UUID = "SELECT " + PHONE_SQL_SELECT + " AND d.pkid IN ({uuids})"
+
+PHONE_SQL_COLUMNS = ['uuid', 'name', 'description', 'devicepool', 'css', 'em_profile', 'login_time']
+
+# fault text CUCM returns when the AXL service is throttling requests
+THROTTLE_MESSAGES = ['throttl', 'maximum axl memory allocation consumed']
+
+
+def is_throttled(error: Exception) -> bool:
+    """Check if an AXL request failed because CUCM is throttling AXL requests or the AXL service is unavailable"""
+    if isinstance(error, TransportError):
+        return error.status_code in [429, 503]
+
+    return isinstance(error, Fault) and any(message in str(error.message).lower() for message in THROTTLE_MESSAGES)
+
+
+def normalize_uuid(uuid: str) -> str:
+    """AXL returns device uuids as {UPPER-CASE} and the database pkid column as lower-case without braces"""
+    return uuid.strip('{}').lower() if uuid else ""
+
+
+def parse_sql_rows(rows: list) -> list:
+    """Convert executeSQLQuery rows to flat dicts with the PHONE_SQL_COLUMNS keys"""
+    # each row is a list of lxml elements, one per selected column, null columns may be left out
+    rows = [{column.tag: column.text or "" for column in row} for row in rows]
+    phones = [{name: row.get(name, "") for name in PHONE_SQL_COLUMNS} for row in rows]
+    for phone in phones:
+        phone['uuid'] = normalize_uuid(phone['uuid'])
+
+    return phones
+
+
 class MyLoggingPlugin(Plugin):
 
     def ingress(self, envelope, http_headers, operation):
@@ -24,9 +80,28 @@ class MyLoggingPlugin(Plugin):
 
 class CUCM_AXL_API(object):
 
-    def __init__(self, server: str, username: str, password: str, cucm_version: str, ssl_verify_cert: bool = True, ssl_ca_trust_file: str = None):
+    def __init__(self, server: str, username: str, password: str, cucm_version: str, ssl_verify_cert: bool = True, ssl_ca_trust_file: str = None, axl_url: str = None):
+        """Initializes Zeep AXL object
+
+        Arguments:
+            server {str} -- CUCM server name or IP
+            username {str} -- CUCM username with AXL role
+            password {str} -- password for above account
+            cucm_version {str} -- CUCM version, selects the AXL schema
+
+        Keyword Arguments:
+            ssl_verify_cert {bool} -- Defines whether to validate CUCM SSL certificate (default: {True})
+            ssl_ca_trust_file {str} -- Path to custom SSL cert trust file (default: {None})
+            axl_url {str} -- AXL service URL, ex. a local fake AXL endpoint for testing (default: {https://server:8443/axl/})
+        """
         logger.debug(f"Initializing CUCM AXL object for {server}")
 
+        # latency of each listPhone page requested by the last get_all_phones call
+        self.page_metrics = []
+
+        # True if the last get_all_phones call stopped at max_phones, phones past the cap were not retrieved
+        self.truncated = False
+
         session = Session()
 
         # handle SSL verification
@@ -47,7 +122,7 @@ class CUCM_AXL_API(object):
             axl_client = Client(wsdl, transport=transport, plugins=[MyLoggingPlugin()])
             
             # WSDL file does not specify server name, set service location
-            self.client = axl_client.create_service("{http://www.cisco.com/AXLAPIService/}AXLAPIBinding",f"https://{server}:8443/axl/",)
+            self.client = axl_client.create_service("{http://www.cisco.com/AXLAPIService/}AXLAPIBinding", axl_url or f"https://{server}:8443/axl/")
 
         except Exception as e:
             logger.error(f"unable to initialize Client object - {e}")
@@ -91,29 +166,195 @@ class CUCM_AXL_API(object):
             return resp
         
 
-    def get_all_phones(self):
+    def get_phones_sql(self, first=1000, skip=0):
+        """Get phone details with executeSQLQuery, one page of PHONE_SQL ordered by device name
+
+        Returns:
+            list -- phones as flat dicts with the PHONE_SQL column names, empty values are ""
         """
-        Get all phone details
+        logger.info(f"AXL get_phones_sql request [ first={first} skip={skip} ]")
+
+        resp = self.client.executeSQLQuery(sql=PHONE_SQL.format(skip=int(skip), first=int(first)))
+
+        if resp['return'] == None:
+            return []
+        else:
+            return parse_sql_rows(resp['return']['row'])
+
+    def get_phones_by_uuid(self, uuids: list, chunk_size: int = 200) -> list:
+        """Get phone details with executeSQLQuery for a list of device uuids, uuids that aren't phones are left out
+
+        Arguments:
+            uuids {list} -- device uuids, ex. from list_changes
+
+        Keyword Arguments:
+            chunk_size {int} -- uuids per query (default: {200})
+
+        Returns:
+            list -- phones as flat dicts, see get_phones_sql
         """
+        phones = []
+        uuids = [normalize_uuid(uuid) for uuid in uuids]
 
-        batch = 1000  # get 500 phones at a time from AXL
-        skip = 0
-        max = 100000  # retrieve a max of 40,000 phones
+        for index in range(0, len(uuids), chunk_size):
+            # uuids are normalized hex strings from AXL, quote them for the IN list
+            in_list = ', '.join(f"'{uuid}'" for uuid in uuids[index:index + chunk_size] if re.fullmatch(r'[0-9a-f-]+', uuid))
+            if in_list == '':
+                continue
+
+            resp = self.client.executeSQLQuery(sql=PHONE_SQL_BY_UUID.format(uuids=in_list))
+            if resp['return'] != None:
+                phones.extend(parse_sql_rows(resp['return']['row']))
+
+        return phones
+
+    def list_changes(self, queue_id: str = None, start_change_id: int = None, max_requests: int = 100) -> tuple:
+        """Get phones added, updated or removed since a change cursor with listChange
+
+        Without a cursor only the current cursor is returned, call this before a full sync so changes made during the
+        sync are returned by the next call.  The cursor has expired if the returned queueId differs from queue_id,
+        ex. after a CUCM restart, or start_change_id is older than the first change kept in the queue
+
+        Keyword Arguments:
+            queue_id {str} -- queueId returned by the previous call (default: {None})
+            start_change_id {int} -- nextStartChangeId returned by the previous call (default: {None})
+            max_requests {int} -- max listChange requests, changes left after these are returned by the next call (default: {100})
+
+        Returns:
+            tuple -- (dict of queueId, firstChangeId, nextStartChangeId and expired, list of (uuid, action) tuples in change order,
+                action is 'a' added, 'u' updated or 'r' removed)
+        """
+        changes = []
+
+        for _ in range(max_requests):
+            if queue_id is None:
+                resp = self.client.listChange(objectList={'object': ['Phone']})
+            else:
+                resp = self.client.listChange(startChangeId={'_value_1': start_change_id, 'queueId': queue_id}, objectList={'object': ['Phone']})
+
+            queue_info = resp['queueInfo']
+            cursor = {
+                'queueId': queue_info['queueId'],
+                'firstChangeId': queue_info['firstChangeId'],
+                'nextStartChangeId': queue_info['nextStartChangeId'],
+                'expired': queue_id is not None and (
+                    queue_info['queueId'] != queue_id or (queue_info['firstChangeId'] or 0) > start_change_id
+                ),
+            }
+
+            if queue_id is None or cursor['expired']:
+                return cursor, []
+
+            page = resp['changes']['change'] if resp['changes'] != None else []
+            changes.extend((normalize_uuid(change['uuid']), change['action']) for change in page if change['type'] == 'Phone')
+
+            # the queue is drained once the cursor stops moving
+            if len(page) == 0 or queue_info['nextStartChangeId'] == start_change_id:
+                break
+            start_change_id = queue_info['nextStartChangeId']
+
+        logger.info(f"AXL listChange returned {len(changes)} phone changes [ queueId={cursor['queueId']} nextStartChangeId={cursor['nextStartChangeId']} ]")
+
+        return cursor, changes
+
+    def get_all_phones(self, **kwargs) -> list:
+        """Get all phone details with listPhone, see get_all_pages for keyword arguments
+
+        Returns:
+            list -- AXL phone objects
+        """
+        return self.get_all_pages(self.get_phones, **kwargs)
+
+    def get_all_phones_sql(self, **kwargs) -> list:
+        """Get all phone details with executeSQLQuery, see get_all_pages for keyword arguments.
+        Much cheaper than listPhone for large clusters, zeep doesn't build an object tree per phone
+
+        Returns:
+            list -- phones as flat dicts, see get_phones_sql
+        """
+        return self.get_all_pages(self.get_phones_sql, **kwargs)
+
+    def get_all_pages(self, get_page: Callable, first: int = 1000, max_first: int = 10000, max_phones: int = 100000, max_retries: int = 5, backoff: float = 5, max_backoff: float = 60) -> list:
+        """Get all phone details, one page at a time
+
+        Pages are requested back to back.  The page size doubles after every page up to max_first, and shrinks to the
+        row count CUCM suggests when a page would be larger than the AXL response limit.  Only throttling and 503
+        responses are retried, after an exponential backoff.  Any other error, or running out of retries, is raised
+        rather than returning the phones retrieved so far.  Per-page latency is kept in self.page_metrics, and
+        self.truncated is set when retrieval stopped at max_phones rather than at the last page
+
+        Arguments:
+            get_page {Callable} -- called with first and skip keyword arguments, returns a list of phones
+
+        Keyword Arguments:
+            first {int} -- phones requested in the first page (default: {1000})
+            max_first {int} -- max phones requested per page (default: {10000})
+            max_phones {int} -- stop after retrieving this many phones (default: {100000})
+            max_retries {int} -- attempts per page when AXL is throttling (default: {5})
+            backoff {float} -- seconds to wait before the first retry, doubled for every retry (default: {5})
+            max_backoff {float} -- max seconds to wait between retries (default: {60})
+
+        Raises:
+            Exception: the error raised by get_page, also raised when a page of a single phone is too large
+
+        Returns:
+            list -- phones returned by get_page
+        """
         all_phone_list = []
+        self.page_metrics = []
+        self.truncated = False
+        skip = 0
+        retries = 0
+        last_page = False
 
-        while skip <= max:
+        while skip < max_phones:
+            page_size = min(first, max_phones - skip)
+            start = time.monotonic()
             try:
-                temp_phone_list = self.get_phones(first=batch, skip=skip)
+                temp_phone_list = get_page(first=page_size, skip=skip)
             except Exception as e:
-                logger.error(f"get_all_phones error {e}")
+                too_large = QUERY_TOO_LARGE.search(str(e.message)) if isinstance(e, Fault) else None
+                # the page size shrinks on every retry, a page of one phone can't get any smaller
+                if too_large and page_size > 1:
+                    # never ask for more than CUCM suggested again, the rows left are likely the same size.
+                    # halve the page if the suggestion isn't smaller than the page that failed
+                    suggested = int(too_large.group(1))
+                    max_first = max(1, suggested - 1 if suggested <= page_size else page_size // 2)
+                    first = max_first
+                    logger.info(f"AXL page of {page_size} phones is too large, retrying with {first} phones")
+                    continue
+
+                if is_throttled(e) and retries < max_retries:
+                    wait = min(backoff * 2 ** retries, max_backoff)
+                    retries += 1
+                    logger.warning(f"AXL is throttling requests, retry {retries} of {max_retries} in {wait} seconds - {e}")
+                    time.sleep(wait)
+                    continue
+
+                logger.error(f"get_all_phones error after retrieving {len(all_phone_list)} phones [ first={page_size} skip={skip} ] - {e}")
+                raise
+
+            seconds = time.monotonic() - start
+            self.page_metrics.append({'skip': skip, 'first': page_size, 'rows': len(temp_phone_list), 'seconds': round(seconds, 3)})
+            logger.info(f"AXL page of {len(temp_phone_list)} phones retrieved in {seconds:.2f} seconds [ first={page_size} skip={skip} ]")
+
+            all_phone_list.extend(temp_phone_list)
+            skip += len(temp_phone_list)
+            retries = 0
+
+            # a short page is the last page
+            if len(temp_phone_list) < page_size:
+                last_page = True
                 break
-            else:
-                if len(temp_phone_list) == 0:
-                    break
 
-                skip = skip + batch
-                all_phone_list = all_phone_list + temp_phone_list
-                time.sleep(5)
+            first = min(first * 2, max_first)
+
+        if not last_page:
+            self.truncated = True
+            logger.warning(f"AXL retrieval stopped at max_phones {max_phones}, phones past the cap were not retrieved")
+
+        total_seconds = sum(page['seconds'] for page in self.page_metrics)
+        logger.info(f"AXL retrieved {len(all_phone_list)} phones in {len(self.page_metrics)} pages, {total_seconds:.2f} seconds spent in requests")
 
         return all_phone_list
 
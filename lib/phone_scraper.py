@@ -1,15 +1,23 @@
 import os
+import hashlib
 import subprocess
 import platform
+import asyncio
+import aiohttp
 import requests
 import re
 from datetime import datetime
 from bs4 import BeautifulSoup
+from lxml import etree
 
 import logging
 logger = logging.getLogger('api')
 
 from api.models.phone_data import PhoneScraper
+from lib.phone_scraper_profiles import MODEL_PROFILES, DEFAULT_PROFILE
+
+# seconds to wait for a phone web server to connect and to send each response, shared by the requests and aiohttp scrapers
+REQUEST_TIMEOUT = 3
 
 
 def connect_to_phone(url: str):
@@ -26,53 +34,366 @@ def connect_to_phone(url: str):
     """
     
     headers = {}
-    requests_time = 3
     
     logger.debug(f"Querying URL {url}")
 
     try:
-        response = requests.request("GET", url, headers=headers, timeout=requests_time)
+        response = requests.request("GET", url, headers=headers, timeout=REQUEST_TIMEOUT)
     except requests.exceptions.ConnectTimeout:
         raise ConnectionRefusedError(f"request timed out")
     except requests.exceptions.RequestException as e:
         raise ConnectionRefusedError(f"unable to connect {e} - {url}")
 
-    # parse requests response with Beautiful Soup
-    response_soup = BeautifulSoup(response.text, features="lxml")
+    return html_to_text(response.text)
+
+
+async def connect_to_phone_async(session: aiohttp.ClientSession, url: str):
+    """Connect to phone URLS and collect response using a shared aiohttp session
+
+    Arguments:
+        session {aiohttp.ClientSession} -- pooled HTTP client shared by all requests in the scrape run
+        url {str} -- URL to phone webpage
+
+    Raises:
+        ConnectionRefusedError: Unable to connect to phone URL
+
+    Returns:
+        str -- page text extracted by html_to_text
+    """
+
+    logger.debug(f"Querying URL {url}")
+
+    try:
+        async with session.get(url) as response:
+            response_raw = await response.text(errors='replace')
+    except asyncio.TimeoutError:
+        raise ConnectionRefusedError(f"request timed out")
+    except aiohttp.ClientError as e:
+        raise ConnectionRefusedError(f"unable to connect {e} - {url}")
+
+    return html_to_text(response_raw)
+
+
+# html_to_text mode: 'fast' (lxml parser target, BS4 fallback), 'bs4' (BeautifulSoup only)
+# or 'compare' (run both, log any difference and return the BS4 result)
+PHONESCRAPER_TEXT_MODE = os.getenv('PHONESCRAPER_TEXT_MODE', 'fast').lower()
+
+
+class HtmlTextCollector:
+    """lxml parser target that rebuilds BeautifulSoup(raw_html, features="lxml").get_text('_') from the parser events,
+    without building a tree.  Mirrors the BS4 rules used by get_text:
+
+    - text between two parser events is one string
+    - whitespace only strings collapse to a single '\n' or ' ', except inside <pre> and <textarea>
+    - comments, processing instructions, the doctype and any text inside <script>, <style> or <template> are skipped
+    """
+
+    ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+    PRESERVE_WHITESPACE_TAGS = {'pre', 'textarea'}
+    SKIPPED_STRING_TAGS = {'script', 'style', 'template'}
+
+    def __init__(self, separator: str = '_'):
+        self.separator = separator
+        self.strings = []
+        self.current_data = []
+        self.tag_stack = []
+        self.preserve_whitespace_depth = 0
+        self.skipped_depth = 0
+
+    def end_data(self):
+        if not self.current_data:
+            return
+        current_data = ''.join(self.current_data)
+        self.current_data = []
+
+        if not self.preserve_whitespace_depth and not current_data.strip(self.ASCII_SPACES):
+            current_data = '\n' if '\n' in current_data else ' '
+
+        if not self.skipped_depth:
+            self.strings.append(current_data)
+
+    def start(self, tag, attrib):
+        self.end_data()
+        self.tag_stack.append(tag)
+        if tag in self.PRESERVE_WHITESPACE_TAGS:
+            self.preserve_whitespace_depth += 1
+        if tag in self.SKIPPED_STRING_TAGS:
+            self.skipped_depth += 1
+
+    def end(self, tag):
+        self.end_data()
+        tag = self.tag_stack.pop()
+        if tag in self.PRESERVE_WHITESPACE_TAGS:
+            self.preserve_whitespace_depth -= 1
+        if tag in self.SKIPPED_STRING_TAGS:
+            self.skipped_depth -= 1
+
+    def data(self, data):
+        self.current_data.append(data)
+
+    def comment(self, text):
+        self.end_data()
+
+    def pi(self, target, data=None):
+        self.end_data()
+
+    def doctype(self, *args):
+        self.end_data()
+
+    def close(self) -> str:
+        self.end_data()
+        return self.separator.join(self.strings)
+
+
+def html_to_text_bs4(raw_html: str) -> str:
+    """Convert raw phone webpage HTML to '_' joined text with a full BeautifulSoup tree
+
+    Arguments:
+        raw_html {str} -- raw HTML returned by the phone web server
+
+    Returns:
+        str -- BS4 parsed text
+    """
+    # parse response with Beautiful Soup
+    response_soup = BeautifulSoup(raw_html, features="lxml")
     response_text = response_soup.get_text('_')
-    
+
     return response_text
 
 
-def regex_search_and_assign_if_match(attribute: str, regex_pattern: str, raw_source_text: str, phonescraper_object: PhoneScraper, regex_group: int = 2) -> PhoneScraper:
-    """Regex search of BeautifulSoup text result.  If a match is found, store value in attribute in phonescraper_object
+def html_to_text_lxml(raw_html: str) -> str:
+    """Convert raw phone webpage HTML to '_' joined text straight from the lxml parser events
 
     Arguments:
-        attribute {str} -- name of attribute to update
-        regex_pattern {str} -- regex search pattern to find data in beautifulsoup text
-        raw_source_text {str} -- beautifulsoup raw text
-        phonescraper_object {PhoneScraper} -- phone scraper object to store value
+        raw_html {str} -- raw HTML returned by the phone web server
 
-    Keyword Arguments:
-        regex_group {int} -- number of regex group to use to store value. (default: {2})
+    Raises:
+        etree.LxmlError: lxml was unable to parse the page
 
     Returns:
-        PhoneScraper -- returns updated phonescraper object
+        str -- text identical to html_to_text_bs4
     """
-    # use regex to search for regex_pattern in raw_source_text
-    regex_search_result = re.search(regex_pattern, raw_source_text)
-    
-    if regex_search_result:
-        try:
-            regex_result = regex_search_result.group(regex_group).strip() # the value we want is in the second regex group match
-            setattr(phonescraper_object, attribute, regex_result)  # assign value to attribute on phonescrape object
-        except Exception as e:
-            logger.error(f"Regex search failure for {attribute} using regex {regex_pattern} failed due to {e}")
-    else:
-        setattr(phonescraper_object, attribute, None)
+    parser = etree.HTMLParser(target=HtmlTextCollector(), recover=True)
+    parser.feed(raw_html)
+    return parser.close()
+
+
+def describe_text_difference(lxml_text: str, bs4_text: str) -> str:
+    """Short description of where two page texts differ, whole pages are too large to log for every phone"""
+    index = next((i for i, (a, b) in enumerate(zip(lxml_text, bs4_text)) if a != b), min(len(lxml_text), len(bs4_text)))
+
+    def digest(text: str) -> str:
+        return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+    return (
+        f"first difference at character {index}, lxml: {lxml_text[index:index + 40]!r} bs4: {bs4_text[index:index + 40]!r} "
+        f"[ lxml {len(lxml_text)} chars sha1 {digest(lxml_text)}, bs4 {len(bs4_text)} chars sha1 {digest(bs4_text)} ]"
+    )
+
+
+def html_to_text_compare(raw_html: str) -> str:
+    """Run both text extraction paths on the same page, log any difference and return the BS4 result
+
+    Arguments:
+        raw_html {str} -- raw HTML returned by the phone web server
+
+    Returns:
+        str -- BS4 parsed text
+    """
+    bs4_text = html_to_text_bs4(raw_html)
+    try:
+        lxml_text = html_to_text_lxml(raw_html)
+    except Exception as e:
+        logger.warning(f"lxml text extraction failed, BS4 fallback required - {e}")
+        return bs4_text
+
+    if lxml_text != bs4_text:
+        logger.debug(f"lxml text extraction differs from BS4 - {describe_text_difference(lxml_text, bs4_text)}")
+
+    return bs4_text
+
+
+def html_to_text(raw_html: str) -> str:
+    """Convert raw phone webpage HTML to the '_' joined text used by the regex parsers.
+    Uses the lxml fast path, falling back to BeautifulSoup for pages lxml can not handle.
+    Set PHONESCRAPER_TEXT_MODE to 'bs4' or 'compare' to change this.
+
+    Arguments:
+        raw_html {str} -- raw HTML returned by the phone web server
+
+    Returns:
+        str -- BS4 parsed text
+    """
+    if PHONESCRAPER_TEXT_MODE == 'bs4':
+        return html_to_text_bs4(raw_html)
+
+    if PHONESCRAPER_TEXT_MODE == 'compare':
+        return html_to_text_compare(raw_html)
+
+    try:
+        return html_to_text_lxml(raw_html)
+    except Exception as e:
+        logger.debug(f"lxml text extraction failed, falling back to BS4 - {e}")
+        return html_to_text_bs4(raw_html)
+
+
+class FieldExtractor:
+    """Precompiled extraction table for a phone webpage.
+
+    Field patterns are compiled once per process.  extract collects every label/value pair found in the
+    page into a dict, each field keeps the result re.search would have returned for its own pattern.
+    """
+
+    # marker for a field whose pattern matched but the value could not be read
+    FAILED = object()
+
+    def __init__(self, fields: list):
+        """Compile extraction table
+
+        Arguments:
+            fields {list} -- list of (attribute, regex pattern, regex group) tuples
+        """
+        self.fields = [(attribute, re.compile(regex_pattern), regex_group) for attribute, regex_pattern, regex_group in fields]
+
+    def extract(self, raw_source_text: str) -> dict:
+        """Collect the value of each field in the table from the page text
+
+        Arguments:
+            raw_source_text {str} -- beautifulsoup raw text
+
+        Returns:
+            dict -- attribute to value, only contains fields that were found in the page
+        """
+        values = {}
+
+        for attribute, regex, regex_group in self.fields:
+            regex_search_result = regex.search(raw_source_text)
+
+            if regex_search_result:
+                try:
+                    values[attribute] = regex_search_result.group(regex_group).strip()
+                except Exception as e:
+                    logger.error(f"Regex search failure for {attribute} using regex {regex.pattern} failed due to {e}")
+                    values[attribute] = self.FAILED
+
+        return values
+
+    def assign(self, values: dict, phonescraper_object: PhoneScraper) -> PhoneScraper:
+        """Store extracted values on phonescraper_object, fields that were not found are set to None
+
+        Arguments:
+            values {dict} -- result of extract
+            phonescraper_object {PhoneScraper} -- phone scraper object to store values
+
+        Returns:
+            PhoneScraper -- returns updated phonescraper object
+        """
+        for attribute, regex, regex_group in self.fields:
+            if attribute not in values:
+                setattr(phonescraper_object, attribute, None)
+            elif values[attribute] is not self.FAILED:
+                setattr(phonescraper_object, attribute, values[attribute])
+
+        return phonescraper_object
+
+
+status_message_regex = re.compile(r'[apmAPM\d:.,\-\/\[\] ]+[\n_ ]([^(_\n)]*)')
+
+
+class ModelScrapeProfile:
+    """Scrape profile from lib.phone_scraper_profiles with the field table of each page compiled"""
+
+    def __init__(self, profile: dict):
+        """Compile scrape profile
+
+        Arguments:
+            profile {dict} -- profile definition, see lib.phone_scraper_profiles
+        """
+        self.name = profile['name']
+        self.urls = profile['urls']
+        self.hostname_page = profile['hostname_page']
+        self.page_extractors = {page: FieldExtractor(fields) for page, fields in profile['pages'].items()}
+        self.itl_page = profile.get('itl_page')
+        self.normalize = profile.get('normalize', {})
+        self.set_model = profile.get('set_model', False)
+
+    def get_urls(self, ip: str) -> dict:
+        """Build the URL of each page to scrape
+
+        Arguments:
+            ip {str} -- IP address of IP phone
+
+        Returns:
+            dict -- page name to URL
+        """
+        return {page: "http://" + ip + path for page, path in self.urls.items()}
+
+    def parse(self, model: str, pages: dict) -> PhoneScraper:
+        """Parse scraped phone webpages
+
+        Arguments:
+            model {str} -- Cisco model number
+            pages {dict} -- page name to BS4 parsed text, pages that are missing or None are skipped
+
+        Raises:
+            NameError: unable to locate hostname in phone webpage
+
+        Returns:
+            PhoneScraper -- PhoneScraper model object
+        """
+
+        # Hostname parser & instantiate phonescraper object
+        hostname_text = pages.get(self.hostname_page)
+        hostname_extractor = self.page_extractors[self.hostname_page]
+        hostname_values = hostname_extractor.extract(hostname_text) if hostname_text != None else {}
+
+        if isinstance(hostname_values.get('devicename'), str):
+            phone_scrape_data = PhoneScraper(devicename=hostname_values['devicename'])
+        else:
+            raise NameError("Unable to locate hostname/devicename")
 
-    # return object
-    return phonescraper_object
+        phone_scrape_data = hostname_extractor.assign(hostname_values, phone_scrape_data)
+
+        # Other page parsers
+        for page, extractor in self.page_extractors.items():
+            if page != self.hostname_page and pages.get(page) != None:
+                phone_scrape_data = extractor.assign(extractor.extract(pages[page]), phone_scrape_data)
+
+        # Status parser (includes ITL)
+        if self.itl_page and pages.get(self.itl_page) != None:
+            statuses = status_message_regex.findall(pages[self.itl_page])
+            for status in statuses[-10:]:
+                for x in ['trust', 'itl']:
+                    if x in status.lower():
+                        phone_scrape_data.ITL =  status
+
+        for attribute, normalizer in self.normalize.items():
+            setattr(phone_scrape_data, attribute, normalizer(getattr(phone_scrape_data, attribute)))
+
+        # timestamp for last modified time
+        phone_scrape_data.date_modified = datetime.now()
+        if self.set_model:
+            phone_scrape_data.model = model
+
+        return phone_scrape_data
+
+
+# compiled once per process, models sharing a profile share the compiled profile
+compiled_profiles = {profile['name']: ModelScrapeProfile(profile) for profile in [DEFAULT_PROFILE] + list(MODEL_PROFILES.values())}
+model_profiles = {model: compiled_profiles[profile['name']] for model, profile in MODEL_PROFILES.items()}
+default_model_profile = compiled_profiles[DEFAULT_PROFILE['name']]
+
+
+def get_model_profile(model: str = None) -> ModelScrapeProfile:
+    """Look up the compiled scrape profile for a phone model
+
+    Arguments:
+        model {str} -- Model of IP phone (default: {None})
+
+    Returns:
+        ModelScrapeProfile -- profile for the model, or the default profile used by most current phone models
+    """
+    return model_profiles.get(model, default_model_profile)
 
 
 def parse_standard_models(model: str, config_text: str, device_text: str, status_text: str, network_text: str) -> PhoneScraper:
@@ -86,97 +407,12 @@ def parse_standard_models(model: str, config_text: str, device_text: str, status
         network_text {str} -- BS4 parsed requests response from network URL
 
     Raises:
-        NameError: [description]
+        NameError: unable to locate hostname in phone webpage
 
     Returns:
         PhoneScraper -- PhoneScraper model object
     """
-    
-    # ***** Config Parser *****
-    if config_text != None:
-
-        # Hostname parser & instantiate phonescraper object
-        res = re.search(r'(Host Name_\n_\n_|Host name_|Host Name_)([^(_| )]*)', config_text)
-        if res:
-            temp_hostname = ""
-            temp_hostname =  res.group(2).strip()
-            phone_scrape_data = PhoneScraper(devicename=temp_hostname)
-        else:
-            raise NameError("Unable to locate hostname/devicename")
-
-        phone_scrape_data = regex_search_and_assign_if_match('domain_name', '(Domain Name_\n_\n_|Domain name_|Domain Name_)([^(_| )]*)', config_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('dhcp_server', '(DHCP Server_\n_\n_|DHCP server_|DHCP Server_)([^(_| )]*)', config_text, phone_scrape_data)             
-        phone_scrape_data = regex_search_and_assign_if_match('dhcp', '(DHCP Enabled_\n_\n_|DHCP Enabled_|DHCP_)([^(_| )]*)', config_text, phone_scrape_data)            
-        phone_scrape_data = regex_search_and_assign_if_match('ip_address', '(IP Address_\n_\n_|IP address_|IP Address_)([^(_| )]*)', config_text, phone_scrape_data)            
-        phone_scrape_data = regex_search_and_assign_if_match('subnetmask', '(Subnet Mask_\n_\n_|Subnet mask_|Subnet Mask_)([^(_| )]*)', config_text, phone_scrape_data)              
-        phone_scrape_data = regex_search_and_assign_if_match('gateway', '(Default Router 1_\n_\n_|Default router_|Default Router 1_|Default Router_)([^(_| )]*)', config_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('dns1', '(DNS Server 1_\n_\n_|DNS server 1_|DNS Server 1_)([^(_| )]*)', config_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('dns2', '(DNS Server 2_\n_\n_|DNS server 2_|DNS Server 2_)([^(_| )]*)', config_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('alt_tftp', '(Alternate TFTP_\n_\n_|Alternate TFTP_)([^(_| )]*)', config_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('tftp1', '(TFTP Server 1_\n_\n_|TFTP server 1_|TFTP Server 1_|TFTP Server 1)([^(_| )]*)', config_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('tftp2', '(TFTP Server 2_\n_\n_|TFTP server 2_|TFTP Server 2_|TFTP Server 2)([^(_| )]*)', config_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('op_vlan', '(Operational VLAN Id_\n_\n_|Operational VLAN ID_|Operational VLAN Id_)([^(_| )]*)', config_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('admin_vlan', '(Admin. VLAN Id_\n_\n_|Admin VLAN ID_|Admin VLAN Id_)([^(_| )]*)', config_text, phone_scrape_data)      
-        
-        # CUCM server parser - some models differ on this
-        if model == "8821":
-            phone_scrape_data = regex_search_and_assign_if_match('cucm1', '( Server 1_)([^(_| )]*)', config_text, phone_scrape_data)
-            phone_scrape_data = regex_search_and_assign_if_match('cucm2', '( Server 2_)([^(_| )]*)', config_text, phone_scrape_data)
-            phone_scrape_data = regex_search_and_assign_if_match('cucm3', '( Server 3_|Server 3 SRST_\n_\n_)([^(_| )]*)', config_text, phone_scrape_data) 
-            phone_scrape_data = regex_search_and_assign_if_match('cucm4', '( Server 4_|Server 4 SRST_\n_\n_)([^(_| )]*)', config_text, phone_scrape_data)
-            phone_scrape_data = regex_search_and_assign_if_match('cucm5', '( Server 5_)([^(_| )]*)', config_text, phone_scrape_data)
-        else:
-            phone_scrape_data = regex_search_and_assign_if_match('cucm1', '(CUCM server1|CUCM Server1|Unified CM 1|Unified CM1|CallManager 1|Call Manager 1)( SRST| TFTP)?(_\n_\n_|_)?([^(_| )]*)', config_text, phone_scrape_data, 4)         
-            phone_scrape_data = regex_search_and_assign_if_match('cucm2', '(CUCM server2|CUCM Server2|Unified CM 2|Unified CM2|CallManager 2|Call Manager 2)( SRST| TFTP)?(_\n_\n_|_)?([^(_| )]*)', config_text, phone_scrape_data, 4)       
-            phone_scrape_data = regex_search_and_assign_if_match('cucm3', '(CUCM server3|CUCM Server3|Unified CM 3|Unified CM3|CallManager 3|Call Manager 3)( SRST| TFTP)?(_\n_\n_|_)?([^(_| )]*)', config_text, phone_scrape_data, 4)          
-            phone_scrape_data = regex_search_and_assign_if_match('cucm4', '(CUCM server4|CUCM Server4|Unified CM 4|Unified CM4|CallManager 4|Call Manager 4)( SRST| TFTP)?(_\n_\n_|_)?([^(_| )]*)', config_text, phone_scrape_data, 4)          
-            phone_scrape_data = regex_search_and_assign_if_match('cucm5', '(CUCM server5|CUCM Server5|Unified CM 5|Unified CM5|CallManager 5|Call Manager 5)( SRST| TFTP)?(_\n_\n_|_)?([^(_| )]*)', config_text, phone_scrape_data, 4)
-            
-        # URL parser
-        phone_scrape_data = regex_search_and_assign_if_match('info_url', '(Information URL_)([^(_| )]*)', config_text, phone_scrape_data)      
-        phone_scrape_data = regex_search_and_assign_if_match('dir_url', '(Directories URL_)([^(_| )]*)', config_text, phone_scrape_data)               
-        phone_scrape_data = regex_search_and_assign_if_match('msg_url', '(Messages URL_)([^(_| )]*)', config_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('svc_url', '(Services URL_)([^(_| )]*)', config_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('idle_url', '(Idle URL_)([^(_| )]*)', config_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('info_url_time', '(Idle URL time_)([^(_| )]*)', config_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('proxy_url', '(Proxy Server URL_|Proxy server URL)([^(_| )]*)', config_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('auth_url', '(Authentication URL_)([^(_| )]*)', config_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('tvs', '(TVS_)([^(_| )]*)', config_text, phone_scrape_data)
-
-    # ***** Device Parser *****
-    if device_text != None:
-        phone_scrape_data = regex_search_and_assign_if_match('sn', '(Serial Number_\n_\n_|Serial number_|Serial Number_)([^(_| |_\n)]*)', device_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('firmware', '(Version__\n_\n_|Version_)([^(_| )]*)', device_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('dn', '(Phone DN_\n_\n_|Phone DN_)([^(_| )]*)', device_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('model', '(Model Number_\n_\n_|Model number_|Model Number_)([^(_| )]*)', device_text, phone_scrape_data)
-        if hasattr(phone_scrape_data, 'model'):
-            if 'CP' in phone_scrape_data.model: # Normalize model info
-                phone_scrape_data.model = phone_scrape_data.model.replace('CP-', '')
-        
-        phone_scrape_data = regex_search_and_assign_if_match('kem1', '(Key expansion module 1_|Key Expansion Module 1_)([^(_| )]*)', device_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('kem2', '(Key expansion module 2_|Key Expansion Module 2_)([^(_| )]*)', device_text, phone_scrape_data)      
-
-    # ***** Network Parser *****
-    if network_text != None:
-        phone_scrape_data = regex_search_and_assign_if_match('CDP_Neighbor_ID', r'(Neighbor Device ID_\n_\n|CDP Neighbor device ID|CDP Neighbor Device ID)_(\w[^(_)]*)', network_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('CDP_Neighbor_IP', r'(Neighbor IP Address_\n_\n|CDP Neighbor IP address|CDP Neighbor IP Address|CDP Neighbor IPv4 Address)_(\w[^(_)]*)', network_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('CDP_Neighbor_Port', r'(Neighbor Port_\n_\n|CDP Neighbor Port|CDP Neighbor port)_(\w[^(_)]*)', network_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('LLDP_Neighbor_ID', r'(LLDP Neighbor Device ID|LLDP Neighbor device ID)_(\w[^(_)]*)', network_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('LLDP_Neighbor_IP', r'(LLDP Neighbor IP Address|LLDP Neighbor IP address|LLDP Neighbor IPv4 Address)_(\w[^(_)]*)', network_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('LLDP_Neighbor_Port', r'(LLDP Neighbor Port|LLDP Neighbor port)_(\w[^(_)]*)', network_text, phone_scrape_data)       
-    
-    # Status parser (includes ITL)
-    if status_text != None:      
-        statuses = re.findall(r'[apmAPM\d:.,\-\/\[\] ]+[\n_ ]([^(_\n)]*)', status_text)
-        for status in statuses[-10:]:
-            for x in ['trust', 'itl']:
-                if x in status.lower():
-                    phone_scrape_data.ITL =  status
-
-    # timestamp for last modified time
-    phone_scrape_data.date_modified = datetime.now()
-
-    return(phone_scrape_data)
+    return get_model_profile(model).parse(model, {'config': config_text, 'device': device_text, 'status': status_text, 'network': network_text})
 
 
 def parse_7937_model(device_text: str, network_text:str) -> PhoneScraper:
@@ -187,59 +423,9 @@ def parse_7937_model(device_text: str, network_text:str) -> PhoneScraper:
         network_text {str} -- BS4 parsed requests response network page /localmenus.cgi?func=219
 
     Returns:
-        PhoneScraper -- [description]
+        PhoneScraper -- PhoneScraper model object
     """
-
-    # ***** Device Parser *****
-    if device_text != None:
-
-        # Hostname parser & instantiate phonescraper object
-        res = re.search(r'(Host Name : *)([^(_| )]*)', device_text)
-        if res:
-            temp_hostname = ""
-            temp_hostname =  res.group(2).strip()
-            phone_scrape_data = PhoneScraper(devicename=temp_hostname)
-        else:
-            raise NameError("Unable to locate hostname/devicename")
-
-        # Other Device Parsers
-        phone_scrape_data = regex_search_and_assign_if_match('sn', '(Serial Number: *)([^(_| |_\n)]*)', device_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('firmware', '(Software Version : *)([^_| ]*)', device_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('dn', '(Phone DN : *)([^(_| )]*)', device_text, phone_scrape_data)
-         
-    # ***** Network Parser *****
-    if network_text != None:
-        phone_scrape_data = regex_search_and_assign_if_match('domain_name', '(Domain Name : *)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('dhcp', '(DHCP Enabled : *)([^(_| )]*)', network_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('ip_address', '(IP Address : *)([^(_| )]*)', network_text, phone_scrape_data)      
-        phone_scrape_data = regex_search_and_assign_if_match('subnetmask', '(Subnet Mask : *)([^(_| )]*)', network_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('gateway', '(Default Router 1 : *)([^(_| )]*)', network_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('dns1', '(DNS Server 1 : *)([^(_| )]*)', network_text, phone_scrape_data)      
-        phone_scrape_data = regex_search_and_assign_if_match('dns2', '(DNS Server 2 : *)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('alt_tftp', '(Alternate TFTP : *)([^(_| )]*)', network_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('tftp1', '(TFTP Server 1 : *)([^(_| )]*)', network_text, phone_scrape_data)        
-        phone_scrape_data = regex_search_and_assign_if_match('tftp2', '(TFTP Server 2 : *)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('op_vlan', '(Operational VLAN Id : *)([^(_| )]*)', network_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('admin_vlan', '(Admin. VLAN Id : *)([^(_| )]*)', network_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('cucm1', '(CallManager 1 : *)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('cucm2', '(CallManager 2 : *)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('cucm3', '(CallManager 3 : *|CallManager 3 SRST : *|CallManager 3 TFTP : *)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('cucm4', '(CallManager 4 : *|CallManager 4 SRST : *|CallManager 4 TFTP : *)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('cucm5', '(CallManager 5 : *|CallManager 5 SRST : *|CallManager 5 TFTP : *)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('info_url', '(Information URL : *)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('dir_url', '(Directories URL : *)([^(_| )]*)', network_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('msg_url', '(Messages URL : *)([^(_| )]*)', network_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('svc_url', '(Services URL : *)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('idle_url', '(Idle URL : *)([^(_| )]*)', network_text, phone_scrape_data)      
-        phone_scrape_data = regex_search_and_assign_if_match('info_url_time', '(Idle URL Time : *)([^(_| )]*)', network_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('proxy_url', '(Proxy Server URL : *)([^(_| )]*)', network_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('auth_url', '(Authentication URL : *)([^(_| )]*)', network_text, phone_scrape_data)
-
-    # timestamp for last modified time
-    phone_scrape_data.date_modified = datetime.now()
-    phone_scrape_data.model = "7937"
-    
-    return(phone_scrape_data)
+    return compiled_profiles['7937'].parse("7937", {'device': device_text, 'network': network_text})
 
 
 def parse_6901_model(model: str, device_text: str, network_text:str) -> PhoneScraper:
@@ -251,56 +437,9 @@ def parse_6901_model(model: str, device_text: str, network_text:str) -> PhoneScr
         network_text {str} -- BS4 parsed requests response network page /Network_Setup.html
 
     Returns:
-        PhoneScraper -- [description]
+        PhoneScraper -- PhoneScraper model object
     """
-
-    # TODO this is missing the 'URL' settings. Not sure if this phone model supports that
-    # TODO this is missing the ITL value, not sure if this phone supports that.
-    # TODO this is missing the CDP/LLDP values, not sure if this phone supports that.
-
-    # ***** Device Parser *****
-    if device_text != None:
-
-        # Hostname parser & instantiate phonescraper object
-        res = re.search(r'(Host Name_\n_\n_*)([^(_| )]*)', device_text)
-        if res:
-            temp_hostname = ""
-            temp_hostname =  res.group(2).strip()
-            phone_scrape_data = PhoneScraper(devicename=temp_hostname)
-        else:
-            raise NameError("Unable to locate hostname/devicename")
-
-         # Other Device Parsers
-        phone_scrape_data = regex_search_and_assign_if_match('sn', '(Serial Number_\n_\n_*)([^(_| |_\n)]*)', device_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('firmware', '(App Load ID_\n_\n_*)([^_| ]*)', device_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('dn', '(Phone DN_\n_\n_*)([^(_| )]*)', device_text, phone_scrape_data)
-         
-    # ***** Network Parser *****
-    if network_text != None:
-        phone_scrape_data = regex_search_and_assign_if_match('domain_name', '(Domain Name_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('dhcp', '(DHCP Enabled_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('dhcp_server', '(DHCP Server_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('ip_address', '(IP Address_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('subnetmask', '(Subnet Mask_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('gateway', '(Default Router 1_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('dns1', '(DNS Server 1_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('dns2', '(DNS Server 2_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('alt_tftp', '(Alternate TFTP_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)       
-        phone_scrape_data = regex_search_and_assign_if_match('tftp1', '(TFTP Server 1_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('tftp2', '(TFTP Server 2_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('op_vlan', '(Operational VLAN ID_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('admin_vlan', '(Admin VLAN ID_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('cucm1', '(Unified CM 1_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)      
-        phone_scrape_data = regex_search_and_assign_if_match('cucm2', '(Unified CM 2_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('cucm3', '(Unified CM 3_\n_\xa0_\n_|Unified CM 3 SRST_\n_\xa0_\n_|Unified CM 3 TFTP_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('cucm4', '(Unified CM 4_\n_\xa0_\n_|Unified CM 4 SRST_\n_\xa0_\n_|Unified CM 4 TFTP_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('cucm5', '(Unified CM 5_\n_\xa0_\n_|Unified CM 5 SRST_\n_\xa0_\n_|Unified CM 5 TFTP_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-
-    # timestamp for last modified time
-    phone_scrape_data.date_modified = datetime.now()
-    phone_scrape_data.model = model
-
-    return(phone_scrape_data)
+    return compiled_profiles['6900'].parse(model, {'device': device_text, 'network': network_text})
 
 
 def parse_ata187_model(model: str, device_text: str, network_text:str) -> PhoneScraper:
@@ -312,65 +451,35 @@ def parse_ata187_model(model: str, device_text: str, network_text:str) -> PhoneS
         network_text {str} -- BS4 parsed requests response network page /Network_Setup.html
 
     Returns:
-        PhoneScraper -- [description]
+        PhoneScraper -- PhoneScraper model object
     """
+    return compiled_profiles['ATA 187'].parse(model, {'device': device_text, 'network': network_text})
 
-    # TODO this is missing the 'URL' settings. Not sure if this phone model supports that
-    # TODO this is missing the ITL value, not sure if this phone supports that.
-    # TODO this is missing the CDP/LLDP values, not sure if this phone supports that.
 
-    # ***** Device Parser *****
-    if device_text != None:
+def get_model_urls(ip: str, model: str = None) -> dict:
+    """Determine which phone webpages need to be scraped based on model
 
-        # Hostname parser & instantiate phonescraper object
-        # ATA doesn't actually have a hostname field in the webpage, so going to use MAC instead
-        res = re.search(r'(MAC Address_\n_\n_)([^(_| )]*)', device_text)
-        if res:
-            temp_hostname = ""
-            temp_hostname =  res.group(2).strip()
-            temp_hostname = "SEP" + temp_hostname.replace(':','')  # Normalize hostname to same format as other models
-            phone_scrape_data = PhoneScraper(devicename=temp_hostname)
-        else:
-            raise NameError("Unable to locate hostname/devicename")
+    Arguments:
+        ip {str} -- IP address of IP phone
+        model {str} -- Model of IP phone (default: {None})
+
+    Returns:
+        dict -- page name (config/device/status/network) to URL
+    """
+    return get_model_profile(model).get_urls(ip)
 
-         # Other Device Parsers
-        phone_scrape_data = regex_search_and_assign_if_match('sn', '(Serial Number_\n_\n_)([^(_| |_\n)]*)', device_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('firmware', '(App Load ID_\n_\n_*)([^_| ]*)', device_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('dn', '(Phone 1 DN_\n_\n_*)([^(_| )]*)', device_text, phone_scrape_data)
-         
-    # ***** Network Parser *****
-    if network_text != None:
-        phone_scrape_data = regex_search_and_assign_if_match('domain_name', '(Domain Name_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('dhcp', '(DHCP Mode_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        if hasattr(phone_scrape_data, 'dhcp'):
-            # Normalize value of dhcp to 'Yes' or 'No' to be like other phone models
-            phone_scrape_data.dhcp =  "Yes" if phone_scrape_data.dhcp == "Enable" else "No"
-
-        phone_scrape_data = regex_search_and_assign_if_match('dhcp_server', '(DHCP Server_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('ip_address', '(IP Address_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)      
-        phone_scrape_data = regex_search_and_assign_if_match('subnetmask', '(Subnet Mask_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('gateway', '(Default Router 1_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('dns1', '(DNS Server 1_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)      
-        phone_scrape_data = regex_search_and_assign_if_match('dns2', '(DNS Server 2_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('alt_tftp', '(Alternate Mode_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        if hasattr(phone_scrape_data, 'alt_tftp'):
-            # Normalize value of Alt TFTP to 'Yes' or 'No' to be like other phone models
-            phone_scrape_data.alt_tftp =  "Yes" if phone_scrape_data.alt_tftp == "Enable" else "No"
-        
-        phone_scrape_data = regex_search_and_assign_if_match('tftp1', '(TFTP Server 1_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('tftp2', '(TFTP Server 2_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('admin_vlan', '(Admin. VLAN ID_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('cucm1', '(Call Manager 1_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('cucm2', '(Call Manager 2_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('cucm3', '(Call Manager 3_\n_\xa0_\n_|Call Manager 3 SRST_\n_\xa0_\n_|Call Manager 3 TFTP_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('cucm4', '(Call Manager 4_\n_\xa0_\n_|Call Manager 4 SRST_\n_\xa0_\n_|Call Manager 4 TFTP_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-        phone_scrape_data = regex_search_and_assign_if_match('cucm5', '(Call Manager 5_\n_\xa0_\n_|Call Manager 5 SRST_\n_\xa0_\n_|Call Manager 5 TFTP_\n_\xa0_\n_)([^(_| )]*)', network_text, phone_scrape_data)
-
-    # timestamp for last modified time
-    phone_scrape_data.date_modified = datetime.now()
-    phone_scrape_data.model = model
-    
-    return(phone_scrape_data)
+
+def parse_model_pages(model: str, pages: dict) -> PhoneScraper:
+    """Pass scraped phone webpages to the parser for the phone model
+
+    Arguments:
+        model {str} -- Model of IP phone
+        pages {dict} -- page name to BS4 parsed text, keys match get_model_urls
+
+    Returns:
+        PhoneScraper -- returns object
+    """
+    return get_model_profile(model).parse(model, pages)
 
 
 def allDetails(ip: str, model: str = None) -> PhoneScraper:
@@ -390,34 +499,93 @@ def allDetails(ip: str, model: str = None) -> PhoneScraper:
 
     logger.debug(f"Starting scrape for model {model} at IP {ip}")
 
-    # Determine URL based on model
-    if model == "7940" or model == "7960":
-        config_text = connect_to_phone("http://"+ip+"/NetworkConfiguration")
-        device_text = connect_to_phone("http://"+ip+"/DeviceInformation")
-        status_text = connect_to_phone("http://"+ip+"/DeviceLog?2")
-        network_text = connect_to_phone("http://" + ip + "/PortInformation?1")
-        phone_scrape_data = parse_standard_models(model, config_text, device_text, status_text, network_text)
-    elif model == "6901":  ## TODO do we need to add 6911, 6921, 6961, etc ?
-        device_text = connect_to_phone("http://"+ip+"/Device_Information.html")
-        network_text = connect_to_phone("http://"+ip+"/Network_Setup.html")
-        phone_scrape_data = parse_6901_model(model, device_text, network_text)
-    elif model == "7937":
-        device_text = connect_to_phone("http://"+ip+"/localmenus.cgi?func=604")
-        network_text = connect_to_phone("http://"+ip+"/localmenus.cgi?func=219")
-        phone_scrape_data = parse_7937_model(device_text, network_text)      
-    elif model == "ATA 187":
-        device_text = connect_to_phone("http://"+ip+"/Device_Information.htm")
-        network_text = connect_to_phone("http://"+ip+"/Network_Setup.htm")
-        phone_scrape_data = parse_ata187_model(model, device_text, network_text)
-    else:
-        # default URLs for most current phone models
-        config_text = connect_to_phone("http://"+ip+"/CGI/Java/Serviceability?adapter=device.statistics.configuration")
-        device_text = connect_to_phone("http://"+ip+"/CGI/Java/Serviceability?adapter=device.statistics.device")
-        status_text = connect_to_phone("http://"+ip+"/CGI/Java/Serviceability?adapter=device.settings.status.messages")
-        network_text = connect_to_phone("http://" + ip + "/CGI/Java/Serviceability?adapter=device.statistics.port.network")
-        phone_scrape_data = parse_standard_models(model, config_text, device_text, status_text, network_text)
-       
-    return phone_scrape_data
+    # Determine URL based on model, then query each page in turn
+    pages = {}
+    for page, url in get_model_urls(ip, model).items():
+        pages[page] = connect_to_phone(url)
+
+    return parse_model_pages(model, pages)
+
+
+def create_scrape_session(concurrency: int = 200) -> aiohttp.ClientSession:
+    """Create pooled aiohttp session used to scrape many phones concurrently
+
+    Keyword Arguments:
+        concurrency {int} -- maximum number of open connections in the pool (default: {200})
+
+    Returns:
+        aiohttp.ClientSession -- session, caller is responsible for closing it
+    """
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=REQUEST_TIMEOUT, sock_read=REQUEST_TIMEOUT)
+
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+async def allDetails_async(ip: str, model: str = None, session: aiohttp.ClientSession = None) -> PhoneScraper:
+    """Scrape data from IP Phone built-in web server, all model pages are requested at the same time
+
+    Arguments:
+        ip {str} -- IP address of IP phone
+        model {str} -- Model of IP phone (default: {None})
+        session {aiohttp.ClientSession} -- shared session, a temporary session is created if not provided (default: {None})
+
+    Raises:
+        ConnectionRefusedError: used if unable to reach phone web page (phone is off, web server turned off, ACL, etc)
+        NameError: unable to locate hostname in phone webpage
+
+    Returns:
+        PhoneScraper -- returns object
+    """
+
+    if session is None:
+        async with create_scrape_session() as temp_session:
+            return await allDetails_async(ip=ip, model=model, session=temp_session)
+
+    logger.debug(f"Starting async scrape for model {model} at IP {ip}")
+
+    urls = get_model_urls(ip, model)
+    responses = await asyncio.gather(*[connect_to_phone_async(session, url) for url in urls.values()])
+
+    return parse_model_pages(model, dict(zip(urls.keys(), responses)))
+
+
+async def scrape_phones_async(phones: list, concurrency: int = 200) -> list:
+    """Scrape many phones concurrently over one pooled HTTP client
+
+    Arguments:
+        phones {list} -- list of (ip, model) tuples
+
+    Keyword Arguments:
+        concurrency {int} -- maximum number of phones scraped at the same time (default: {200})
+
+    Returns:
+        list -- PhoneScraper object or the raised exception for each phone, in the same order as phones
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with create_scrape_session(concurrency=concurrency) as session:
+
+        async def scrape_one(ip: str, model: str):
+            async with semaphore:
+                return await allDetails_async(ip=ip, model=model, session=session)
+
+        return await asyncio.gather(*[scrape_one(ip, model) for ip, model in phones], return_exceptions=True)
+
+
+def scrape_phones(phones: list, concurrency: int = 200) -> list:
+    """Synchronous wrapper for scrape_phones_async, used by RQ workers
+
+    Arguments:
+        phones {list} -- list of (ip, model) tuples
+
+    Keyword Arguments:
+        concurrency {int} -- maximum number of phones scraped at the same time (default: {200})
+
+    Returns:
+        list -- PhoneScraper object or the raised exception for each phone, in the same order as phones
+    """
+    return asyncio.run(scrape_phones_async(phones=phones, concurrency=concurrency))
 
 if __name__ == "__main__":
     # used for debugging
@@ -0,0 +1,285 @@
+# Scrape profiles for each IP phone model.
+#
+# A profile lists the webpages to request from the phone and the fields to read from each page.  Profiles are
+# plain data, lib.phone_scraper compiles each one once per process.  Supporting another model that shares the
+# webpages of an existing profile only needs an entry in MODEL_PROFILES.
+#
+# Profile keys:
+#   name -- unique profile name, models sharing a profile share the compiled parser
+#   urls -- page name to URL path on the phone web server
+#   hostname_page -- page containing the 'devicename' field, a phone without it raises NameError
+#   pages -- page name to list of (PhoneScraper attribute, regex pattern, regex group containing the value)
+#   itl_page -- page holding the status messages searched for the ITL status (optional)
+#   normalize -- PhoneScraper attribute to function applied to the scraped value (optional)
+#   set_model -- store the requested model number instead of the one scraped from the phone (optional)
+
+
+def strip_cp_prefix(value: str) -> str:
+    """Normalize model info, CP-8861 -> 8861"""
+    return value.replace('CP-', '') if value else value
+
+
+def enable_to_yes_no(value: str) -> str:
+    """Normalize Enable/Disable settings to 'Yes' or 'No' to be like other phone models"""
+    return "Yes" if value == "Enable" else "No"
+
+
+def mac_to_devicename(value: str) -> str:
+    """Normalize MAC address 00:11:22:33:44:55 to the SEP001122334455 device name format used by other models"""
+    return "SEP" + value.replace(':', '')
+
+
+# Field tables used by the standard profiles.
+# Each entry is (PhoneScraper attribute, regex pattern, regex group containing the value)
+STANDARD_CONFIG_FIELDS = [
+    ('devicename', r'(Host Name_\n_\n_|Host name_|Host Name_)([^(_| )]*)', 2),
+    ('domain_name', '(Domain Name_\n_\n_|Domain name_|Domain Name_)([^(_| )]*)', 2),
+    ('dhcp_server', '(DHCP Server_\n_\n_|DHCP server_|DHCP Server_)([^(_| )]*)', 2),
+    ('dhcp', '(DHCP Enabled_\n_\n_|DHCP Enabled_|DHCP_)([^(_| )]*)', 2),
+    ('ip_address', '(IP Address_\n_\n_|IP address_|IP Address_)([^(_| )]*)', 2),
+    ('subnetmask', '(Subnet Mask_\n_\n_|Subnet mask_|Subnet Mask_)([^(_| )]*)', 2),
+    ('gateway', '(Default Router 1_\n_\n_|Default router_|Default Router 1_|Default Router_)([^(_| )]*)', 2),
+    ('dns1', '(DNS Server 1_\n_\n_|DNS server 1_|DNS Server 1_)([^(_| )]*)', 2),
+    ('dns2', '(DNS Server 2_\n_\n_|DNS server 2_|DNS Server 2_)([^(_| )]*)', 2),
+    ('alt_tftp', '(Alternate TFTP_\n_\n_|Alternate TFTP_)([^(_| )]*)', 2),
+    ('tftp1', '(TFTP Server 1_\n_\n_|TFTP server 1_|TFTP Server 1_|TFTP Server 1)([^(_| )]*)', 2),
+    ('tftp2', '(TFTP Server 2_\n_\n_|TFTP server 2_|TFTP Server 2_|TFTP Server 2)([^(_| )]*)', 2),
+    ('op_vlan', '(Operational VLAN Id_\n_\n_|Operational VLAN ID_|Operational VLAN Id_)([^(_| )]*)', 2),
+    ('admin_vlan', '(Admin. VLAN Id_\n_\n_|Admin VLAN ID_|Admin VLAN Id_)([^(_| )]*)', 2),
+]
+
+# CUCM server parser - some models differ on this
+STANDARD_CUCM_FIELDS = [
+    ('cucm1', '(CUCM server1|CUCM Server1|Unified CM 1|Unified CM1|CallManager 1|Call Manager 1)( SRST| TFTP)?(_\n_\n_|_)?([^(_| )]*)', 4),
+    ('cucm2', '(CUCM server2|CUCM Server2|Unified CM 2|Unified CM2|CallManager 2|Call Manager 2)( SRST| TFTP)?(_\n_\n_|_)?([^(_| )]*)', 4),
+    ('cucm3', '(CUCM server3|CUCM Server3|Unified CM 3|Unified CM3|CallManager 3|Call Manager 3)( SRST| TFTP)?(_\n_\n_|_)?([^(_| )]*)', 4),
+    ('cucm4', '(CUCM server4|CUCM Server4|Unified CM 4|Unified CM4|CallManager 4|Call Manager 4)( SRST| TFTP)?(_\n_\n_|_)?([^(_| )]*)', 4),
+    ('cucm5', '(CUCM server5|CUCM Server5|Unified CM 5|Unified CM5|CallManager 5|Call Manager 5)( SRST| TFTP)?(_\n_\n_|_)?([^(_| )]*)', 4),
+]
+
+MODEL_8821_CUCM_FIELDS = [
+    ('cucm1', '( Server 1_)([^(_| )]*)', 2),
+    ('cucm2', '( Server 2_)([^(_| )]*)', 2),
+    ('cucm3', '( Server 3_|Server 3 SRST_\n_\n_)([^(_| )]*)', 2),
+    ('cucm4', '( Server 4_|Server 4 SRST_\n_\n_)([^(_| )]*)', 2),
+    ('cucm5', '( Server 5_)([^(_| )]*)', 2),
+]
+
+STANDARD_URL_FIELDS = [
+    ('info_url', '(Information URL_)([^(_| )]*)', 2),
+    ('dir_url', '(Directories URL_)([^(_| )]*)', 2),
+    ('msg_url', '(Messages URL_)([^(_| )]*)', 2),
+    ('svc_url', '(Services URL_)([^(_| )]*)', 2),
+    ('idle_url', '(Idle URL_)([^(_| )]*)', 2),
+    ('info_url_time', '(Idle URL time_)([^(_| )]*)', 2),
+    ('proxy_url', '(Proxy Server URL_|Proxy server URL)([^(_| )]*)', 2),
+    ('auth_url', '(Authentication URL_)([^(_| )]*)', 2),
+    ('tvs', '(TVS_)([^(_| )]*)', 2),
+]
+
+STANDARD_DEVICE_FIELDS = [
+    ('sn', '(Serial Number_\n_\n_|Serial number_|Serial Number_)([^(_| |_\n)]*)', 2),
+    ('firmware', '(Version__\n_\n_|Version_)([^(_| )]*)', 2),
+    ('dn', '(Phone DN_\n_\n_|Phone DN_)([^(_| )]*)', 2),
+    ('model', '(Model Number_\n_\n_|Model number_|Model Number_)([^(_| )]*)', 2),
+    ('kem1', '(Key expansion module 1_|Key Expansion Module 1_)([^(_| )]*)', 2),
+    ('kem2', '(Key expansion module 2_|Key Expansion Module 2_)([^(_| )]*)', 2),
+]
+
+STANDARD_NETWORK_FIELDS = [
+    ('CDP_Neighbor_ID', r'(Neighbor Device ID_\n_\n|CDP Neighbor device ID|CDP Neighbor Device ID)_(\w[^(_)]*)', 2),
+    ('CDP_Neighbor_IP', r'(Neighbor IP Address_\n_\n|CDP Neighbor IP address|CDP Neighbor IP Address|CDP Neighbor IPv4 Address)_(\w[^(_)]*)', 2),
+    ('CDP_Neighbor_Port', r'(Neighbor Port_\n_\n|CDP Neighbor Port|CDP Neighbor port)_(\w[^(_)]*)', 2),
+    ('LLDP_Neighbor_ID', r'(LLDP Neighbor Device ID|LLDP Neighbor device ID)_(\w[^(_)]*)', 2),
+    ('LLDP_Neighbor_IP', r'(LLDP Neighbor IP Address|LLDP Neighbor IP address|LLDP Neighbor IPv4 Address)_(\w[^(_)]*)', 2),
+    ('LLDP_Neighbor_Port', r'(LLDP Neighbor Port|LLDP Neighbor port)_(\w[^(_)]*)', 2),
+]
+
+MODEL_7937_DEVICE_FIELDS = [
+    ('devicename', r'(Host Name : *)([^(_| )]*)', 2),
+    ('sn', '(Serial Number: *)([^(_| |_\n)]*)', 2),
+    ('firmware', '(Software Version : *)([^_| ]*)', 2),
+    ('dn', '(Phone DN : *)([^(_| )]*)', 2),
+]
+
+MODEL_7937_NETWORK_FIELDS = [
+    ('domain_name', '(Domain Name : *)([^(_| )]*)', 2),
+    ('dhcp', '(DHCP Enabled : *)([^(_| )]*)', 2),
+    ('ip_address', '(IP Address : *)([^(_| )]*)', 2),
+    ('subnetmask', '(Subnet Mask : *)([^(_| )]*)', 2),
+    ('gateway', '(Default Router 1 : *)([^(_| )]*)', 2),
+    ('dns1', '(DNS Server 1 : *)([^(_| )]*)', 2),
+    ('dns2', '(DNS Server 2 : *)([^(_| )]*)', 2),
+    ('alt_tftp', '(Alternate TFTP : *)([^(_| )]*)', 2),
+    ('tftp1', '(TFTP Server 1 : *)([^(_| )]*)', 2),
+    ('tftp2', '(TFTP Server 2 : *)([^(_| )]*)', 2),
+    ('op_vlan', '(Operational VLAN Id : *)([^(_| )]*)', 2),
+    ('admin_vlan', '(Admin. VLAN Id : *)([^(_| )]*)', 2),
+    ('cucm1', '(CallManager 1 : *)([^(_| )]*)', 2),
+    ('cucm2', '(CallManager 2 : *)([^(_| )]*)', 2),
+    ('cucm3', '(CallManager 3 : *|CallManager 3 SRST : *|CallManager 3 TFTP : *)([^(_| )]*)', 2),
+    ('cucm4', '(CallManager 4 : *|CallManager 4 SRST : *|CallManager 4 TFTP : *)([^(_| )]*)', 2),
+    ('cucm5', '(CallManager 5 : *|CallManager 5 SRST : *|CallManager 5 TFTP : *)([^(_| )]*)', 2),
+    ('info_url', '(Information URL : *)([^(_| )]*)', 2),
+    ('dir_url', '(Directories URL : *)([^(_| )]*)', 2),
+    ('msg_url', '(Messages URL : *)([^(_| )]*)', 2),
+    ('svc_url', '(Services URL : *)([^(_| )]*)', 2),
+    ('idle_url', '(Idle URL : *)([^(_| )]*)', 2),
+    ('info_url_time', '(Idle URL Time : *)([^(_| )]*)', 2),
+    ('proxy_url', '(Proxy Server URL : *)([^(_| )]*)', 2),
+    ('auth_url', '(Authentication URL : *)([^(_| )]*)', 2),
+]
+
+# TODO this is missing the 'URL' settings. Not sure if this phone model supports that
+# TODO this is missing the ITL value, not sure if this phone supports that.
+# TODO this is missing the CDP/LLDP values, not sure if this phone supports that.
+MODEL_6900_DEVICE_FIELDS = [
+    ('devicename', r'(Host Name_\n_\n_*)([^(_| )]*)', 2),
+    ('sn', '(Serial Number_\n_\n_*)([^(_| |_\n)]*)', 2),
+    ('firmware', '(App Load ID_\n_\n_*)([^_| ]*)', 2),
+    ('dn', '(Phone DN_\n_\n_*)([^(_| )]*)', 2),
+]
+
+MODEL_6900_NETWORK_FIELDS = [
+    ('domain_name', '(Domain Name_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('dhcp', '(DHCP Enabled_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('dhcp_server', '(DHCP Server_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('ip_address', '(IP Address_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('subnetmask', '(Subnet Mask_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('gateway', '(Default Router 1_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('dns1', '(DNS Server 1_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('dns2', '(DNS Server 2_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('alt_tftp', '(Alternate TFTP_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('tftp1', '(TFTP Server 1_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('tftp2', '(TFTP Server 2_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('op_vlan', '(Operational VLAN ID_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('admin_vlan', '(Admin VLAN ID_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('cucm1', '(Unified CM 1_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('cucm2', '(Unified CM 2_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('cucm3', '(Unified CM 3_\n_\xa0_\n_|Unified CM 3 SRST_\n_\xa0_\n_|Unified CM 3 TFTP_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('cucm4', '(Unified CM 4_\n_\xa0_\n_|Unified CM 4 SRST_\n_\xa0_\n_|Unified CM 4 TFTP_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('cucm5', '(Unified CM 5_\n_\xa0_\n_|Unified CM 5 SRST_\n_\xa0_\n_|Unified CM 5 TFTP_\n_\xa0_\n_)([^(_| )]*)', 2),
+]
+
+# ATA doesn't actually have a hostname field in the webpage, so going to use MAC instead
+MODEL_ATA187_DEVICE_FIELDS = [
+    ('devicename', r'(MAC Address_\n_\n_)([^(_| )]*)', 2),
+    ('sn', '(Serial Number_\n_\n_)([^(_| |_\n)]*)', 2),
+    ('firmware', '(App Load ID_\n_\n_*)([^_| ]*)', 2),
+    ('dn', '(Phone 1 DN_\n_\n_*)([^(_| )]*)', 2),
+]
+
+MODEL_ATA187_NETWORK_FIELDS = [
+    ('domain_name', '(Domain Name_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('dhcp', '(DHCP Mode_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('dhcp_server', '(DHCP Server_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('ip_address', '(IP Address_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('subnetmask', '(Subnet Mask_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('gateway', '(Default Router 1_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('dns1', '(DNS Server 1_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('dns2', '(DNS Server 2_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('alt_tftp', '(Alternate Mode_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('tftp1', '(TFTP Server 1_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('tftp2', '(TFTP Server 2_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('admin_vlan', '(Admin. VLAN ID_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('cucm1', '(Call Manager 1_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('cucm2', '(Call Manager 2_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('cucm3', '(Call Manager 3_\n_\xa0_\n_|Call Manager 3 SRST_\n_\xa0_\n_|Call Manager 3 TFTP_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('cucm4', '(Call Manager 4_\n_\xa0_\n_|Call Manager 4 SRST_\n_\xa0_\n_|Call Manager 4 TFTP_\n_\xa0_\n_)([^(_| )]*)', 2),
+    ('cucm5', '(Call Manager 5_\n_\xa0_\n_|Call Manager 5 SRST_\n_\xa0_\n_|Call Manager 5 TFTP_\n_\xa0_\n_)([^(_| )]*)', 2),
+]
+
+
+# default profile for most current phone models
+STANDARD_PROFILE = {
+    'name': 'standard',
+    'urls': {
+        'config': "/CGI/Java/Serviceability?adapter=device.statistics.configuration",
+        'device': "/CGI/Java/Serviceability?adapter=device.statistics.device",
+        'status': "/CGI/Java/Serviceability?adapter=device.settings.status.messages",
+        'network': "/CGI/Java/Serviceability?adapter=device.statistics.port.network",
+    },
+    'hostname_page': 'config',
+    'pages': {
+        'config': STANDARD_CONFIG_FIELDS + STANDARD_CUCM_FIELDS + STANDARD_URL_FIELDS,
+        'device': STANDARD_DEVICE_FIELDS,
+        'network': STANDARD_NETWORK_FIELDS,
+    },
+    'itl_page': 'status',
+    'normalize': {
+        'model': strip_cp_prefix,
+    },
+}
+
+MODEL_8821_PROFILE = dict(STANDARD_PROFILE, name='8821', pages={
+    'config': STANDARD_CONFIG_FIELDS + MODEL_8821_CUCM_FIELDS + STANDARD_URL_FIELDS,
+    'device': STANDARD_DEVICE_FIELDS,
+    'network': STANDARD_NETWORK_FIELDS,
+})
+
+MODEL_7940_PROFILE = dict(STANDARD_PROFILE, name='7940', urls={
+    'config': "/NetworkConfiguration",
+    'device': "/DeviceInformation",
+    'status': "/DeviceLog?2",
+    'network': "/PortInformation?1",
+})
+
+MODEL_7937_PROFILE = {
+    'name': '7937',
+    'urls': {
+        'device': "/localmenus.cgi?func=604",
+        'network': "/localmenus.cgi?func=219",
+    },
+    'hostname_page': 'device',
+    'pages': {
+        'device': MODEL_7937_DEVICE_FIELDS,
+        'network': MODEL_7937_NETWORK_FIELDS,
+    },
+    'set_model': True,
+}
+
+MODEL_6900_PROFILE = {
+    'name': '6900',
+    'urls': {
+        'device': "/Device_Information.html",
+        'network': "/Network_Setup.html",
+    },
+    'hostname_page': 'device',
+    'pages': {
+        'device': MODEL_6900_DEVICE_FIELDS,
+        'network': MODEL_6900_NETWORK_FIELDS,
+    },
+    'set_model': True,
+}
+
+MODEL_ATA187_PROFILE = {
+    'name': 'ATA 187',
+    'urls': {
+        'device': "/Device_Information.htm",
+        'network': "/Network_Setup.htm",
+    },
+    'hostname_page': 'device',
+    'pages': {
+        'device': MODEL_ATA187_DEVICE_FIELDS,
+        'network': MODEL_ATA187_NETWORK_FIELDS,
+    },
+    'normalize': {
+        'devicename': mac_to_devicename,
+        'dhcp': enable_to_yes_no,
+        'alt_tftp': enable_to_yes_no,
+    },
+    'set_model': True,
+}
+
+
+# Model number (as stored in the Phone table) to scrape profile, models not listed use DEFAULT_PROFILE
+MODEL_PROFILES = {
+    '7940': MODEL_7940_PROFILE,
+    '7960': MODEL_7940_PROFILE,
+    '7937': MODEL_7937_PROFILE,
+    '6901': MODEL_6900_PROFILE,  # TODO do we need to add 6911, 6921, 6961, etc ?
+    'ATA 187': MODEL_ATA187_PROFILE,
+    '8821': MODEL_8821_PROFILE,
+}
+
+DEFAULT_PROFILE = STANDARD_PROFILE
@@ -0,0 +1,122 @@
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from xml.sax.saxutils import escape
+
+AXL_NAMESPACE = "http://www.cisco.com/AXL/API/12.0"
+
+
+def soap_envelope(body: str) -> bytes:
+    return f'<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"><soapenv:Body>{body}</soapenv:Body></soapenv:Envelope>'.encode()
+
+
+class FakeAXL:
+    """Stub AXL endpoint answering listChange and executeSQLQuery from in-memory phones and a change queue.
+    Pass url to CUCM_AXL_API as axl_url
+
+    Attributes:
+        phones {dict} -- device uuid to dict of name and description
+        changes {list} -- (change ID, uuid, action) tuples in the change queue, action is 'a', 'u' or 'r'
+        queue_id {str} -- listChange queueId, change it to simulate a CUCM restart
+        first_change_id {int} -- oldest change ID kept in the queue, raise it to simulate an overflowed queue
+        changes_per_response {int} -- max changes returned by one listChange response
+        fail_list_change {bool} -- answer listChange with a SOAP fault
+        requests {list} -- ('listChange', (queueId, startChangeId)) or ('executeSQLQuery', sql) for every request received
+    """
+    def __init__(self):
+        self.reset()
+
+        fake_axl = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+                status, response = fake_axl.handle(body)
+                data = soap_envelope(response)
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/xml')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/axl/'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def reset(self):
+        """Empty the phones, change queue and received requests"""
+        self.phones = {}
+        self.changes = []
+        self.queue_id = 'queue-1'
+        self.first_change_id = 1
+        self.changes_per_response = 2
+        self.fail_list_change = False
+        self.requests = []
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def next_change_id(self) -> int:
+        return self.changes[-1][0] + 1 if self.changes else self.first_change_id
+
+    def request_types(self) -> list:
+        return [request_type for request_type, _ in self.requests]
+
+    def handle(self, body: str) -> tuple:
+        if 'listChange' in body:
+            return self.list_change(body)
+        if 'executeSQLQuery' in body:
+            return self.execute_sql_query(body)
+        return 500, self.fault('unsupported request')
+
+    def fault(self, message: str) -> str:
+        return f'<soapenv:Fault><faultcode>soapenv:Server</faultcode><faultstring>{escape(message)}</faultstring></soapenv:Fault>'
+
+    def list_change(self, body: str) -> tuple:
+        start = re.search(r'<startChangeId queueId="([^"]*)">(\d+)</startChangeId>', body)
+        self.requests.append(('listChange', (start.group(1), int(start.group(2))) if start else None))
+
+        if self.fail_list_change:
+            return 500, self.fault('Unable to process listChange')
+
+        changes = ''
+        next_start_change_id = self.next_change_id
+        if start and start.group(1) == self.queue_id and int(start.group(2)) >= self.first_change_id:
+            pending = [change for change in self.changes if change[0] >= int(start.group(2))][:self.changes_per_response]
+            for change_id, uuid, action in pending:
+                changes += f'<change type="Phone" uuid="{{{uuid.upper()}}}"><action>{action}</action><doGet>true</doGet><changedTags/></change>'
+            next_start_change_id = pending[-1][0] + 1 if pending else int(start.group(2))
+
+        return 200, (
+            f'<ns:listChangeResponse xmlns:ns="{AXL_NAMESPACE}"><queueInfo>'
+            f'<firstChangeId>{self.first_change_id}</firstChangeId><lastChangeId>{self.next_change_id - 1}</lastChangeId>'
+            f'<nextStartChangeId>{next_start_change_id}</nextStartChangeId><queueId>{self.queue_id}</queueId>'
+            f'</queueInfo><changes>{changes}</changes></ns:listChangeResponse>'
+        )
+
+    def execute_sql_query(self, body: str) -> tuple:
+        sql = re.search(r'<sql>(.*)</sql>', body, re.DOTALL).group(1)
+        self.requests.append(('executeSQLQuery', sql))
+
+        phones = sorted(self.phones.items(), key=lambda item: item[1]['name'])
+        page = re.search(r'SKIP (\d+) FIRST (\d+)', sql)
+        if page:
+            skip, first = map(int, page.groups())
+            phones = phones[skip:skip + first]
+        else:
+            uuids = re.findall(r"'([0-9a-f-]+)'", sql)
+            phones = [(uuid, phone) for uuid, phone in phones if uuid in uuids]
+
+        rows = ''.join(
+            f'<row><uuid>{uuid}</uuid><name>{phone["name"]}</name><description>{escape(phone["description"])}</description>'
+            f'<devicepool>Default</devicepool><css/><em_profile/><login_time/></row>'
+            for uuid, phone in phones
+        )
+
+        return 200, f'<ns:executeSQLQueryResponse xmlns:ns="{AXL_NAMESPACE}"><return>{rows}</return></ns:executeSQLQueryResponse>'
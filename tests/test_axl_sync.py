@@ -0,0 +1,182 @@
+import functools
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.Config import config
+from api.db import database
+from api.db.search import create_search_index
+from api.models import phone_data as models
+from api.crud import phone_data as crud
+from api.scheduler import update_from_cucm
+from lib.ciscoaxl.CUCM_AXL_API import CUCM_AXL_API
+
+from tests.fake_axl import FakeAXL
+
+CLUSTER = 'test cluster'
+
+
+class AXLSyncTest(unittest.TestCase):
+    """sync_axl_phones against a stub AXL endpoint and a temporary database"""
+
+    @classmethod
+    def setUpClass(cls):
+        # loading the AXL schema takes a while, the client and endpoint are shared by the tests
+        cls.fake_axl = FakeAXL()
+        cls.axl = CUCM_AXL_API(server='cucm', username='axl', password='axl', cucm_version='12.0', axl_url=cls.fake_axl.url)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fake_axl.close()
+
+    def setUp(self):
+        self.database_folder = tempfile.mkdtemp()
+        engine = create_engine('sqlite:///' + os.path.join(self.database_folder, 'data.db'))
+        database.Base.metadata.create_all(bind=engine)
+        create_search_index(engine)
+
+        for patcher in [
+            mock.patch.object(database, 'SessionLocal', sessionmaker(autocommit=False, autoflush=False, bind=engine)),
+            mock.patch.object(config, 'axl_incremental', True),
+            mock.patch.object(config, 'axl_fetch_mode', 'SQL'),
+            mock.patch.object(config, 'axl_full_sync_hours', 24),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(engine.dispose)
+        self.addCleanup(shutil.rmtree, self.database_folder)
+
+        self.fake_axl.reset()
+        self.fake_axl.phones = {
+            '1111-aa': {'name': 'SEP000000000AAA', 'description': 'lobby & entrance'},
+            '2222-bb': {'name': 'SEP000000000BBB', 'description': 'office'},
+            '3333-cc': {'name': 'SEP000000000CCC', 'description': 'lab'},
+        }
+        self.fake_axl.changes = [(1, '1111-aa', 'a'), (2, '2222-bb', 'a'), (3, '3333-cc', 'a')]
+
+        # first sync is always a full sync, the phones are also stored as registered phones
+        self.sync()
+        crud.merge_phone_data([models.Phone(devicename=phone['name'], cluster=CLUSTER) for phone in self.fake_axl.phones.values()])
+        self.fake_axl.requests.clear()
+
+    def sync(self) -> list:
+        return sorted(phone['name'] for phone in update_from_cucm.sync_axl_phones(self.axl, CLUSTER))
+
+    def stored_devicenames(self) -> list:
+        with database.session_scope() as db:
+            return sorted(devicename for devicename, in db.query(models.Phone.devicename).filter(models.Phone.cluster == CLUSTER))
+
+    def tombstones(self) -> list:
+        with database.session_scope() as db:
+            return sorted(devicename for devicename, in db.query(models.PhoneTombstone.devicename))
+
+    def assert_full_sync(self):
+        self.assertIn('executeSQLQuery', self.fake_axl.request_types())
+        self.assertTrue(any('SKIP 0' in sql for request_type, sql in self.fake_axl.requests if request_type == 'executeSQLQuery'))
+
+    def test_full_sync_stores_devices_and_cursor(self):
+        cursor = crud.get_axl_change_cursor(CLUSTER)
+        self.assertEqual((cursor.queue_id, cursor.next_change_id), ('queue-1', 4))
+        devices = {device['name']: device for device in crud.get_axl_devices(CLUSTER)}
+        self.assertEqual(sorted(devices), ['SEP000000000AAA', 'SEP000000000BBB', 'SEP000000000CCC'])
+        self.assertEqual(devices['SEP000000000AAA']['description'], 'lobby & entrance')
+
+    def test_incremental_sync_applies_updates_removes_and_renames(self):
+        self.fake_axl.phones = {
+            '1111-aa': {'name': 'SEP000000000AAA', 'description': 'reception'},
+            '2222-bb': {'name': 'SEP000000000BB2', 'description': 'office'},
+            '4444-dd': {'name': 'SEP000000000DDD', 'description': 'new'},
+        }
+        self.fake_axl.changes += [(4, '1111-aa', 'u'), (5, '2222-bb', 'u'), (6, '3333-cc', 'r'), (7, '4444-dd', 'a'), (8, '1111-aa', 'u')]
+
+        self.assertEqual(self.sync(), ['SEP000000000AAA', 'SEP000000000BB2', 'SEP000000000DDD'])
+
+        self.assertNotIn('SKIP', ' '.join(sql for request_type, sql in self.fake_axl.requests if request_type == 'executeSQLQuery'))
+        self.assertEqual({device['name']: device['description'] for device in crud.get_axl_devices(CLUSTER)}['SEP000000000AAA'], 'reception')
+        self.assertEqual(crud.get_axl_change_cursor(CLUSTER).next_change_id, 9)
+        # renamed and removed phones are deleted, the renamed phone is stored again once it registers under its new name
+        self.assertEqual(self.stored_devicenames(), ['SEP000000000AAA'])
+        self.assertEqual(self.tombstones(), ['SEP000000000BBB', 'SEP000000000CCC'])
+
+    def test_incremental_sync_without_changes(self):
+        self.assertEqual(self.sync(), ['SEP000000000AAA', 'SEP000000000BBB', 'SEP000000000CCC'])
+        self.assertEqual(self.fake_axl.request_types(), ['listChange'])
+
+    def test_cursor_expired_by_new_queue_runs_full_sync(self):
+        # CUCM restarted, the change queue starts over
+        self.fake_axl.queue_id = 'queue-2'
+        del self.fake_axl.phones['3333-cc']
+
+        self.assertEqual(self.sync(), ['SEP000000000AAA', 'SEP000000000BBB'])
+
+        self.assert_full_sync()
+        self.assertEqual(crud.get_axl_change_cursor(CLUSTER).queue_id, 'queue-2')
+        self.assertEqual(self.stored_devicenames(), ['SEP000000000AAA', 'SEP000000000BBB'])
+        self.assertEqual(self.tombstones(), ['SEP000000000CCC'])
+
+    def test_cursor_expired_by_overflowed_queue_runs_full_sync(self):
+        # changes after the cursor were dropped from the queue before they were read
+        self.fake_axl.changes = [(10, '1111-aa', 'u')]
+        self.fake_axl.first_change_id = 10
+        self.fake_axl.phones['2222-bb']['name'] = 'SEP000000000BB2'
+
+        self.assertEqual(self.sync(), ['SEP000000000AAA', 'SEP000000000BB2', 'SEP000000000CCC'])
+
+        self.assert_full_sync()
+        self.assertEqual(crud.get_axl_change_cursor(CLUSTER).next_change_id, 11)
+        self.assertEqual(self.tombstones(), ['SEP000000000BBB'])
+
+    def test_truncated_full_sync_deletes_nothing(self):
+        self.fake_axl.queue_id = 'queue-2'
+
+        # the phone list stops at max_phones before SEP000000000CCC
+        get_all_phones_sql = functools.partial(self.axl.get_all_phones_sql, first=1, max_phones=2)
+        with mock.patch.object(self.axl, 'get_all_phones_sql', get_all_phones_sql):
+            self.assertEqual(self.sync(), ['SEP000000000AAA', 'SEP000000000BBB'])
+
+        self.assertTrue(self.axl.truncated)
+        self.assertEqual(self.stored_devicenames(), ['SEP000000000AAA', 'SEP000000000BBB', 'SEP000000000CCC'])
+        self.assertEqual(self.tombstones(), [])
+
+    def test_list_change_failure_runs_full_sync(self):
+        self.fake_axl.fail_list_change = True
+        del self.fake_axl.phones['2222-bb']
+
+        self.assertEqual(self.sync(), ['SEP000000000AAA', 'SEP000000000CCC'])
+
+        self.assert_full_sync()
+        # the cursor couldn't be read, only full syncs run until listChange works again
+        self.assertIsNone(crud.get_axl_change_cursor(CLUSTER).queue_id)
+        self.assertEqual(self.stored_devicenames(), ['SEP000000000AAA', 'SEP000000000CCC'])
+
+    def test_old_full_sync_runs_full_sync(self):
+        with database.session_scope() as db:
+            db.query(models.AXLChangeCursor).update({'last_full_sync': datetime.now() - timedelta(hours=25)})
+            db.commit()
+
+        self.sync()
+
+        self.assertNotIn(('listChange', ('queue-1', 4)), self.fake_axl.requests)
+        self.assert_full_sync()
+
+    def test_list_changes_carries_over_after_max_requests(self):
+        self.fake_axl.changes += [(4, '1111-aa', 'u'), (5, '2222-bb', 'u'), (6, '3333-cc', 'u'), (7, '1111-aa', 'u'), (8, '2222-bb', 'r')]
+
+        cursor, changes = self.axl.list_changes(queue_id='queue-1', start_change_id=4, max_requests=2)
+        self.assertEqual(changes, [('1111-aa', 'u'), ('2222-bb', 'u'), ('3333-cc', 'u'), ('1111-aa', 'u')])
+        self.assertEqual(cursor['nextStartChangeId'], 8)
+        self.assertFalse(cursor['expired'])
+
+        cursor, changes = self.axl.list_changes(queue_id=cursor['queueId'], start_change_id=cursor['nextStartChangeId'], max_requests=2)
+        self.assertEqual(changes, [('2222-bb', 'r')])
+        self.assertEqual(cursor['nextStartChangeId'], 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from unittest import mock
+
+from zeep.exceptions import Fault, TransportError
+
+from lib.ciscoaxl.CUCM_AXL_API import CUCM_AXL_API
+
+
+class PagedAXL(CUCM_AXL_API):
+    """CUCM_AXL_API serving pages of integers, without connecting to CUCM"""
+    def __init__(self, total: int, errors: dict = None, max_rows: int = None):
+        self.total = total
+        self.errors = errors or {}  # skip -> list of exceptions raised by the next requests of that page
+        self.max_rows = max_rows
+        self.calls = []
+
+    def get_phones(self, first: int, skip: int) -> list:
+        self.calls.append((first, skip))
+        if self.errors.get(skip):
+            raise self.errors[skip].pop(0)
+        if self.max_rows is not None and first > self.max_rows:
+            raise Fault(f"Query request too large. Total rows matched: {self.total} rows.\nSuggestive Row Fetch: less than {self.max_rows + 1} rows")
+        return list(range(skip, min(skip + first, self.total)))
+
+
+@mock.patch('lib.ciscoaxl.CUCM_AXL_API.time.sleep')
+class GetAllPagesTest(unittest.TestCase):
+
+    def test_pages_grow_and_shrink_to_suggested_size(self, sleep):
+        axl = PagedAXL(total=23456, max_rows=6499)
+        self.assertEqual(axl.get_all_phones(), list(range(23456)))
+        self.assertTrue(all(first <= 6499 for first, skip in axl.calls[axl.calls.index((8000, 7000)) + 1:]))
+
+    def test_throttling_is_retried_with_backoff(self, sleep):
+        errors = {3000: [TransportError('unavailable', status_code=503), Fault('AXL Throttle: Maximum AXL Memory Allocation Consumed')]}
+        axl = PagedAXL(total=5000, errors=errors)
+        self.assertEqual(axl.get_all_phones(), list(range(5000)))
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [5, 10])
+
+    def test_throttling_raises_when_retries_are_exhausted(self, sleep):
+        axl = PagedAXL(total=5000, errors={1000: [TransportError('unavailable', status_code=503) for _ in range(4)]})
+        with self.assertRaises(TransportError):
+            axl.get_all_phones(max_retries=3)
+        self.assertEqual(sleep.call_count, 3)
+
+    def test_other_errors_raise_instead_of_returning_partial_results(self, sleep):
+        axl = PagedAXL(total=5000, errors={1000: [Fault('Item not valid')]})
+        with self.assertRaises(Fault):
+            axl.get_all_phones()
+        sleep.assert_not_called()
+
+    def test_max_phones_flags_truncated_result(self, sleep):
+        axl = PagedAXL(total=5000)
+        self.assertEqual(len(axl.get_all_phones(max_phones=3000)), 3000)
+        self.assertTrue(axl.truncated)
+
+        self.assertEqual(len(axl.get_all_phones(max_phones=6000)), 5000)
+        self.assertFalse(axl.truncated)
+
+    def test_single_row_too_large_raises(self, sleep):
+        axl = PagedAXL(total=5000, max_rows=0)
+        with self.assertRaises(Fault):
+            axl.get_all_phones()
+        self.assertEqual(axl.calls[-1], (1, 0))
+        self.assertLess(len(axl.calls), 15)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,23 @@
+import os
+import unittest
+
+from lib.phone_scraper import html_to_text_bs4, html_to_text_lxml
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'phone_pages')
+
+
+class HtmlToTextTest(unittest.TestCase):
+    """ The lxml text extraction must produce exactly the text BS4 produces, the model regex patterns depend on it """
+
+    def test_lxml_matches_bs4_on_fixture_pages(self):
+        pages = sorted(name for name in os.listdir(FIXTURE_DIR) if name.endswith('.html'))
+        self.assertTrue(pages)
+        for name in pages:
+            with open(os.path.join(FIXTURE_DIR, name), encoding='utf-8') as f:
+                raw_html = f.read()
+            with self.subTest(page=name):
+                self.assertEqual(html_to_text_lxml(raw_html), html_to_text_bs4(raw_html))
+
+
+if __name__ == '__main__':
+    unittest.main()